@@ -1,18 +1,27 @@
-orimport importlib
+import importlib
+import threading
 from flask import Flask, request
-from utility.config_loader import load_ipsdnc_config, load_rnc_config, load_kafka_config
+from utility.config_loader import load_ipsdnc_config, load_rnc_config, load_kafka_config, load_telemetry_config
 from utility.utils import *
 from controllers.base_ipsdnc import ConcreteIPSDNCController
 from controllers.base_rnc import ConcreteRNCController
+from infra.transport.netconf_pool import get_session_pool
+from infra.transport.device_locks import get_device_locks
+from infra.transport.tunnels import get_tunnel_manager
+from infra.registry import get_registry
 from orchestrator.nova import NOVAOrchestrator
+from telemetry.collector import get_collector
 from kafka_notif.NBInotif import start_kafka_consumer
 from routes.ipsdnc_interactions import create_ipsdnc_bp
 from routes.rnc_interactions import create_rnc_bp
+from routes.metrics import create_metrics_bp
+from routes.telemetry import create_telemetry_bp
 
 class VendorDispatchIPSDNC:
     def __init__(self, base_cfg):
         self.base_cfg = base_cfg
         self._cache = {}
+        self._cache_lock = threading.Lock()
         self._default_vendor = (base_cfg.get("vendor") or "vendorA").strip().lower()
 
     def _resolve_class(self, dotted: str):
@@ -28,18 +37,23 @@ class VendorDispatchIPSDNC:
     def _get_controller(self):
         body = request.get_json(silent=True) or {}
         vendor = (body.get("vendor") or self._default_vendor).strip().lower()
-        if vendor in self._cache:
-            return self._cache[vendor]
-
-        cfg = dict(self.base_cfg)
-        cfg["vendor"] = vendor
-        cfg["allow_vendor_override"] = False
-        vendor_section = cfg.get("vendors", {}).get(vendor, {})
-        dotted = vendor_section.get("controller_class")
-        cls = self._resolve_class(dotted)
-
-        ctrl = cls(cfg)
-        self._cache[vendor] = ctrl
+        ctrl = self._cache.get(vendor)
+        if ctrl is not None:
+            return ctrl
+
+        # Concurrent first requests for a vendor must share one controller
+        with self._cache_lock:
+            ctrl = self._cache.get(vendor)
+            if ctrl is None:
+                cfg = dict(self.base_cfg)
+                cfg["vendor"] = vendor
+                cfg["allow_vendor_override"] = False
+                vendor_section = cfg.get("vendors", {}).get(vendor, {})
+                dotted = vendor_section.get("controller_class")
+                cls = self._resolve_class(dotted)
+
+                ctrl = cls(cfg)
+                self._cache[vendor] = ctrl
         return ctrl
 
     def end_terminal_performance_info_request(self):
@@ -54,6 +68,36 @@ class VendorDispatchIPSDNC:
     def end_terminal_activation_request(self):   return self._get_controller().end_terminal_activation_request()
     def end_terminal_deactivation_request(self): return self._get_controller().end_terminal_deactivation_request()
     def show_target_output_power(self):          return self._get_controller().show_target_output_power()
+    def session_pool_stats(self):                return get_session_pool(self.base_cfg).stats()
+    def tunnel_stats(self):                      return get_tunnel_manager().stats()
+    def device_lock_stats(self):                 return get_device_locks(self.base_cfg).stats()
+    def payload_stats(self):                     return get_registry(self.base_cfg).payloads.stats()
+
+    def devices(self):
+        # Line ports the request's service configures, terminal/component on both ends
+        # (bulk per-device limits); services on other ports of a terminal run alongside
+        ctrl = self._get_controller()
+        body = request.get_json(silent=True) or {}
+        comp = body.get("component-name") or body.get("component_name") or getattr(ctrl, "default_component_name", "")
+        ends = (getattr(ctrl, "ipA", None), getattr(ctrl, "ipB", None))
+        return [f"{ip}/{comp}" if comp else ip for ip in ends if ip]
+
+    def confirm_commit(self, device):            return self._pending_commit_op(device, "confirm_commit")
+    def cancel_commit(self, device):             return self._pending_commit_op(device, "cancel_commit")
+    def pending_commits(self):                   return ConcreteIPSDNCController.pending_commits()
+
+    def _pending_commit_op(self, device, op):
+        # The request's vendor controller holds the terminal's credentials
+        ctrl = self._get_controller()
+        if device not in (getattr(ctrl, "ipA", None), getattr(ctrl, "ipB", None)):
+            raise ValueError(f"{device} is not a terminal of vendor '{ctrl.vendor}'")
+        return getattr(ctrl, op)(device)
+
+    def invalidate_oc_caps(self, device=None):
+        for ctrl in list(self._cache.values()):
+            ctrl.invalidate_oc_caps(device)
+        # Also reaches entries written by other processes / earlier runs
+        return get_registry(self.base_cfg).capabilities.invalidate(device)
 
 logger = setup_logger()
 app = Flask(__name__)
@@ -61,18 +105,38 @@ app = Flask(__name__)
 ipsdnc_cfg = load_ipsdnc_config()
 rnc_cfg    = load_rnc_config()
 kafka_cfg  = load_kafka_config()
+telemetry_cfg = load_telemetry_config()
+
+# Build the shared Mongo client, payload repository, capability cache and
+# OpenConfig catalog in the background so the first request does not pay for them
+registry = get_registry(ipsdnc_cfg)
+registry.warm_up()
 
 ipsdnc_ctrl  = VendorDispatchIPSDNC(ipsdnc_cfg)
 rnc_ctrl     = ConcreteRNCController(rnc_cfg)
 
+# gNMI samples of the terminals, served from memory by /telemetry
+telemetry    = get_collector(telemetry_cfg, ipsdnc_cfg)
+
 app.register_blueprint(create_ipsdnc_bp(ipsdnc_ctrl))
 app.register_blueprint(create_rnc_bp(rnc_ctrl))
+app.register_blueprint(create_metrics_bp())
+app.register_blueprint(create_telemetry_bp(telemetry, telemetry_cfg.get("enabled", False)))
 
-nova = NOVAOrchestrator(ipsdnc_ctrl, rnc_ctrl)
+nova = NOVAOrchestrator(ipsdnc_ctrl, rnc_ctrl,
+                        bulk_workers=ipsdnc_cfg["bulk_workers"],
+                        bulk_per_device=ipsdnc_cfg["bulk_per_device"],
+                        bulk_max_services=ipsdnc_cfg["bulk_max_services"])
 app.register_blueprint(nova.bp)
 
 if __name__ == "__main__":
     import os
     if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
         start_kafka_consumer(kafka_cfg)
-    app.run(host="0.0.0.0", port=5000, debug=True)
+        if telemetry_cfg.get("enabled"):
+            telemetry.start()
+        if ipsdnc_cfg.get("oc_fetch_on_start"):
+            # Pulls new OpenConfig release tags into the persisted index without delaying start-up
+            registry.oc_lookup.start_background_refresh(ipsdnc_cfg.get("oc_fetch_timeout", 60.0))
+    # Same-device changes are serialized by the device lock manager, so requests can run concurrently
+    app.run(host="0.0.0.0", port=5000, debug=True, threaded=True)
@@ -0,0 +1,81 @@
+"""
+Measures OpenConfigLookup index build time against a local OpenConfig clone.
+
+    python benchmarks/bench_oc_lookup.py --repo openconfig-public --runs 5
+
+Reports, per run:
+  legacy   one `git show` process per tag (the former builder)
+  rebuild  full rebuild through the batch reader (empty index)
+  warm     construction with an up-to-date index file
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utility.oc_lookup import OpenConfigLookup, OPENCONFIG_REPO, OC_PLATFORM_YANG  # noqa: E402
+
+
+def _git_show(repo: Path, obj_path: str):
+    """The former builder's per-object read: one git show process each"""
+    try:
+        r = subprocess.run(["git", "show", obj_path], cwd=repo, capture_output=True, text=True, check=True)
+        return r.stdout
+    except subprocess.CalledProcessError:
+        return None
+
+
+def _legacy(repo: Path, tags) -> float:
+    t0 = time.perf_counter()
+    for tag in tags:
+        _git_show(repo, f"{tag}:{OC_PLATFORM_YANG}")
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repo", type=Path, default=OPENCONFIG_REPO, help="local OpenConfig clone with tags")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--parse-workers", type=int, default=0, help="process-pool size for parsing (0 = in-process)")
+    ap.add_argument("--skip-legacy", action="store_true", help="skip the per-tag git show baseline")
+    args = ap.parse_args()
+
+    if not (args.repo / ".git").exists():
+        print(f"not a git clone: {args.repo}", file=sys.stderr)
+        return 2
+
+    results = {"legacy": [], "rebuild": [], "warm": []}
+    tags = []
+    with tempfile.TemporaryDirectory() as tmp:
+        index = Path(tmp) / "index.json"
+        for _ in range(args.runs):
+            if index.exists():
+                os.unlink(index)
+            t0 = time.perf_counter()
+            lookup = OpenConfigLookup(args.repo, index, parse_workers=args.parse_workers)
+            results["rebuild"].append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            OpenConfigLookup(args.repo, index, parse_workers=args.parse_workers)
+            results["warm"].append(time.perf_counter() - t0)
+
+            tags = sorted(lookup._processed_tags)
+            if not args.skip_legacy:
+                results["legacy"].append(_legacy(args.repo, tags))
+
+    print(f"{len(tags)} tags, {len(lookup._rev_map['openconfig-platform'])} revisions, {args.runs} run(s)")
+    for name, samples in results.items():
+        if samples:
+            print(f"  {name:8s} median {statistics.median(samples) * 1000:9.1f} ms   "
+                  f"min {min(samples) * 1000:9.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark of PayloadRepository lookups against a local mongod.
+
+    python benchmarks/bench_payload_repository.py --mongo-url mongodb://localhost:27017 --docs 5000
+
+Seeds a scratch database (dropped afterwards) with payload documents
+addressed by name, key and vendor+action, then reports per-lookup latency
+for:
+  legacy      the former find_one chain ($or name/key, then vendor+action)
+  single      one $or query ranked in Python, without indexes
+  legacy+ix   the former chain after ensure_indexes()
+  indexed     the single query after ensure_indexes()
+  get_many    one query for a whole workflow's payloads (per payload)
+  cached      repeat lookups served from memory
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pymongo import MongoClient  # noqa: E402
+
+from infra.persistence.repository import PayloadRepository  # noqa: E402
+
+DB = "nova_bench_payloads"
+
+
+def _seed(col, n: int) -> list:
+    docs, names = [], []
+    for i in range(n):
+        kind = i % 3
+        if kind == 0:
+            docs.append({"name": f"common.payload_{i}", "payload": f"<cfg><v>{{value}}</v><i>{i}</i></cfg>"})
+            names.append(f"common.payload_{i}")
+        elif kind == 1:
+            docs.append({"key": f"vendor{i % 7}.key_{i}", "payload": f"<cfg>${{value}}-{i}</cfg>"})
+            names.append(f"vendor{i % 7}.key_{i}")
+        else:
+            # Only reachable through the vendor+action fallback when looked up by name
+            docs.append({"vendor": f"vendor{i % 7}", "action": f"action_{i}", "payload": f'{{"v": "{{value}}", "i": {i}}}'})
+            names.append(f"vendor{i % 7}.action_{i}")
+    col.insert_many(docs)
+    return names
+
+
+def _legacy_fetch(col, name: str):
+    doc = col.find_one({"$or": [{"name": name}, {"key": name}]})
+    if not doc and "." in name:
+        v, a = name.split(".", 1)
+        doc = col.find_one({"vendor": v, "action": a})
+    return doc
+
+
+def _time_each(fn, names) -> list:
+    out = []
+    for n in names:
+        t0 = time.perf_counter()
+        fn(n)
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def _report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]
+    print(f"  {label:9s} median {statistics.median(samples):7.3f} ms   p95 {p95:7.3f} ms   n={len(samples)}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    ap.add_argument("--docs", type=int, default=5000)
+    ap.add_argument("--lookups", type=int, default=500)
+    ap.add_argument("--batch", type=int, default=8, help="payloads per get_many call")
+    args = ap.parse_args()
+
+    client = MongoClient(args.mongo_url, serverSelectionTimeoutMS=3000)
+    client.drop_database(DB)
+    col = client[DB]["payloads"]
+    try:
+        names = _seed(col, args.docs)
+        sample = random.Random(7).sample(names, min(args.lookups, len(names)))
+        print(f"{args.docs} documents, {len(sample)} lookups ({args.mongo_url})")
+
+        repo = PayloadRepository(args.mongo_url, db_name=DB, client=client)
+        _report("legacy", _time_each(lambda n: _legacy_fetch(col, n), sample))
+        _report("single", _time_each(lambda n: repo._fetch_payload(n, None, None), sample))
+
+        repo.ensure_indexes()
+        _report("legacy+ix", _time_each(lambda n: _legacy_fetch(col, n), sample))
+        _report("indexed", _time_each(lambda n: repo._fetch_payload(n, None, None), sample))
+
+        batches = [sample[i:i + args.batch] for i in range(0, len(sample), args.batch)]
+        per_payload = []
+        for batch in batches:
+            repo.invalidate()
+            t0 = time.perf_counter()
+            repo.get_many(batch)
+            per_payload.append((time.perf_counter() - t0) * 1000.0 / len(batch))
+        _report("get_many", per_payload)
+
+        for n in sample:
+            repo.get(name=n)
+        _report("cached", _time_each(lambda n: repo.get(name=n), sample))
+    finally:
+        client.drop_database(DB)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+End-to-end run of the gNMI telemetry collector against the stub client.
+
+    python benchmarks/bench_telemetry.py --targets 4 --components 16 --seconds 3 --capacity 8640
+
+Starts GnmiCollector with one StubGnmiClient per target streaming as fast
+as possible (subscribe, parse, ring-buffer append on the collector
+threads), then reports:
+  ingest      samples stored per second across all targets
+  latest      /telemetry/latest equivalent over every series
+  series      one series downsampled to --points buckets, per aggregate
+  all-series  every series downsampled (NumPy when installed)
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from telemetry.collector import GnmiCollector, GnmiTarget  # noqa: E402
+from telemetry.store import AGGREGATES, TelemetryStore, _numpy  # noqa: E402
+from telemetry.stub import stub_client_factory  # noqa: E402
+
+
+def _time(fn, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(runs)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--targets", type=int, default=4)
+    ap.add_argument("--components", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--capacity", type=int, default=8640)
+    ap.add_argument("--points", type=int, default=300)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    store = TelemetryStore(capacity=args.capacity)
+    targets = [GnmiTarget(f"10.0.0.{i + 1}", f"10.0.0.{i + 1}", 57400, None, None) for i in range(args.targets)]
+    comps = [f"OCH-0/0/0/{i}" for i in range(args.components)]
+    collector = GnmiCollector(targets, store, client_factory=stub_client_factory(components=comps, interval=0))
+
+    collector.start()
+    time.sleep(args.seconds)
+    collector.stop()
+    time.sleep(0.2)
+
+    stats = collector.stats()
+    stored = sum(t["updates"] for t in stats["targets"].values())
+    errors = sum(t["errors"] for t in stats["targets"].values())
+    print(f"ingest      {stored / args.seconds:12,.0f} samples/s  ({stored:,} samples, {errors} stream errors, "
+          f"{stats['store']['series']} series, {stats['store']['bytes'] / 2 ** 20:.1f} MiB of buffers)")
+
+    print(f"latest      {_time(store.latest, args.repeat):9.2f} ms  (all series)")
+    one = store.keys(metric="osnr")[0]
+    for how in AGGREGATES:
+        ms = _time(lambda: store.query(device=one[0], component=one[1], metric="osnr",
+                                       points=args.points, how=how), args.repeat)
+        print(f"series      {ms:9.3f} ms  ({how}, {args.points} points)")
+    ms = _time(lambda: store.query(points=args.points), max(1, args.repeat // 4))
+    print(f"all-series  {ms:9.2f} ms  (mean, {'NumPy' if _numpy() else 'pure Python'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,77 @@
-import time, json
+import time
+import uuid
 import logging
-import socket
-import subprocess
-from ncclient.xml_ import to_ele
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import deepcopy
+from ncclient.xml_ import to_ele, to_xml
 import re
 import xml.etree.ElementTree as ET
-from typing import Dict, Any
+from typing import Dict, Any, List
 from flask import request, jsonify
 from ncclient import manager
+from ncclient.operations.rpc import RPCError
 from utility.utils import safe_extract_data, get_operational_mode_info
 from controllers.ipsdnc import IPSDNCController
-from infra.persistence.repository import PayloadRepository, PayloadNotFound
-from utility.oc_lookup import OpenConfigLookup
+from infra.persistence.repository import PayloadNotFound
+from infra.persistence.capabilities import CapabilityCache
+from infra.registry import get_registry
+from infra.transport.device_locks import get_device_locks
+from infra.transport.netconf_pool import get_session_pool
+from infra.transport.tunnels import get_tunnel_manager
 
 logger = logging.getLogger(__name__)
 TD_NS = {"td": "http://openconfig.net/yang/terminal-device"}
+TD_TARGET_OUTPUT_POWER = "{%s}target-output-power" % TD_NS["td"]
+
+# OpenConfig module that defines the nodes each payload configures or reads
+# (optical-channel frequency/power live in terminal-device, not platform)
+PAYLOAD_MODULES = {
+    "set_power_and_frequency": "openconfig-terminal-device",
+    "read_target_output_power": "openconfig-terminal-device",
+}
+
+# ip -> {"persist_id", "expires"} of the unconfirmed confirmed-commit on that device,
+# shared by every vendor controller (any of them may confirm or cancel it)
+_pending_confirms: Dict[str, dict] = {}
+_pending_lock = threading.Lock()
+
+
+def _pending_confirm(ip: str):
+    """Pending confirmed-commit entry for ip; entries past their timeout were rolled back by the device"""
+    with _pending_lock:
+        entry = _pending_confirms.get(ip)
+        if entry is not None and entry["expires"] <= time.monotonic():
+            del _pending_confirms[ip]
+            entry = None
+        return entry
+
+
+def _local(tag) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _identity(el):
+    """List entries are identified by their <name> key, containers by tag, leaves by tag and value"""
+    if len(el) == 0:
+        return el.tag, (el.text or "").strip()
+    return el.tag, next((c.text for c in el if _local(c.tag) == "name" and len(c) == 0), None)
+
+
+def _merge_xml(dst, src) -> None:
+    """Merges src's children into dst, recursing into containers/list entries present in both"""
+    index = {_identity(c): c for c in dst if isinstance(c.tag, str)}
+    for child in src:
+        if not isinstance(child.tag, str):
+            continue  # comments / processing instructions
+        ident = _identity(child)
+        same = index.get(ident)
+        if same is None:
+            index[ident] = deepcopy(child)
+            dst.append(index[ident])
+        elif len(child):
+            _merge_xml(same, child)
 
 
 class ConcreteIPSDNCController(IPSDNCController):
@@ -23,22 +80,38 @@ class ConcreteIPSDNCController(IPSDNCController):
     Subclasses override only connection hooks and optional vendor hooks.
     """
 
+    # Backoff (seconds) before retrying a <get-schema> that failed on the transport
+    OC_SCHEMA_RETRY = 30.0
+    OC_SCHEMA_RETRY_MAX = 900.0
+
     def __init__(self, config: dict):
         logger.info("[Init] Initializing ConcreteIPSDNCController...")
         super().__init__(config)
         self.config = config
         self.default_oper_mode = config.get("oper_mode")
         self.oper_mode = self.default_oper_mode
-        self.payloads = PayloadRepository(config["mongo_url"])
+        # Shared with every other vendor controller in the process
+        registry = get_registry(config)
+        self.payloads = registry.payloads
         self.vendor = (config.get("vendor") or "").strip().lower()
         self.allow_vendor_override = bool(config.get("allow_vendor_override", True))
         self.component_name = config.get("component_name", "")
         self.vendor_cfgs = config.get("vendors", {})
         self.default_component_name = config.get("component_name_default", "")
+        self.concurrent_ends = bool(config.get("concurrent_ends", True))
         self._apply_vendor_endpoints(self.vendor)
+        self._pool = get_session_pool(config)
+        self._device_locks = get_device_locks(config)
+        self._caps_store = registry.capabilities
 
         self._logged_revisions = set()
-        self.oc_lookup = OpenConfigLookup()
+        self.oc_lookup = registry.oc_lookup
+        self._oc_caps_cache = {}
+        self._oc_caps_hash = {}
+        self._oc_schema_support = {}
+        self._oc_locks = {}
+        # (ip, module) -> (monotonic time of the next attempt, current backoff)
+        self._oc_schema_retry = {}
 
         for ip in (self.ipA, self.ipB):
             if ip:
@@ -132,20 +205,18 @@ class ConcreteIPSDNCController(IPSDNCController):
         self._ensure_oc_caps(ip)
         entry = self._oc_caps_cache[ip].get(module)
         if isinstance(entry, dict):
-            if module == "openconfig-platform":
-                if entry.get("version"):
-                    logger.debug("[OC] Version for %s on %s: %s", module, ip, entry["version"])
-                    return entry["version"]
-                rev = entry.get("revision")
-                mapped = self.oc_lookup.get_version_by_revision(module, rev) if rev else None
-                logger.debug("[OC] Mapped revision %s -> version %s", rev, mapped or rev)
-                return mapped or rev
-            return entry.get("revision")
+            if "version" not in entry:
+                self._resolve_oc_versions(ip, [module])
+            if entry.get("version"):
+                logger.debug("[OC] Version for %s on %s: %s", module, ip, entry["version"])
+                return entry["version"]
+            rev = entry.get("revision")
+            mapped = self.oc_lookup.resolve_version(module, rev) if rev else None
+            logger.debug("[OC] Mapped revision %s -> version %s", rev, mapped or rev)
+            return mapped or rev
         return entry
 
     def _ensure_oc_caps(self, ip: str):
-        if not hasattr(self, "_oc_caps_cache"):
-            self._oc_caps_cache = {}
         if ip in self._oc_caps_cache:
             return
 
@@ -153,34 +224,116 @@ class ConcreteIPSDNCController(IPSDNCController):
         try:
             with self._connect(ip) as m:
                 caps = list(m.server_capabilities)
-                oc_caps = [c for c in caps if "openconfig" in c]
-                parsed = self._parse_oc_modules(oc_caps)
-                if any("ietf-netconf-monitoring" in c for c in caps):
-                    for mod in parsed.keys():
-                        try:
-                            rpc = f"""
-                            <get-schema xmlns="urn:ietf:params:xml:ns:yang:ietf-netconf-monitoring">
-                                <identifier>{mod}</identifier>
-                                <format>yang</format>
-                            </get-schema>
-                            """
-                            rsp = m.dispatch(to_ele(rpc))
-                            xml = rsp.xml
-                            mobj = re.search(r'oc-ext:openconfig-version\s+"([^"]+)"', xml)
-                            if mobj:
-                                parsed[mod]["version"] = mobj.group(1)
-                                logger.debug("[Caps] Found version %s for %s", parsed[mod]["version"], mod)
-                        except Exception as inner_e:
-                            logger.debug("[Caps] Skipping get-schema for %s on %s: %s", mod, ip, inner_e)
-                self._oc_caps_cache[ip] = parsed
-                logger.info("✅ Cached OC capabilities for %s: %s", ip, parsed)
         except Exception as e:
             logger.warning("[Caps] Could not fetch capabilities from %s: %s", ip, e)
             self._oc_caps_cache[ip] = {}
+            return
+
+        caps_hash = CapabilityCache.hash_capabilities(caps)
+        self._oc_caps_hash[ip] = caps_hash
+        self._oc_schema_support[ip] = any("ietf-netconf-monitoring" in c for c in caps)
+        stored = self._caps_store.load(ip, caps_hash)
+        if stored is not None:
+            self._oc_caps_cache[ip] = stored
+            logger.info("[Caps] Loaded OC capabilities for %s from cache (%d modules)", ip, len(stored))
+            return
+        # Revisions only; module versions are resolved on first use (_resolve_oc_versions)
+        parsed = self._parse_oc_modules([c for c in caps if "openconfig" in c])
+        self._oc_caps_cache[ip] = parsed
+        self._caps_store.store(ip, caps_hash, parsed)
+        logger.info("✅ Cached OC capabilities for %s: %d modules", ip, len(parsed))
+
+    def _resolve_oc_versions(self, ip: str, modules):
+        """
+        Fetches the YANG schema of each module whose version is not known yet
+        (several modules in parallel, one pooled session each) and records the
+        oc-ext:openconfig-version found in it. Modules without one, or whose schema
+        the device refuses (rpc-error), are recorded with version None so they are
+        not fetched again; transport failures are retried with a per-module backoff.
+        """
+        entries = self._oc_caps_cache.get(ip, {})
+        with self._oc_locks.setdefault(ip, threading.Lock()):
+            now = time.monotonic()
+            todo = [mod for mod in modules if isinstance(entries.get(mod), dict) and "version" not in entries[mod]
+                    and self._oc_schema_retry.get((ip, mod), (0.0, 0.0))[0] <= now]
+            if not todo:
+                return
+            if not self._oc_schema_support.get(ip, True):
+                for mod in todo:
+                    entries[mod]["version"] = None
+                return
+
+            t0 = time.monotonic()
+            workers = min(len(todo), self._pool.max_sessions)
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="oc-schema") as ex:
+                    versions = list(ex.map(lambda mod: self._fetch_oc_version(ip, mod), todo))
+            else:
+                versions = [self._fetch_oc_version(ip, mod) for mod in todo]
+            for mod, (ok, ver) in zip(todo, versions):
+                if ok:
+                    entries[mod]["version"] = ver
+                    self._oc_schema_retry.pop((ip, mod), None)
+                else:
+                    delay = self._oc_schema_retry.get((ip, mod), (0.0, 0.0))[1]
+                    delay = min(delay * 2, self.OC_SCHEMA_RETRY_MAX) if delay else self.OC_SCHEMA_RETRY
+                    self._oc_schema_retry[(ip, mod)] = (time.monotonic() + delay, delay)
+            logger.info("[Caps] Resolved %d module version(s) on %s in %.0f ms",
+                        len(todo), ip, (time.monotonic() - t0) * 1000.0)
+
+            if ip in self._oc_caps_hash:
+                self._caps_store.store(ip, self._oc_caps_hash[ip], entries)
+
+    def _fetch_oc_version(self, ip: str, mod: str):
+        """Returns (fetched, version) for one module via <get-schema>"""
+        rpc = f"""
+        <get-schema xmlns="urn:ietf:params:xml:ns:yang:ietf-netconf-monitoring">
+            <identifier>{mod}</identifier>
+            <format>yang</format>
+        </get-schema>
+        """
+        try:
+            with self._connect(ip) as m:
+                xml = m.dispatch(to_ele(rpc)).xml
+        except RPCError as e:
+            # Definitive answer (unknown schema, operation-not-supported): do not ask again
+            logger.debug("[Caps] get-schema for %s refused by %s: %s", mod, ip, e)
+            return True, None
+        except Exception as e:
+            logger.debug("[Caps] Skipping get-schema for %s on %s: %s", mod, ip, e)
+            return False, None
+        mobj = re.search(r'oc-ext:openconfig-version\s+"([^"]+)"', xml)
+        if mobj:
+            logger.debug("[Caps] Found version %s for %s", mobj.group(1), mod)
+            return True, mobj.group(1)
+        return True, None
+
+    def invalidate_oc_caps(self, ip: str = None) -> int:
+        """Forgets cached capabilities for ip (or every device) so the next use re-reads them"""
+        if ip:
+            self._oc_caps_cache.pop(ip, None)
+            self._oc_schema_retry = {k: v for k, v in self._oc_schema_retry.items() if k[0] != ip}
+        else:
+            self._oc_caps_cache.clear()
+            self._oc_schema_retry.clear()
+        return self._caps_store.invalidate(ip)
 
     def _render_payload(self, short_name: str, **kwargs) -> str:
-        ip = kwargs.get("ip", self.ipA)
-        module = "openconfig-platform"
+        name = self._payload_name(short_name, kwargs.get("ip", self.ipA))
+        return self.payloads.render(name=name, **kwargs)
+
+    def _render_json(self, short_name: str, **kwargs):
+        """JSON payload as Python objects, built without a text render/parse cycle"""
+        name = self._payload_name(short_name, kwargs.get("ip", self.ipA))
+        return self.payloads.render_json(name=name, **kwargs)
+
+    def _payload_name(self, short_name: str, ip: str) -> str:
+        """Stored payload to use for short_name on ip: module@version specific, else common"""
+        module = PAYLOAD_MODULES.get(short_name, "openconfig-platform")
+        self._ensure_oc_caps(ip)
+        if module not in self._oc_caps_cache[ip]:
+            # Device does not advertise the module; approximate from the platform module as before
+            module = "openconfig-platform"
         ver = self._get_oc_version(module, ip)
         rev = self._get_oc_revision(module, ip)
         logger.info("[Payload] Rendering payload '%s'", short_name)
@@ -189,7 +342,7 @@ class ConcreteIPSDNCController(IPSDNCController):
         if short_name in ("set_power_and_frequency", "read_target_output_power"):
             key = (module, ver or rev)
             if key not in getattr(self, "_logged_revisions", set()):
-                tag = self.oc_lookup.get_tag_for_version(ver) if ver else None
+                tag = self.oc_lookup.get_tag_for_version(ver, module) if ver else None
                 if ver:
                     if tag:
                         logger.info(
@@ -214,15 +367,40 @@ class ConcreteIPSDNCController(IPSDNCController):
                     )
                 self._logged_revisions.add(key)
 
-        logger.debug("[Payload] Falling back to common.%s", short_name)
-        return self.payloads.render(name=f"common.{short_name}", **kwargs)
+        if ver:
+            # Exact payload for the module version the device runs, when one is stored
+            name = f"{module}@{ver}.{short_name}"
+            try:
+                self.payloads.compiled(name=name)
+                return name
+            except PayloadNotFound:
+                pass
 
-    def _render_json(self, short_name: str):
-        raw = self._render_payload(short_name)
-        logger.debug("[Payload] JSON render for %s: %s chars", short_name, len(raw))
-        return json.loads(raw)
+        logger.debug("[Payload] Falling back to common.%s", short_name)
+        return f"common.{short_name}"
 
     def _connect(self, ip: str):
+        """Leases a pooled NETCONF session for ip; use as `with self._connect(ip) as m`"""
+        u, _p = self._credA if ip == self.ipA else self._credB
+        return self._pool.session((ip, 830, u), lambda: self._open_session(ip))
+
+    @contextmanager
+    def _locked_session(self, ip: str, target: str = "candidate"):
+        """
+        Pooled session for configuring ip: the device lock is taken before the
+        session is leased (so waiters do not hold sessions), then the NETCONF
+        datastore lock when enabled
+        """
+        with self._device_locks.lock(ip), self._connect(ip) as m, self._device_locks.datastore(m, target):
+            yield m
+
+    def device_lock_stats(self) -> dict:
+        return self._device_locks.stats()
+
+    def session_pool_stats(self) -> dict:
+        return self._pool.stats()
+
+    def _open_session(self, ip: str):
         u, p = self._credA if ip == self.ipA else self._credB
         if getattr(self, "jump_host", None):
             logger.info("[Connect] Using jump host %s -> %s", self.jump_host, ip)
@@ -239,44 +417,237 @@ class ConcreteIPSDNCController(IPSDNCController):
 
     def _parse_target_output_power(self, xml: str):
         try:
-            node = ET.fromstring(xml).find(".//td:target-output-power", TD_NS)
+            text = next((t for _name, t in self._iter_target_output_power(xml) if t is not None), None)
         except Exception as e:
             logger.error("[Parse] Error parsing target-output-power: %s", e)
             return None, f"parse error: {e}"
-        if node is None or node.text is None:
+        if text is None:
             return None, "target-output-power not found"
         try:
-            return float(node.text), None
+            return float(text), None
         except Exception:
-            logger.error("[Parse] Invalid target-output-power '%s'", node.text)
-            return None, f"invalid target-output-power '{node.text}'"
+            logger.error("[Parse] Invalid target-output-power '%s'", text)
+            return None, f"invalid target-output-power '{text}'"
+
+    @staticmethod
+    def _iter_target_output_power(xml: str, chunk: int = 65536):
+        """
+        Streams a get-config reply and yields (component name, target-output-power
+        text) per terminal-device power leaf. Each <component> is handled and
+        cleared as soon as it is complete, so large replies are never held as
+        a whole tree. Power leaves outside any component are yielded with no name.
+        """
+        parser = ET.XMLPullParser(events=("end",))
+        found, last = False, None
+        for i in range(0, len(xml), chunk):
+            parser.feed(xml[i:i + chunk])
+            for _event, el in parser.read_events():
+                last = el
+                if _local(el.tag) == "component":
+                    name = next((c.text for c in el if _local(c.tag) == "name"), None)
+                    for leaf in el.iter(TD_TARGET_OUTPUT_POWER):
+                        found = True
+                        yield (name or "").strip() or None, (leaf.text or "").strip() or None
+                    el.clear()
+        parser.close()
+        for _event, el in parser.read_events():
+            last = el
+        if not found and last is not None:
+            # Reply without component entries (the root element ends last)
+            for leaf in last.iter(TD_TARGET_OUTPUT_POWER):
+                yield None, (leaf.text or "").strip() or None
+
+    def _run_ends(self, fn, label: str):
+        """
+        Runs fn(ip) for the A and Z ends and returns [(ip, result, error)] in A, Z order.
+        Ends run in parallel when concurrent_ends is set; serial mode stops at the first failure.
+        """
+        ends = [self.ipA, self.ipB]
+        outcomes = []
+        if self.concurrent_ends and len(set(ends)) > 1:
+            with ThreadPoolExecutor(max_workers=len(ends), thread_name_prefix=f"et-{label}") as ex:
+                futures = [ex.submit(fn, ip) for ip in ends]
+            for ip, fut in zip(ends, futures):
+                err = fut.exception()
+                outcomes.append((ip, None if err else fut.result(), err))
+            return outcomes
+        for ip in ends:
+            try:
+                outcomes.append((ip, fn(ip), None))
+            except Exception as e:
+                outcomes.append((ip, None, e))
+                break
+        return outcomes
+
+    @staticmethod
+    def _raise_end_errors(outcomes, conf_log: list):
+        """Logs every failed end into conf_log, then re-raises the first failure (A before Z)"""
+        failed = [(ip, err) for ip, _res, err in outcomes if err is not None]
+        for ip, err in failed:
+            logger.error("[RPC] End %s failed: %s", ip, err)
+            conf_log.append(f"{ip}: failed: {err}")
+        if failed:
+            raise failed[0][1]
 
     def set_power_and_frequency(self, *, ip: str, component_name: str, frequency, tx_power) -> dict:
         logger.info("[RPC] set_power_and_frequency called on %s", ip)
-        xml = self._render_payload(
-            "set_power_and_frequency",
-            ip=ip, component_name=component_name,
-            frequency=frequency, target_output_power=tx_power,
+        self.set_power_and_frequency_batch(
+            ip=ip, changes=[{"component_name": component_name, "frequency": frequency, "tx_power": tx_power}]
         )
-        logger.debug("[RPC] XML payload length=%s", len(xml))
-        with self._connect(ip) as m:
-            m.edit_config(target="candidate", config=xml)
-            m.commit()
-        logger.info("[RPC] set_power_and_frequency applied successfully on %s", ip)
         return {"message": "Target output power and frequency changed successfully"}
 
+    def set_power_and_frequency_batch(self, *, ip: str, changes: List[dict], confirmed: bool = False,
+                                      confirm_timeout: int = 120) -> dict:
+        """
+        Applies several {"component_name", "frequency", "tx_power"} changes on ip
+        with one merged edit-config and one commit. With confirmed=True the
+        commit is a persistent confirmed commit: the device rolls it back after
+        confirm_timeout seconds unless confirm_commit(ip) is called first, and
+        no other confirmed commit is accepted on ip until then.
+        """
+        names = [c["component_name"] for c in changes]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate components in batch: {names}")
+        if not changes:
+            return {"message": "No changes", "components": []}
+        logger.info("[RPC] set_power_and_frequency_batch on %s: %s", ip, names)
+
+        payload = self._payload_name("set_power_and_frequency", ip)
+        docs = [self.payloads.render(name=payload, ip=ip, component_name=c["component_name"],
+                                     frequency=c["frequency"], target_output_power=c["tx_power"])
+                for c in changes]
+        if len(docs) == 1:
+            config = docs[0]
+        else:
+            merged = to_ele(docs[0])
+            for doc in docs[1:]:
+                _merge_xml(merged, to_ele(doc))
+            config = to_xml(merged)
+        logger.debug("[RPC] XML payload length=%s", len(config))
+
+        out = {"message": "Target output power and frequency changed successfully", "components": names}
+        with self._locked_session(ip, "candidate") as m:
+            if confirmed and _pending_confirm(ip) is not None:
+                # A second persist id would leave the first commit unconfirmable
+                raise RuntimeError(f"A confirmed commit is already pending on {ip}; confirm or cancel it first")
+            m.edit_config(target="candidate", config=config)
+            if confirmed:
+                token = uuid.uuid4().hex
+                m.commit(confirmed=True, timeout=str(int(confirm_timeout)), persist=token)
+                # Persist id: the confirming commit may come from another pooled session
+                with _pending_lock:
+                    _pending_confirms[ip] = {"persist_id": token,
+                                             "expires": time.monotonic() + int(confirm_timeout)}
+                out.update({"confirmed": False, "confirm_timeout": int(confirm_timeout)})
+            else:
+                m.commit()
+        logger.info("[RPC] set_power_and_frequency_batch applied on %s (%d components)", ip, len(names))
+        return out
+
+    def confirm_commit(self, ip: str) -> bool:
+        """Confirms the pending confirmed commit on ip; False if none is pending"""
+        if _pending_confirm(ip) is None:
+            return False
+        with self._locked_session(ip, "candidate") as m:
+            entry = _pending_confirm(ip)
+            if entry is None:
+                return False
+            try:
+                m.commit(persist_id=entry["persist_id"])
+            except RPCError:
+                # Rejected by the device (e.g. already rolled back): no longer pending
+                self._clear_pending(ip, entry)
+                raise
+            self._clear_pending(ip, entry)
+        logger.info("[RPC] Confirmed commit on %s", ip)
+        return True
+
+    def cancel_commit(self, ip: str) -> bool:
+        """Rolls back the pending confirmed commit on ip right away; False if none is pending"""
+        if _pending_confirm(ip) is None:
+            return False
+        with self._locked_session(ip, "candidate") as m:
+            entry = _pending_confirm(ip)
+            if entry is None:
+                return False
+            try:
+                m.cancel_commit(persist_id=entry["persist_id"])
+            except RPCError:
+                self._clear_pending(ip, entry)
+                raise
+            self._clear_pending(ip, entry)
+        logger.info("[RPC] Cancelled confirmed commit on %s", ip)
+        return True
+
+    @staticmethod
+    def _clear_pending(ip: str, entry: dict) -> None:
+        with _pending_lock:
+            if _pending_confirms.get(ip) is entry:
+                del _pending_confirms[ip]
+
+    @staticmethod
+    def pending_commits() -> dict:
+        """Devices with an unconfirmed confirmed commit and the seconds left before rollback"""
+        now = time.monotonic()
+        with _pending_lock:
+            return {ip: round(e["expires"] - now, 1) for ip, e in _pending_confirms.items() if e["expires"] > now}
+
     def read_target_output_power(self, *, ip: str, component_name: str) -> dict:
         logger.info("[RPC] read_target_output_power called on %s", ip)
-        flt = self._render_payload("read_target_output_power", component_name=component_name)
-        with self._connect(ip) as m:
-            xml = m.get_config(source="running", filter=("subtree", flt)).data_xml
-        val, err = self._parse_target_output_power(xml)
+        res = self.read_target_output_power_batch(ip=ip, component_names=[component_name])
+        err = res.get("errors", {}).get(component_name)
         if err:
             logger.warning("[RPC] Error reading target_output_power on %s: %s", ip, err)
             return {"error": err}
+        val = res["target_output_power"][component_name]
         logger.info("[RPC] target_output_power on %s = %s dBm", ip, val)
         return {"target_output_power": val}
 
+    def read_target_output_power_batch(self, *, ip: str, component_names: List[str]) -> dict:
+        """
+        Reads target-output-power for several components of ip with one merged
+        subtree filter and one get-config. Returns {"target_output_power":
+        {component: dBm}} plus {"errors": {component: reason}} for components
+        that could not be read.
+        """
+        names = list(dict.fromkeys(component_names))
+        if not names:
+            return {"target_output_power": {}}
+        payload = self._payload_name("read_target_output_power", ip)
+        filters = [self.payloads.render(name=payload, component_name=n) for n in names]
+        if len(filters) == 1:
+            flt = filters[0]
+        else:
+            merged = to_ele(filters[0])
+            for f in filters[1:]:
+                _merge_xml(merged, to_ele(f))
+            flt = to_xml(merged)
+        with self._connect(ip) as m:
+            xml = m.get_config(source="running", filter=("subtree", flt)).data_xml
+
+        powers, errors = {}, {}
+        try:
+            for comp, text in self._iter_target_output_power(xml):
+                # Replies without the key can only belong to a single requested component
+                comp = comp if comp is not None or len(names) > 1 else names[0]
+                if comp not in names or comp in powers or text is None:
+                    continue
+                try:
+                    powers[comp] = float(text)
+                except ValueError:
+                    errors[comp] = f"invalid target-output-power '{text}'"
+        except ET.ParseError as e:
+            logger.error("[Parse] Error parsing target-output-power: %s", e)
+            return {"target_output_power": {}, "errors": {n: f"parse error: {e}" for n in names}}
+        for n in names:
+            if n not in powers and n not in errors:
+                errors[n] = "target-output-power not found"
+        out = {"target_output_power": powers}
+        if errors:
+            out["errors"] = errors
+        logger.info("[RPC] target_output_power on %s: %s", ip, powers)
+        return out
+
     def end_terminal_performance_info_request(self):
         try:
             logger.info("[RPC] End Terminal Performance Info Request")
@@ -319,14 +690,22 @@ class ConcreteIPSDNCController(IPSDNCController):
                 logger.debug("[RPC] Running pre_activate_B()")
                 self.pre_activate_B()
 
-            for ip in (self.ipA, self.ipB):
+            def activate(ip):
                 logger.info("[RPC] Activating end %s", ip)
-                res = self.set_power_and_frequency(ip=ip, component_name=comp, frequency=freq, tx_power=pwr)
-                ok_ops.append(ip)
-                conf_log.append(f"{ip}: power+freq set")
+                return self.set_power_and_frequency(ip=ip, component_name=comp, frequency=freq, tx_power=pwr)
 
-            rA = self.read_target_output_power(ip=self.ipA, component_name=comp)
-            rB = self.read_target_output_power(ip=self.ipB, component_name=comp)
+            configured = self._run_ends(activate, "activate")
+            for ip, _res, err in configured:
+                if err is None:
+                    ok_ops.append(ip)
+                    conf_log.append(f"{ip}: power+freq set")
+            self._raise_end_errors(configured, conf_log)
+
+            readback = self._run_ends(
+                lambda ip: self.read_target_output_power(ip=ip, component_name=comp), "readback"
+            )
+            self._raise_end_errors(readback, conf_log)
+            rA, rB = (res or {} for _ip, res, _err in readback)
             rbA, rbB = rA.get("target_output_power"), rB.get("target_output_power")
             logger.info("[RPC] Activation readback A=%s dBm, Z=%s dBm", rbA, rbB)
             conf_log.append(f"{self.ipA}: {rbA} dBm")
@@ -369,11 +748,16 @@ class ConcreteIPSDNCController(IPSDNCController):
                 rid = f"deact-{int(time.time())}"
                 logger.warning("[RPC] No rid in payload, generated=%s", rid)
 
-            for ip in (self.ipA, self.ipB):
+            def deactivate(ip):
                 logger.info("[RPC] Deactivating end %s", ip)
-                res = self.set_power_and_frequency(ip=ip, component_name=comp, frequency=freq, tx_power=pwr)
-                ok_ops.append(ip)
-                conf_log.append(f"{ip}: power+freq set")
+                return self.set_power_and_frequency(ip=ip, component_name=comp, frequency=freq, tx_power=pwr)
+
+            configured = self._run_ends(deactivate, "deactivate")
+            for ip, _res, err in configured:
+                if err is None:
+                    ok_ops.append(ip)
+                    conf_log.append(f"{ip}: power+freq set")
+            self._raise_end_errors(configured, conf_log)
 
             logger.info("[RPC] Deactivation completed for A and Z")
             return jsonify(
@@ -416,12 +800,12 @@ class vendorCController(ConcreteIPSDNCController):
     def _measurement_on(self, ip: str):
         logger.info("[Hook] Measurement ON at %s", ip)
         xml = self._render_payload("measurement_enable")
-        with self._connect(ip) as m:
+        with self._locked_session(ip, "running") as m:
             m.edit_config(target="running", config=xml); m.commit()
     def _measurement_off(self, ip: str):
         logger.info("[Hook] Measurement OFF at %s", ip)
         xml = self._render_payload("measurement_disable")
-        with self._connect(ip) as m:
+        with self._locked_session(ip, "running") as m:
             m.edit_config(target="running", config=xml); m.commit()
 
 
@@ -432,36 +816,19 @@ class vendorBController(ConcreteIPSDNCController):
         if not (self.jump_host and self.jump_user and self.jump_pass):
             raise RuntimeError("Jump host credentials missing for vendorB")
 
-    def _alloc_port(self) -> int:
-        s = socket.socket(); s.bind(("", 0)); port = s.getsockname()[1]; s.close()
-        logger.debug("[vendorB] Allocated local port %s for tunnel", port)
-        return port
+    @property
+    def _tunnels(self):
+        return get_tunnel_manager()
 
     def _ensure_tunnel(self, dst_host: str, dst_port: int = 830) -> int:
-        logger.info("[vendorB] Establishing tunnel to %s:%s via jump %s", dst_host, dst_port, self.jump_host)
-        local_port = self._alloc_port()
-        cmd = (
-            "sshpass -p '{pwd}' ssh "
-            "-p {jprt} "
-            "-o LogLevel=ERROR "
-            "-o StrictHostKeyChecking=no "
-            "-o UserKnownHostsFile=/dev/null "
-            "-o GlobalKnownHostsFile=/dev/null "
-            "-o PreferredAuthentications=password "
-            "-o PubkeyAuthentication=no "
-            "-o ExitOnForwardFailure=yes "
-            "-f -N -L {lp}:{dst}:{dpt} {usr}@{host}"
-        ).format(
-            pwd=self.jump_pass, jprt=getattr(self, "jump_port", 22), lp=local_port,
-            dst=dst_host, dpt=dst_port, usr=self.jump_user, host=self.jump_host
+        """Returns the local port of the shared jump-host forward to dst_host:dst_port"""
+        return self._tunnels.ensure(
+            jump_host=self.jump_host, jump_port=getattr(self, "jump_port", 22),
+            jump_user=self.jump_user, jump_pass=self.jump_pass,
+            dst_host=dst_host, dst_port=dst_port,
         )
 
-        subprocess.run(cmd, shell=True, check=True)
-        time.sleep(1.0)
-        # logger.info("[vendorB] Tunnel ready on local port %s", local_port)
-        return local_port
-
-    def _connect(self, ip: str):
+    def _open_session(self, ip: str):
         logger.info("[vendorB] Connecting through tunnel to %s", ip)
         lp = self._ensure_tunnel(ip, 830)
         u, p = self._credA if ip == self.ipA else self._credB
@@ -1,14 +1,25 @@
 # controllers/base_rnc.py
-import os, time, json, logging, requests, paramiko, xml.etree.ElementTree as ET
-from queue import Empty
-from flask import jsonify, Response
+import os, time, json, uuid, atexit, logging, threading, requests, xml.etree.ElementTree as ET
+from concurrent.futures import TimeoutError as NotificationTimeout
+from urllib.parse import quote
+from flask import jsonify, request, Response
 from controllers.rnc import RNCController
+from infra.registry import get_registry
+from infra.transport.restconf import RestconfClient
+from infra.transport.ssh_forward import LocalPortForwarder
+from kafka_notif.dispatcher import correlation_keys
 from utility.utils import safe_extract_data
 
 logger = logging.getLogger(__name__)
 
 JSON_HEADERS = {"Content-Type":"application/json"}
 
+# Service list -> (list key leaf, leaves read back after a create via RESTCONF fields=)
+SERVICE_LISTS = {
+    "temp-service-list": ("common-id", ("common-id", "operational-state", "administrative-state", "lifecycle-state")),
+    "service-list": ("service-name", ("service-name", "operational-state", "administrative-state", "lifecycle-state")),
+}
+
 class ConcreteRNCController(RNCController):
     def __init__(self, config):
         super().__init__(config)
@@ -16,12 +27,23 @@ class ConcreteRNCController(RNCController):
         missing = [k for k in required if k not in self.config or not self.config[k]]
         if missing:
             raise ValueError(f"rnc.conf missing keys: {', '.join(missing)}")
-        self._session = requests.Session()
-        self._session.auth = (self.config["rest_user"], self.config["rest_pass"])
-        self._session.headers.update({"Content-Type":"application/json","Accept":"application/json"})
         self._connect_timeout  = int(self.config.get("connect_timeout", 5))
         self._timeout          = int(self.config.get("timeout", 60))
         self._timeout_heavy    = int(self.config.get("timeout_heavy", 180))
+        self._notif_timeout    = float(self.config.get("notification_timeout", 120))
+        # Shared RESTCONF connection pool (async engine when httpx is installed)
+        self._session = RestconfClient(
+            auth=(self.config["rest_user"], self.config["rest_pass"]),
+            headers={"Content-Type":"application/json","Accept":"application/json"},
+            engine=self.config.get("restconf_engine", "auto"),
+            pool_size=int(self.config.get("restconf_pool_size", 8)),
+            keepalive_expiry=float(self.config.get("restconf_keepalive_expiry", 30)),
+            http2=bool(self.config.get("restconf_http2", False)),
+            default_timeout=(self._connect_timeout, self._timeout),
+        )
+        atexit.register(self._session.close)
+        self._forwarder = None
+        self._forwarder_lock = threading.Lock()
         logger.info(
             "RNC timeouts set",
             extra={"connect": self._connect_timeout, "quick": self._timeout, "heavy": self._timeout_heavy}
@@ -35,6 +57,58 @@ class ConcreteRNCController(RNCController):
     def _t_heavy(self):
         return (self._connect_timeout, self._timeout_heavy)
 
+    def restconf_stats(self):
+        return self._session.stats()
+
+    def _render_json(self, name: str, **vars):
+        """TPCE request body as Python objects, built from the stored JSON payload template"""
+        return get_registry().payloads.render_json(name=name, **vars)
+
+    @staticmethod
+    def _service_vars():
+        """
+        Template variables for the service in the current request body:
+        service_name, common_id (defaults to the service name), request_id
+        (generated when absent), frequency, and the a-end / z-end leaves as
+        a_<leaf> / z_<leaf> (a bare string is the node id: a_node_id)
+        """
+        body = request.get_json(silent=True) or {}
+        vars = {"request_id": body.get("request-id") or uuid.uuid4().hex}
+        name = body.get("service-name")
+        if name:
+            vars["service_name"] = name
+        if body.get("common-id") or name:
+            vars["common_id"] = body.get("common-id") or name
+        if body.get("frequency") is not None:
+            vars["frequency"] = body["frequency"]
+        for end, prefix in (("a-end", "a"), ("z-end", "z")):
+            ep = body.get(end)
+            if isinstance(ep, dict):
+                vars.update({f"{prefix}_{k.replace('-', '_')}": v for k, v in ep.items()
+                             if not isinstance(v, (dict, list))})
+            elif ep:
+                vars[f"{prefix}_node_id"] = ep
+        return vars
+
+    def _service_payload(self, name: str):
+        """
+        The named payload rendered for the requested service. Fails when the request
+        names a service the stored payload does not carry, rather than sending
+        the payload's fixed service to TPCE.
+        """
+        vars = self._service_vars()
+        payload = self._render_json(name, **vars)
+        checks = {"service-name": vars.get("service_name")}
+        if (request.get_json(silent=True) or {}).get("common-id") or self._find_leaf(payload, "service-name") is None:
+            # common-id keys temporary services; elsewhere only when the request sets it
+            checks["common-id"] = vars.get("common_id")
+        for leaf, want in checks.items():
+            have = self._find_leaf(payload, leaf)
+            if want is not None and have is not None and have != str(want):
+                raise ValueError(f"Payload {name} carries {leaf} '{have}', not the requested '{want}' "
+                                 f"(the stored payload needs a {leaf.replace('-', '_')} placeholder)")
+        return payload
+
     def _resp_to_dict(self, resp):
         if isinstance(resp, tuple):
             resp = resp[0]
@@ -86,36 +160,95 @@ class ConcreteRNCController(RNCController):
         return f"http://127.0.0.1:{port}"
 
     def _ensure_tunnel(self):
-        """No-op in direct mode. In tunnel mode, establish/refresh SSH port forward."""
+        """No-op in direct mode. In tunnel mode, ensure the shared SSH port forward is up."""
         mode = (self.config.get("mode") or "tunnel").lower()
         if mode == "direct":
             return None  # nothing to do
 
-        tpce_host = self.config["host"]
-        tpce_port = int(self.config.get("ssh_port", 22))
-        tpce_user = self.config.get("username")
-        tpce_pass = self.config.get("password")
-        local_port = int(self.config.get("local_port", 8181))
-        remote_rest = int(self.config.get("restconf_port", 8181))
-
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        # One long-lived SSH transport + local listener shared by every REST call
+        with self._forwarder_lock:
+            if self._forwarder is None:
+                self._forwarder = LocalPortForwarder(
+                    ssh_host=self.config["host"],
+                    ssh_port=int(self.config.get("ssh_port", 22)),
+                    username=self.config.get("username"),
+                    password=self.config.get("password"),
+                    remote_host=self.config["host"],
+                    remote_port=int(self.config.get("restconf_port", 8181)),
+                    local_port=int(self.config.get("local_port", 8181)),
+                    keepalive=int(self.config.get("ssh_keepalive", 30)),
+                )
+                atexit.register(self._forwarder.close)
+        return self._forwarder.ensure()
+
+    # -------- Kafka notification helpers --------
+    def _expect_notification(self, payload):
+        """Registers for the Kafka notification correlated with payload; call before sending it"""
+        from kafka_notif.NBInotif import notification_dispatcher
+        # The wait only starts after the POST returns, so the registration must outlive
+        # both; _cancel_notification removes it as soon as the caller is done
+        expiry = self._connect_timeout + self._timeout + self._notif_timeout + 30
+        keys = correlation_keys(payload)
+        if notification_dispatcher.pending_with(keys):
+            logger.warning(f"Another workflow waits for a notification with the same keys {sorted(keys)}; "
+                           "the stored payload needs per-request service_name / request_id placeholders")
+        return notification_dispatcher.expect(keys, timeout=expiry)
+
+    def _await_notification(self, waiter):
+        """Returns the raw notification for waiter, or None on timeout"""
         try:
-            ssh.connect(tpce_host, tpce_port, tpce_user, tpce_pass, timeout=10)
-        except paramiko.AuthenticationException:
-            logger.error("Authentication failed (SSH to TPCE). Check username/password.")
-            raise
-        except Exception:
-            logger.exception("SSH connect error")
-            raise
-
-        transport = ssh.get_transport()
-        transport.open_channel(
-            "direct-tcpip",
-            (tpce_host, remote_rest),   # remote destination
-            ("127.0.0.1", local_port),  # local origin
-        )
-        return ssh  # caller may ignore, GC will close when object dies
+            return waiter.result(timeout=self._notif_timeout).raw
+        except NotificationTimeout:
+            return None
+
+    def _cancel_notification(self, waiter):
+        from kafka_notif.NBInotif import notification_dispatcher
+        notification_dispatcher.cancel(waiter)
+
+    # -------- Targeted reads --------
+    @staticmethod
+    def _find_leaf(payload, leaf):
+        """First value of leaf (with or without module prefix) in a request payload"""
+        stack = [payload]
+        while stack:
+            cur = stack.pop(0)
+            if isinstance(cur, dict):
+                for k, v in cur.items():
+                    if isinstance(v, (dict, list)):
+                        stack.append(v)
+                    elif k.rsplit(":", 1)[-1] == leaf and v not in (None, ""):
+                        return str(v)
+            elif isinstance(cur, list):
+                stack.extend(cur)
+        return None
+
+    def _service_summary(self, list_name, payload):
+        """
+        Compact state of the service created by payload: one keyed GET of its
+        list entry restricted to a few leaves, instead of the whole list
+        """
+        key_leaf, fields = SERVICE_LISTS[list_name]
+        key = self._find_leaf(payload, key_leaf)
+        if key is None:
+            logger.warning(f"No {key_leaf} in request payload, skipping {list_name} read")
+            return {"list": list_name, "error": f"no {key_leaf} in request"}
+        url = (f"{self._rest_base()}/rests/data/org-openroadm-service:{list_name}"
+               f"/services={quote(key, safe='')}")
+        try:
+            r = self._session.get(url, params={"fields": ";".join(fields)}, timeout=self._t_quick)
+            if r.status_code == 400:
+                # Server without fields= support; still a single entry, limited in depth
+                r = self._session.get(url, params={"depth": "2"}, timeout=self._t_quick)
+            if r.status_code == 404:
+                return {"list": list_name, key_leaf: key, "present": False}
+            r.raise_for_status()
+            entries = next((v for v in r.json().values() if isinstance(v, list)), None) or [{}]
+            summary = {"list": list_name, key_leaf: key, "present": True}
+            summary.update({f: entries[0].get(f) for f in fields if f != key_leaf})
+            return summary
+        except Exception as e:
+            logger.error(f"Reading {list_name} entry {key} failed: {e}")
+            return {"list": list_name, key_leaf: key, "error": str(e)}
 
     # -------- RNC operations --------
     def temp_service_create(self):
@@ -127,31 +260,34 @@ class ConcreteRNCController(RNCController):
             base = self._rest_base()
             url = f"{base}/rests/operations/org-openroadm-service:temp-service-create"
 
-            payload = self._render_json("IC_SRG1_PP1.temp_service_create")
-
-            r = self._session.post(url, json=payload, timeout=self._timeout)
-            r.raise_for_status()
-            data = r.json()
-            msg = data.get("org-openroadm-service:output", {}) \
-                      .get("configuration-response-common", {}) \
-                      .get("response-message")
-            logger.info(f"Temporary Service creation response: {msg}")
-            tpce_log.append(msg)
+            payload = self._service_payload("IC_SRG1_PP1.temp_service_create")
 
+            waiter = self._expect_notification(payload)
             try:
-                from kafka_notif.NBInotif import message_queue
-                kafka_message = message_queue.get(timeout=120)
+                r = self._session.post(url, json=payload, timeout=self._timeout)
+                r.raise_for_status()
+                data = r.json()
+                msg = data.get("org-openroadm-service:output", {}) \
+                          .get("configuration-response-common", {}) \
+                          .get("response-message")
+                logger.info(f"Temporary Service creation response: {msg}")
+                tpce_log.append(msg)
+
+                kafka_message = self._await_notification(waiter)
+            finally:
+                self._cancel_notification(waiter)
+
+            if kafka_message is not None:
                 logger.info(f"Kafka message received: {kafka_message}")
                 tpce_log.append(f"Kafka: {kafka_message}")
-            except Empty:
+            else:
                 logger.error("Timeout waiting for Kafka message.")
                 tpce_log.append("Timeout waiting for Kafka message.")
 
-            logger.info("Checking for updated temporary service list...")
-            temp_list_resp = self.temp_service_list()
-            temp_list_resp_data = self._resp_to_dict(temp_list_resp)
-            logger.info(f"Updated temp service list: {temp_list_resp_data}")
-            tpce_log.append(temp_list_resp_data)
+            logger.info("Reading back the temporary service...")
+            summary = self._service_summary("temp-service-list", payload)
+            logger.info(f"Temporary service state: {summary}")
+            tpce_log.append(summary)
 
             return jsonify({"create_temp_service_response": data, "tpce_log": tpce_log})
 
@@ -188,9 +324,9 @@ class ConcreteRNCController(RNCController):
             self._ensure_tunnel()
             base = self._rest_base()
             url = f"{base}/rests/operations/transportpce-olm:service-power-setup"
-            payload = (self._render_json("IC_SRG1_PP1.end_terminal_power_control_A")
+            payload = (self._service_payload("IC_SRG1_PP1.end_terminal_power_control_A")
                     if which == "A"
-                    else self._render_json("IC_SRG1_PP1.end_terminal_power_control_B"))
+                    else self._service_payload("IC_SRG1_PP1.end_terminal_power_control_B"))
             r = self._session.post(url, json=payload, timeout=self._t_heavy)
             r.raise_for_status()
             return jsonify(r.json())
@@ -208,29 +344,34 @@ class ConcreteRNCController(RNCController):
             self._ensure_tunnel()
             base = self._rest_base()
             url = f"{base}/rests/operations/org-openroadm-service:service-create"
-            r = self._session.post(url, json=self._render_json("IC_SRG1_PP1.service_create"), timeout=self._timeout)
-            r.raise_for_status()
-            data = r.json()
-            msg = data.get("org-openroadm-service:output", {}) \
-                      .get("configuration-response-common", {}) \
-                      .get("response-message")
-            logger.info(f"Service creation response: {msg}")
-            tpce_log.append(msg)
+            payload = self._service_payload("IC_SRG1_PP1.service_create")
 
+            waiter = self._expect_notification(payload)
             try:
-                from kafka_notif.NBInotif import message_queue
-                kafka_message = message_queue.get(timeout=120)
+                r = self._session.post(url, json=payload, timeout=self._timeout)
+                r.raise_for_status()
+                data = r.json()
+                msg = data.get("org-openroadm-service:output", {}) \
+                          .get("configuration-response-common", {}) \
+                          .get("response-message")
+                logger.info(f"Service creation response: {msg}")
+                tpce_log.append(msg)
+
+                kafka_message = self._await_notification(waiter)
+            finally:
+                self._cancel_notification(waiter)
+
+            if kafka_message is not None:
                 logger.info(f"Kafka message received: {kafka_message}")
                 tpce_log.append(f"Kafka notification: {kafka_message}")
-            except Empty:
+            else:
                 logger.error("Timeout waiting for Kafka message.")
                 tpce_log.append("Timeout waiting for Kafka message.")
 
-            logger.info("Checking for updated service list...")
-            svc_list_resp = self.service_list()
-            svc_list_resp_data = self._resp_to_dict(svc_list_resp)
-            tpce_log.append(svc_list_resp_data)
-            logger.info(f"Updated service list: {svc_list_resp_data}")
+            logger.info("Reading back the service...")
+            summary = self._service_summary("service-list", payload)
+            tpce_log.append(summary)
+            logger.info(f"Service state: {summary}")
 
             return jsonify({"create_service_response": data, "tpce_log": tpce_log})
 
@@ -262,7 +403,7 @@ class ConcreteRNCController(RNCController):
             self._ensure_tunnel()
             base = self._rest_base()
             url = f"{base}/rests/operations/org-openroadm-service:temp-service-delete"
-            r = self._session.post(url, json=self._render_json("IC_SRG1_PP1.optical_tunnel_request_cancel"), timeout=self._timeout)
+            r = self._session.post(url, json=self._service_payload("IC_SRG1_PP1.optical_tunnel_request_cancel"), timeout=self._timeout)
             r.raise_for_status()
             return jsonify(safe_extract_data(r.json()))
         except requests.HTTPError as e:
@@ -279,7 +420,7 @@ class ConcreteRNCController(RNCController):
             self._ensure_tunnel()
             base = self._rest_base()
             url = f"{base}/rests/operations/org-openroadm-service:service-delete"
-            r = self._session.post(url, json=self._render_json("IC_SRG1_PP1.service_delete"), timeout=self._timeout)
+            r = self._session.post(url, json=self._service_payload("IC_SRG1_PP1.service_delete"), timeout=self._timeout)
             r.raise_for_status()
             data = safe_extract_data(r.json())
 
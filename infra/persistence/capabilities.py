@@ -0,0 +1,84 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class CapabilityCache:
+    """
+    Mongo-backed cache of the OpenConfig modules a device advertises, shared
+    across processes and restarts.
+
+    Entries are keyed by (device, capability-set hash): a device that comes
+    back with a different <hello> simply misses. A TTL index expires entries
+    after ttl_seconds; invalidate() drops them explicitly. Mongo errors are
+    logged and treated as cache misses so a database outage never blocks
+    controller start-up.
+    """
+
+    def __init__(self, mongo_url: str, db_name: str = "nova_database", coll: str = "device_capabilities",
+                 ttl_seconds: int = 86400, client: Optional[MongoClient] = None) -> None:
+        self._client = client or MongoClient(mongo_url)
+        self._col = self._client[db_name][coll]
+        self.ttl_seconds = int(ttl_seconds)
+        self._ensure_indexes()
+
+    @staticmethod
+    def hash_capabilities(caps: Iterable[str]) -> str:
+        return hashlib.sha256("\n".join(sorted(caps)).encode("utf-8")).hexdigest()
+
+    def load(self, device: str, caps_hash: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Returns {module: {"revision": ..., "version": ...}} or None on a miss"""
+        try:
+            doc = self._col.find_one({"device": device, "caps_hash": caps_hash})
+        except PyMongoError as e:
+            logger.warning("[CapsCache] Lookup failed for %s: %s", device, e)
+            return None
+        if not doc:
+            return None
+        # The TTL monitor only runs once a minute; don't serve entries it hasn't reaped yet
+        if doc.get("updated_at") and doc["updated_at"] < datetime.utcnow() - timedelta(seconds=self.ttl_seconds):
+            return None
+        return {m["module"]: {k: v for k, v in m.items() if k != "module"} for m in doc.get("modules", [])}
+
+    def store(self, device: str, caps_hash: str, modules: Dict[str, Dict[str, Any]]) -> None:
+        # Modules are stored as a list: YANG module names may legally contain '.'
+        entries = [{"module": name, **fields} for name, fields in modules.items()]
+        try:
+            self._col.update_one(
+                {"device": device, "caps_hash": caps_hash},
+                {"$set": {"modules": entries, "updated_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            logger.warning("[CapsCache] Could not persist capabilities for %s: %s", device, e)
+
+    def invalidate(self, device: Optional[str] = None) -> int:
+        """Drops cached capabilities for one device, or for every device when None"""
+        try:
+            res = self._col.delete_many({"device": device} if device else {})
+        except PyMongoError as e:
+            logger.warning("[CapsCache] Invalidation failed for %s: %s", device or "all devices", e)
+            return 0
+        logger.info("[CapsCache] Invalidated %d entr(y/ies) for %s", res.deleted_count, device or "all devices")
+        return res.deleted_count
+
+    def _ensure_indexes(self) -> None:
+        try:
+            self._col.create_index([("device", ASCENDING), ("caps_hash", ASCENDING)], unique=True)
+            try:
+                self._col.create_index("updated_at", expireAfterSeconds=self.ttl_seconds)
+            except OperationFailure:
+                # TTL changed in config: update the existing index in place
+                self._col.database.command(
+                    "collMod", self._col.name,
+                    index={"keyPattern": {"updated_at": 1}, "expireAfterSeconds": self.ttl_seconds},
+                )
+        except PyMongoError as e:
+            logger.warning("[CapsCache] Could not ensure indexes: %s", e)
+
@@ -1,36 +1,396 @@
-from typing import Optional, Tuple, Dict, Any
-from pymongo import MongoClient
-from string import Template
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict, Any, List
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+from infra.persistence.templates import CompiledPayload
+
+logger = logging.getLogger(__name__)
 
 class PayloadNotFound(KeyError):
     pass
 
 class PayloadRepository:
-    def __init__(self, mongo_url: str, db_name: str = "nova_database", coll: str = "payloads") -> None:
-        self._client = MongoClient(mongo_url)
+    """
+    Payload documents from Mongo, compiled once and cached in memory.
+
+    warm_up() loads the whole collection with a single cursor. The cache is an
+    LRU bounded by entry count and payload bytes; evicted payloads are fetched
+    again on demand. start_watching() keeps it current through a change stream,
+    or by polling the collection hash on servers without change streams
+    (standalone mongod). Edited payloads get a new revision, which also
+    retires their memoized renders.
+    """
+
+    def __init__(self, mongo_url: str, db_name: str = "nova_database", coll: str = "payloads",
+                 client: Optional[MongoClient] = None, render_cache_size: int = 256,
+                 max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024) -> None:
+        # Pass a shared client to avoid one connection pool per repository
+        self._client = client or MongoClient(mongo_url)
         self._col = self._client[db_name][coll]
-        self._cache: Dict[str, str] = {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._cache: "OrderedDict[str, CompiledPayload]" = OrderedDict()
+        self._cache_bytes = 0
+        # Mongo _id -> cache keys served by that document (for change events)
+        self._doc_keys: Dict[Any, set] = {}
+        self._key_doc: Dict[str, Any] = {}
+        # Keys known to be absent -> when that was recorded; entries expire
+        # after MISSING_TTL and are cleared whenever the collection changes
+        self._missing: Dict[str, float] = {}
+        self._revision = 0
+        # (payload key, revision, vars) -> rendered text
+        self._rendered: "OrderedDict[tuple, str]" = OrderedDict()
+        self.render_cache_size = render_cache_size
+        self._lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self._watching = False
+        self._stats = {"renders": 0, "hits": 0, "misses": 0, "compiles": 0,
+                       "render_ms_total": 0.0, "render_ms_max": 0.0,
+                       "json_renders": 0, "json_fallbacks": 0,
+                       "fetches": 0, "evictions": 0, "invalidations": 0, "reloads": 0}
 
     def get(self, name: Optional[str] = None, vendor: Optional[str] = None, action: Optional[str] = None) -> str:
+        return self.compiled(name=name, vendor=vendor, action=action).raw
+
+    def compiled(self, name: Optional[str] = None, vendor: Optional[str] = None,
+                 action: Optional[str] = None) -> CompiledPayload:
         cache_key = self._make_cache_key(name=name, vendor=vendor, action=action)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        payload, _doc = self._fetch_payload(name=name, vendor=vendor, action=action)
-        self._cache[cache_key] = payload
-        return payload
+        with self._lock:
+            hit = self._cache.get(cache_key)
+            if hit is not None:
+                self._cache.move_to_end(cache_key)
+                return hit
+            if self._known_missing(cache_key):
+                raise PayloadNotFound(f"Payload '{cache_key}' not found in Mongo")
+        try:
+            payload, doc = self._fetch_payload(name=name, vendor=vendor, action=action)
+        except PayloadNotFound:
+            with self._lock:
+                self._missing[cache_key] = time.monotonic()
+            raise
+        with self._lock:
+            self._stats["fetches"] += 1
+            return self._store(cache_key, payload, doc.get("_id"))
+
+    def get_many(self, names: List[str]) -> Dict[str, str]:
+        """
+        Raw payloads for several names, fetching every uncached one with a
+        single query. Names that do not resolve are left out of the result.
+        """
+        return {n: c.raw for n, c in self.compiled_many(names).items()}
+
+    def compiled_many(self, names: List[str]) -> Dict[str, CompiledPayload]:
+        out: Dict[str, CompiledPayload] = {}
+        todo: List[str] = []
+        with self._lock:
+            for n in names:
+                key = self._make_cache_key(name=n, vendor=None, action=None)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    out[n] = self._cache[key]
+                elif not self._known_missing(key):
+                    todo.append(n)
+        if not todo:
+            return out
+
+        clauses = [c for n in todo for c in self._lookup_clauses(n, None, None)]
+        docs = list(self._col.find({"$or": clauses}))
+        with self._lock:
+            self._stats["fetches"] += 1
+            for n in todo:
+                key = self._make_cache_key(name=n, vendor=None, action=None)
+                doc = self._best_match(docs, n, None, None)
+                try:
+                    if not doc:
+                        raise PayloadNotFound(n)
+                    out[n] = self._store(key, self._extract_payload_field(doc, default_key=n), doc.get("_id"))
+                except PayloadNotFound:
+                    self._missing[key] = time.monotonic()
+        return out
 
     def render(self, name: Optional[str] = None, vendor: Optional[str] = None,
                action: Optional[str] = None, **vars: Any) -> str:
-        raw = self.get(name=name, vendor=vendor, action=action)
-        if "${" in raw:
-            return Template(raw).safe_substitute({k: str(v) for k, v in vars.items()})
+        compiled = self.compiled(name=name, vendor=vendor, action=action)
+        t0 = time.perf_counter()
+        key = (compiled.key, compiled.revision, tuple(sorted((k, str(v)) for k, v in vars.items())))
+        with self._lock:
+            self._stats["renders"] += 1
+            hit = self._rendered.get(key)
+            if hit is not None:
+                self._rendered.move_to_end(key)
+                self._stats["hits"] += 1
+                return hit
+
+        rendered = compiled.render(vars)
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self._stats["misses"] += 1
+            self._stats["render_ms_total"] += elapsed_ms
+            self._stats["render_ms_max"] = max(self._stats["render_ms_max"], elapsed_ms)
+            if self.render_cache_size > 0:
+                self._rendered[key] = rendered
+                while len(self._rendered) > self.render_cache_size:
+                    self._rendered.popitem(last=False)
+        return rendered
+
+    def render_json(self, name: Optional[str] = None, vendor: Optional[str] = None,
+                    action: Optional[str] = None, **vars: Any) -> Any:
+        """
+        Rendered JSON payload as Python objects, built straight from the
+        payload's compiled JSON tree instead of rendering text and parsing it.
+        Results are fresh objects that callers may modify, so they are not memoized.
+        """
+        compiled = self.compiled(name=name, vendor=vendor, action=action)
+        structured = compiled.is_structured
+        with self._lock:
+            self._stats["json_renders"] += 1
+            if not structured:
+                self._stats["json_fallbacks"] += 1
+        return compiled.render_json(vars)
+
+    def stats(self) -> dict:
+        """Render cache hit rate, render latency and payload cache occupancy"""
+        with self._lock:
+            s = dict(self._stats)
+            s["rendered_entries"] = len(self._rendered)
+            s["payloads"] = len(self._cache)
+            s["payload_bytes"] = self._cache_bytes
+            styles: Dict[str, int] = {}
+            for c in self._cache.values():
+                styles[c.style] = styles.get(c.style, 0) + 1
+        total_ms = s.pop("render_ms_total")
+        s["render_ms_max"] = round(s["render_ms_max"], 3)
+        s["render_ms_avg"] = round(total_ms / s["misses"], 3) if s["misses"] else None
+        s["hit_ratio"] = round(s["hits"] / s["renders"], 3) if s["renders"] else None
+        s["styles"] = styles
+        s["watching"] = self._watching
+        return s
+
+    # ---- Indexes / bulk load / invalidation ------------------------------------
+
+    # name -> key spec for every lookup path used by _fetch_payload
+    INDEXES = {
+        "payload_name": [("name", ASCENDING)],
+        "payload_key": [("key", ASCENDING)],
+        "payload_vendor_action": [("vendor", ASCENDING), ("action", ASCENDING)],
+    }
+
+    def ensure_indexes(self) -> Dict[str, bool]:
+        """
+        Creates the lookup indexes if missing and reports, per index, whether
+        an index with that key pattern exists afterwards (under any name)
+        """
+        for name, keys in self.INDEXES.items():
+            try:
+                self._col.create_index(keys, name=name, background=True)
+            except OperationFailure as e:
+                # Same keys already indexed under another name/options
+                logger.debug("[Payloads] Index %s not created: %s", name, e)
+        existing = {tuple((f, int(d)) for f, d in spec["key"]) for spec in self._col.index_information().values()}
+        present = {name: tuple(keys) in existing for name, keys in self.INDEXES.items()}
+        missing = [n for n, ok in present.items() if not ok]
+        if missing:
+            logger.warning("[Payloads] Lookup indexes missing on %s: %s", self._col.full_name, ", ".join(missing))
+        else:
+            logger.info("[Payloads] Lookup indexes verified on %s", self._col.full_name)
+        return present
+
+    def warm_up(self, prune: bool = False) -> int:
+        """
+        Loads every payload document through one cursor (until the memory
+        bounds are reached) and returns the number of cache keys populated.
+        Unchanged payloads keep their compiled form; prune also drops cached
+        keys no document answers any more.
+        """
+        t0 = time.monotonic()
+        best: Dict[str, Tuple[int, str, Any]] = {}
+        for doc in self._col.find({}):
+            keys = self._doc_cache_keys(doc)
+            if not keys:
+                continue
+            try:
+                payload = self._extract_payload_field(doc, default_key=keys[0][0])
+            except PayloadNotFound:
+                continue
+            for key, prio in keys:
+                # name/key matches take precedence over vendor.action, as in _fetch_payload
+                if key not in best or prio < best[key][0]:
+                    best[key] = (prio, payload, doc["_id"])
+        with self._lock:
+            for key, (_prio, payload, doc_id) in best.items():
+                self._store(key, payload, doc_id)
+            if prune:
+                for key in [k for k in self._cache if k not in best]:
+                    self._evict(key)
+            self._missing.clear()
+            self._stats["reloads"] += 1
+        logger.info("[Payloads] Loaded %d payload(s) in %.0f ms", len(best), (time.monotonic() - t0) * 1000.0)
+        return len(best)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drops one cached payload (by cache key) or all of them"""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+                self._cache_bytes = 0
+                self._doc_keys.clear()
+                self._key_doc.clear()
+                self._rendered.clear()
+            else:
+                self._evict(key)
+            self._missing.clear()
+            self._stats["invalidations"] += 1
+
+    def start_watching(self, poll_interval: float = 30.0) -> None:
+        """
+        Keeps the cache in sync with the collection from a daemon thread:
+        change stream when available, otherwise polling every poll_interval
+        """
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._watching = True
+        self._watcher = threading.Thread(target=self._watch_loop, args=(poll_interval,),
+                                         name="payload-watch", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._watching = False
+
+    def _watch_loop(self, poll_interval: float) -> None:
+        while self._watching:
+            try:
+                with self._col.watch(full_document="updateLookup", max_await_time_ms=1000) as stream:
+                    logger.info("[Payloads] Watching %s for changes", self._col.full_name)
+                    while self._watching and stream.alive:
+                        change = stream.try_next()
+                        if change is not None:
+                            self._apply_change(change)
+            except OperationFailure as e:
+                # Change streams need a replica set or sharded cluster
+                logger.info("[Payloads] Change streams unavailable (%s); polling every %ss", e, poll_interval)
+                self._poll_loop(poll_interval)
+                return
+            except PyMongoError as e:
+                logger.warning("[Payloads] Change stream interrupted: %s; reloading", e)
+                time.sleep(poll_interval)
+                self._safe_reload()
+
+    def _poll_loop(self, poll_interval: float) -> None:
+        last = self._collection_version()
+        while self._watching:
+            time.sleep(poll_interval)
+            current = self._collection_version()
+            if current is None or current != last:
+                self._safe_reload()
+                last = current
+
+    def _collection_version(self) -> Optional[str]:
+        """Server-side hash of the collection, or None when the server will not compute one"""
+        try:
+            res = self._col.database.command("dbHash", collections=[self._col.name])
+            return res.get("collections", {}).get(self._col.name)
+        except PyMongoError:
+            return None
+
+    def _safe_reload(self) -> None:
         try:
-            return raw.format(**{k: str(v) for k, v in vars.items()})
-        except KeyError:
-            rendered = raw
-            for k, v in vars.items():
-                rendered = rendered.replace("{" + k + "}", str(v))
-            return rendered
+            self.warm_up(prune=True)
+        except PyMongoError as e:
+            logger.warning("[Payloads] Reload failed: %s", e)
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        op = change.get("operationType")
+        doc_id = (change.get("documentKey") or {}).get("_id")
+        with self._lock:
+            self._stats["invalidations"] += 1
+            self._missing.clear()
+            if op in ("drop", "rename", "dropDatabase", "invalidate"):
+                self.invalidate()
+                return
+            for key in list(self._doc_keys.get(doc_id, ())):
+                self._evict(key)
+            doc = change.get("fullDocument")
+            keys = self._doc_cache_keys(doc) if op in ("insert", "update", "replace") and doc else []
+            try:
+                payload = self._extract_payload_field(doc, default_key=keys[0][0]) if keys else None
+            except PayloadNotFound:
+                payload = None
+            for key, prio in keys:
+                if prio == 0 and payload is not None:
+                    self._store(key, payload, doc_id)
+                else:
+                    # vendor.action may be shadowed by another document's name; refetch lazily
+                    self._evict(key)
+        logger.info("[Payloads] Applied %s for document %s", op, doc_id)
+
+    # ---- Cache internals (call with _lock held) -------------------------------
+
+    def _store(self, key: str, payload: str, doc_id: Any) -> CompiledPayload:
+        old = self._cache.get(key)
+        if old is not None and old.raw == payload:
+            self._cache.move_to_end(key)
+            return old
+        if old is not None:
+            self._evict(key)
+        self._revision += 1
+        compiled = CompiledPayload(key, payload, revision=self._revision)
+        if len(payload) > self.max_bytes:
+            # Larger than the whole budget: serve it without caching
+            return compiled
+        self._cache[key] = compiled
+        self._cache_bytes += len(payload)
+        if doc_id is not None:
+            self._doc_keys.setdefault(doc_id, set()).add(key)
+            self._key_doc[key] = doc_id
+        self._stats["compiles"] += 1
+        while len(self._cache) > self.max_entries or self._cache_bytes > self.max_bytes:
+            lru = next(iter(self._cache))
+            self._evict(lru)
+            self._stats["evictions"] += 1
+        return compiled
+
+    def _evict(self, key: str) -> None:
+        old = self._cache.pop(key, None)
+        if old is None:
+            return
+        self._cache_bytes -= len(old.raw)
+        doc_id = self._key_doc.pop(key, None)
+        keys = self._doc_keys.get(doc_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._doc_keys[doc_id]
+        stale = [k for k in self._rendered if k[0] == key]
+        for k in stale:
+            del self._rendered[k]
+
+    def _doc_cache_keys(self, doc: Dict[str, Any]) -> List[Tuple[str, int]]:
+        """Cache keys a document answers, with precedence (0 = name/key, 1 = vendor.action)"""
+        keys = []
+        for field in ("name", "key"):
+            if isinstance(doc.get(field), str) and doc[field].strip():
+                keys.append((self._make_cache_key(name=doc[field], vendor=None, action=None), 0))
+        if isinstance(doc.get("vendor"), str) and isinstance(doc.get("action"), str):
+            keys.append((self._make_cache_key(name=None, vendor=doc["vendor"], action=doc["action"]), 1))
+        return keys
+
+    # Seconds a failed lookup is remembered; without a watcher nothing else
+    # would notice a payload inserted afterwards
+    MISSING_TTL = 30.0
+
+    def _known_missing(self, key: str) -> bool:
+        """Whether key recently failed to resolve (caller holds the lock)"""
+        at = self._missing.get(key)
+        if at is None:
+            return False
+        if time.monotonic() - at < self.MISSING_TTL:
+            return True
+        del self._missing[key]
+        return False
 
     def _make_cache_key(self, name: Optional[str], vendor: Optional[str], action: Optional[str]) -> str:
         if name: return name.lower().strip()
@@ -38,20 +398,51 @@ class PayloadRepository:
         raise PayloadNotFound("Provide either name='vendor.action' or vendor='x', action='y'")
 
     def _fetch_payload(self, name: Optional[str], vendor: Optional[str], action: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+        """One indexed query for every candidate document; the best match by precedence wins"""
+        if not name and not (vendor and action):
+            raise PayloadNotFound("Provide either name='vendor.action' or vendor/action pair")
+        label = name or f"{vendor}.{action}"
+        clauses = self._lookup_clauses(name, vendor, action)
+        docs = list(self._col.find({"$or": clauses}))
+        doc = self._best_match(docs, name, vendor, action)
+        if not doc:
+            raise PayloadNotFound(f"Payload '{label}' not found in Mongo")
+        return self._extract_payload_field(doc, default_key=label), doc
+
+    @staticmethod
+    def _lookup_clauses(name: Optional[str], vendor: Optional[str], action: Optional[str]) -> List[Dict[str, Any]]:
         if name:
-            q = {"$or": [{"name": name}, {"key": name}]}
-            doc = self._col.find_one(q) or (("." in name) and
-                    self._col.find_one({"vendor": name.split(".",1)[0], "action": name.split(".",1)[1]}))
-            if not doc:
-                raise PayloadNotFound(f"Payload '{name}' not found in Mongo")
-            return self._extract_payload_field(doc, default_key=name), doc
-        if vendor and action:
-            doc = self._col.find_one({"vendor": vendor, "action": action}) or \
-                  self._col.find_one({"key": f"{vendor}.{action}"})
-            if not doc:
-                raise PayloadNotFound(f"Payload '{vendor}.{action}' not found in Mongo")
-            return self._extract_payload_field(doc, default_key=f"{vendor}.{action}"), doc
-        raise PayloadNotFound("Provide either name='vendor.action' or vendor/action pair")
+            clauses = [{"name": name}, {"key": name}]
+            if "." in name:
+                v, a = name.split(".", 1)
+                clauses.append({"vendor": v, "action": a})
+            return clauses
+        return [{"vendor": vendor, "action": action}, {"key": f"{vendor}.{action}"}]
+
+    @staticmethod
+    def _rank(doc: Dict[str, Any], name: Optional[str], vendor: Optional[str], action: Optional[str]) -> Optional[int]:
+        """
+        Precedence of a candidate, lower is better (None = not a match):
+          by name:          name/key, then vendor+action from 'vendor.action'
+          by vendor/action: vendor+action, then key 'vendor.action'
+        """
+        if name:
+            if doc.get("name") == name or doc.get("key") == name:
+                return 0
+            v, _, a = name.partition(".")
+            return 1 if a and doc.get("vendor") == v and doc.get("action") == a else None
+        if doc.get("vendor") == vendor and doc.get("action") == action:
+            return 0
+        return 1 if doc.get("key") == f"{vendor}.{action}" else None
+
+    def _best_match(self, docs, name, vendor, action) -> Optional[Dict[str, Any]]:
+        best = None
+        for doc in docs:
+            rank = self._rank(doc, name, vendor, action)
+            # Strict comparison keeps the first (natural order) document on ties, like find_one
+            if rank is not None and (best is None or rank < best[0]):
+                best = (rank, doc)
+        return best[1] if best else None
 
     @staticmethod
     def _extract_payload_field(doc: Dict[str, Any], default_key: str) -> str:
@@ -59,6 +450,6 @@ class PayloadRepository:
             val = doc.get(field)
             if isinstance(val, str) and val.strip():
                 return val
-            if isinstance(val, dict):            
+            if isinstance(val, dict):
                 return json.dumps(val)
         raise PayloadNotFound(f"Document found for '{default_key}', but no payload/xml/content field was present")
@@ -0,0 +1,161 @@
+import json
+import re
+from string import Formatter, Template
+from typing import Any, Callable, Dict, FrozenSet, Mapping, Optional
+
+# Placeholders the replace style understands: {name}
+_BRACE_RE = re.compile(r"\{([A-Za-z_][\w-]*)\}")
+# Marks payloads whose raw text is not JSON until rendered (e.g. "x": {n})
+_NOT_JSON = object()
+
+
+def _const(value):
+    return lambda v: value
+
+
+def _fill(base, builders):
+    """
+    Builder copying the container base (constant entries shared, key order
+    kept) and setting the entries that have a builder
+    """
+    def build(v):
+        out = base.copy()
+        for k, b in builders:
+            out[k] = b(v)
+        return out
+    return build
+
+
+class CompiledPayload:
+    """
+    A payload parsed once into its substitution style and placeholder set.
+
+    template  ${name} placeholders, rendered with Template.safe_substitute
+    format    only plain {name} fields, rendered with str.format when every
+              field has a value
+    replace   anything else with braces (JSON bodies, partial variable sets):
+              the pre-split {name} tokens that have a value are joined in
+              one pass
+
+    Rendering matches the former PayloadRepository.render behaviour, which
+    chose the style on every call and fell back to one str.replace per variable.
+
+    render_json() parses a JSON payload once into a tree of builder closures
+    (dict and list nodes over constant leaves and placeholder strings, keys
+    or values, rendered in the payload's style). Each call walks it into
+    fresh objects, skipping the text render and json.loads. Payloads that
+    only become JSON after substitution are rendered as text and parsed.
+    """
+
+    __slots__ = ("key", "raw", "revision", "style", "placeholders", "_template", "_parts", "_json")
+
+    def __init__(self, key: str, raw: str, revision: int = 0, style: Optional[str] = None):
+        self.key = key
+        self.raw = raw
+        self.revision = revision
+        self._template = None
+        self._json = None
+        # raw split on {name} tokens: text, name, text, name, ..., text
+        self._parts = _BRACE_RE.split(raw)
+        if style == "replace":
+            self.style = "replace"
+            self.placeholders = frozenset(_BRACE_RE.findall(raw))
+        elif "${" in raw or style == "template":
+            self.style = "template"
+            self._template = Template(raw)
+            self.placeholders: FrozenSet[str] = frozenset(
+                m.group("named") or m.group("braced")
+                for m in self._template.pattern.finditer(raw)
+                if m.group("named") or m.group("braced")
+            )
+        else:
+            fields = self._format_fields(raw)
+            if fields is not None:
+                self.style = "format"
+                self.placeholders = fields
+            else:
+                self.style = "replace"
+                self.placeholders = frozenset(_BRACE_RE.findall(raw))
+
+    def render(self, vars: Mapping[str, Any]) -> str:
+        return self._substitute({k: str(v) for k, v in vars.items()})
+
+    def _substitute(self, values: Dict[str, str]) -> str:
+        if self.style == "template":
+            return self._template.safe_substitute(values)
+        if self.style == "format" and self.placeholders <= values.keys():
+            return self.raw.format(**values)
+        if len(self._parts) == 1:
+            return self.raw
+        parts = self._parts
+        out = [parts[0]]
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            out.append(values[name] if name in values else "{" + name + "}")
+            out.append(parts[i + 1])
+        return "".join(out)
+
+    def render_json(self, vars: Mapping[str, Any]) -> Any:
+        """Rendered payload as Python objects (fresh containers on every call)"""
+        builder = self._json_builder()
+        if builder is not _NOT_JSON:
+            try:
+                return builder({k: str(v) for k, v in vars.items()})
+            except RecursionError:
+                pass  # nested deeper than the walk allows
+        return json.loads(self.render(vars))
+
+    @property
+    def is_structured(self) -> bool:
+        return self._json_builder() is not _NOT_JSON
+
+    def _json_builder(self):
+        if self._json is None:
+            try:
+                doc = json.loads(self.raw)
+                self._json = self._json_node(doc) or _const(doc)
+            except (ValueError, RecursionError):
+                # Not JSON before substitution, or too deeply nested to walk
+                self._json = _NOT_JSON
+        return self._json
+
+    def _json_node(self, node) -> Optional[Callable[[Dict[str, str]], Any]]:
+        """
+        Builder for node: a function of the string variables returning a fresh
+        copy, or None for immutable constants (str, int, float, bool, None)
+        """
+        t = type(node)
+        if t is dict:
+            keys = [(k, self._json_node(k)) for k in node]
+            if any(kb is not None for _k, kb in keys):
+                # Placeholder in a key: rebuild every entry
+                items = [(kb or _const(k), self._json_node(val) or _const(val))
+                         for (k, kb), val in zip(keys, node.values())]
+                return lambda v: {kb(v): f(v) for kb, f in items}
+            return _fill(node, [(k, b) for k, b in ((k, self._json_node(val)) for k, val in node.items())
+                                if b is not None])
+        if t is list:
+            return _fill(node, [(i, b) for i, b in enumerate(self._json_node(val) for val in node)
+                                if b is not None])
+        if t is str and ("$" if self.style == "template" else "{") in node:
+            # Leaves keep the payload's style; a format leaf renders the same with the replace pass
+            leaf = CompiledPayload(self.key, node, self.revision,
+                                   style="template" if self.style == "template" else "replace")
+            return leaf._substitute
+        return None
+
+    @staticmethod
+    def _format_fields(raw: str):
+        """Field names if raw is a plain str.format template, else None"""
+        fields = set()
+        try:
+            for _text, name, spec, conv in Formatter().parse(raw):
+                if name is None:
+                    continue
+                if not name.isidentifier() or spec or conv:
+                    return None
+                fields.add(name)
+        except ValueError:
+            return None
+        return frozenset(fields)
+
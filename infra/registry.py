@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from pymongo import MongoClient
+
+from infra.persistence.capabilities import CapabilityCache
+from infra.persistence.repository import PayloadRepository
+from utility.oc_lookup import OpenConfigLookup
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """
+    Heavyweight, read-mostly objects shared by every vendor controller in the
+    process: one MongoClient, the PayloadRepository and CapabilityCache on top
+    of it, and the OpenConfigLookup catalog.
+
+    Each resource is built once, on first use or by warm_up(). Callers that
+    ask for a resource while it is being built wait for that build instead of
+    starting their own. A failed build is not cached; the next call retries.
+    """
+
+    def __init__(self, cfg: dict):
+        self.cfg = cfg
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._timings: Dict[str, float] = {}
+        self._factories: Dict[str, Callable] = {
+            "mongo": self._make_mongo,
+            "payloads": self._make_payloads,
+            "capabilities": self._make_capabilities,
+            "oc_lookup": self._make_oc_lookup,
+        }
+
+    @property
+    def mongo(self) -> MongoClient:
+        return self.get("mongo")
+
+    @property
+    def payloads(self) -> PayloadRepository:
+        return self.get("payloads")
+
+    @property
+    def capabilities(self) -> CapabilityCache:
+        return self.get("capabilities")
+
+    @property
+    def oc_lookup(self) -> OpenConfigLookup:
+        return self.get("oc_lookup")
+
+    def get(self, name: str):
+        with self._lock:
+            fut = self._futures.get(name)
+            owner = fut is None
+            if owner:
+                fut = self._futures[name] = Future()
+        if owner:
+            t0 = time.monotonic()
+            try:
+                fut.set_result(self._factories[name]())
+                self._timings[name] = round((time.monotonic() - t0) * 1000.0, 1)
+                logger.info("[Registry] %s ready in %.0f ms", name, self._timings[name])
+            except Exception as e:
+                with self._lock:
+                    self._futures.pop(name, None)
+                fut.set_exception(e)
+        return fut.result()
+
+    def warm_up(self) -> None:
+        """Builds every resource concurrently in background threads; returns immediately"""
+        ex = ThreadPoolExecutor(max_workers=len(self._factories), thread_name_prefix="nova-warmup")
+        for name in self._factories:
+            ex.submit(self._warm, name)
+        ex.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            ready = {n: f.done() and f.exception() is None for n, f in self._futures.items()}
+        return {"ready": ready, "build_ms": dict(self._timings)}
+
+    def _warm(self, name: str) -> None:
+        try:
+            self.get(name)
+        except Exception as e:
+            logger.warning("[Registry] Warm-up of %s failed: %s", name, e)
+
+    # ---- Factories ------------------------------------------------------------
+
+    def _make_mongo(self) -> MongoClient:
+        return MongoClient(self.cfg.get("mongo_url", "mongodb://localhost:27017"))
+
+    def _make_payloads(self) -> PayloadRepository:
+        repo = PayloadRepository(self.cfg.get("mongo_url"), client=self.mongo,
+                                 render_cache_size=int(self.cfg.get("payload_render_cache", 256)),
+                                 max_entries=int(self.cfg.get("payload_cache_entries", 1024)),
+                                 max_bytes=int(self.cfg.get("payload_cache_bytes", 16 * 1024 * 1024)))
+        try:
+            repo.ensure_indexes()
+            repo.warm_up()
+        except Exception as e:
+            # Payloads are still fetched on demand
+            logger.warning("[Registry] Payload indexes/bulk load failed: %s", e)
+        if self.cfg.get("payload_watch", True):
+            repo.start_watching(float(self.cfg.get("payload_poll_interval", 30.0)))
+        return repo
+
+    def _make_capabilities(self) -> CapabilityCache:
+        return CapabilityCache(self.cfg.get("mongo_url"), client=self.mongo,
+                               ttl_seconds=int(self.cfg.get("oc_caps_ttl", 86400)))
+
+    def _make_oc_lookup(self) -> OpenConfigLookup:
+        return OpenConfigLookup()
+
+
+_registry: Optional[ResourceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry(cfg: Optional[dict] = None) -> ResourceRegistry:
+    """
+    Returns the process-wide registry, creating it from ipsdnc config on first use
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ResourceRegistry(cfg or {})
+        return _registry
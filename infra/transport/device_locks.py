@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from ncclient.operations.rpc import RPCError
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceLockTimeout(TimeoutError):
+    pass
+
+
+class _DeviceLock:
+    __slots__ = ("lock", "holder", "waiters", "acquired", "timeouts", "wait_ms_max")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.holder: Optional[str] = None
+        self.waiters = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_ms_max = 0.0
+
+
+class DeviceLockManager:
+    """
+    Serializes configuration work per device while different devices proceed
+    in parallel.
+
+    lock(device) is a process-wide, re-entrant lock for one device. Hold it
+    around edit/commit sequences so two workflows cannot interleave their
+    changes in the same candidate datastore. datastore(m, target) discards
+    the candidate changes when the block fails, so a failed commit does not
+    leave its edit for the next workflow to commit. With netconf_lock set it
+    also holds the NETCONF <lock> for the block, which keeps out other
+    NETCONF clients, retrying lock-denied until acquire_timeout.
+    """
+
+    def __init__(self, acquire_timeout: float = 120.0, netconf_lock: bool = False):
+        self.acquire_timeout = float(acquire_timeout)
+        self.netconf_lock = bool(netconf_lock)
+        self._locks: Dict[str, _DeviceLock] = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def lock(self, device: str, timeout: Optional[float] = None):
+        entry = self._entry(device)
+        timeout = self.acquire_timeout if timeout is None else timeout
+        with self._guard:
+            entry.waiters += 1
+        t0 = time.monotonic()
+        ok = entry.lock.acquire(timeout=timeout)
+        waited_ms = (time.monotonic() - t0) * 1000.0
+        with self._guard:
+            entry.waiters -= 1
+            if not ok:
+                entry.timeouts += 1
+            else:
+                entry.acquired += 1
+                entry.wait_ms_max = max(entry.wait_ms_max, waited_ms)
+        if not ok:
+            raise DeviceLockTimeout(f"Device {device} busy for more than {timeout:g}s (held by {entry.holder})")
+        if waited_ms > 1000.0:
+            logger.info("[Lock] Waited %.0f ms for %s", waited_ms, device)
+        previous, entry.holder = entry.holder, threading.current_thread().name
+        try:
+            yield
+        finally:
+            entry.holder = previous
+            entry.lock.release()
+
+    @contextmanager
+    def datastore(self, m, target: str = "candidate"):
+        """
+        Discards candidate changes if the block fails; also holds the NETCONF
+        <lock> on target for the block when netconf_lock is enabled
+        """
+        if self.netconf_lock:
+            self._netconf_lock(m, target)
+        try:
+            yield m
+        except BaseException:
+            if target == "candidate":
+                try:
+                    m.discard_changes()
+                except Exception as e:
+                    logger.warning("[Lock] discard-changes failed: %s", e)
+            raise
+        finally:
+            if self.netconf_lock:
+                try:
+                    m.unlock(target)
+                except Exception as e:
+                    logger.warning("[Lock] Unlocking %s failed: %s", target, e)
+
+    def stats(self) -> dict:
+        with self._guard:
+            return {
+                "netconf_lock": self.netconf_lock,
+                "devices": {d: {"held_by": e.holder, "waiters": e.waiters, "acquired": e.acquired,
+                                "timeouts": e.timeouts, "wait_ms_max": round(e.wait_ms_max, 1)}
+                            for d, e in self._locks.items()},
+            }
+
+    def _entry(self, device: str) -> _DeviceLock:
+        with self._guard:
+            entry = self._locks.get(device)
+            if entry is None:
+                entry = self._locks[device] = _DeviceLock()
+            return entry
+
+    def _netconf_lock(self, m, target: str) -> None:
+        deadline = time.monotonic() + self.acquire_timeout
+        delay = 0.2
+        while True:
+            try:
+                m.lock(target)
+                return
+            except RPCError as e:
+                # Held by another NETCONF client (or a session of another process)
+                if getattr(e, "tag", None) != "lock-denied" or time.monotonic() + delay > deadline:
+                    raise
+                logger.info("[Lock] %s datastore locked elsewhere, retrying in %.1fs", target, delay)
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+
+
+_locks: Optional[DeviceLockManager] = None
+_locks_lock = threading.Lock()
+
+
+def get_device_locks(cfg: Optional[dict] = None) -> DeviceLockManager:
+    """
+    Returns the process-wide lock manager, creating it from ipsdnc config on first use
+    """
+    global _locks
+    with _locks_lock:
+        if _locks is None:
+            cfg = cfg or {}
+            _locks = DeviceLockManager(
+                acquire_timeout=float(cfg.get("device_lock_timeout", 120)),
+                netconf_lock=bool(cfg.get("netconf_datastore_lock", False)),
+            )
+        return _locks
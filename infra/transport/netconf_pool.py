@@ -0,0 +1,282 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Hashable, Optional
+
+from ncclient.operations.rpc import RPCError
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(RuntimeError):
+    pass
+
+
+class _PooledSession:
+    __slots__ = ("manager", "created", "last_used")
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class _Lease:
+    """
+    Context manager handed out by NetconfSessionPool.session().
+    Yields the ncclient Manager and returns it to the pool on exit.
+    """
+
+    def __init__(self, pool: "NetconfSessionPool", key: Hashable, factory: Callable):
+        self._pool = pool
+        self._key = key
+        self._factory = factory
+        self._entry: Optional[_PooledSession] = None
+
+    def __enter__(self):
+        self._entry = self._pool._acquire(self._key, self._factory)
+        return self._entry.manager
+
+    def __exit__(self, exc_type, exc, tb):
+        # RPC errors are reported by a healthy session, but the failed workflow may
+        # have left edits in the candidate, so those are discarded before the session
+        # is reused. Anything else (transport errors, timeouts, interrupted replies)
+        # leaves the session in doubt.
+        broken = exc is not None and not isinstance(exc, RPCError)
+        if exc is not None and not broken:
+            broken = not self._pool._discard_candidate(self._key, self._entry)
+        self._pool._release(self._key, self._entry, discard=broken)
+        self._entry = None
+        return False
+
+
+class NetconfSessionPool:
+    """
+    Per-device pool of live NETCONF sessions shared by all IPSDNC controllers.
+
+    Sessions are keyed by (host, port, username). A background reaper closes
+    sessions idle for longer than idle_timeout and drops the ones whose
+    transport has died; dead sessions found at checkout are replaced
+    transparently.
+    """
+
+    def __init__(self, max_sessions: int = 2, idle_timeout: float = 300.0,
+                 keepalive: float = 30.0, acquire_timeout: float = 60.0):
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_timeout = float(idle_timeout)
+        self.keepalive = float(keepalive)
+        self.acquire_timeout = float(acquire_timeout)
+
+        self._lock = threading.Condition()
+        self._idle: Dict[Hashable, deque] = {}
+        self._in_use: Dict[Hashable, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "reconnects": 0, "evictions": 0, "discards": 0,
+                       "candidate_discards": 0}
+
+        self._closed = False
+        self._reaper: Optional[threading.Thread] = None
+        if self.keepalive > 0 or self.idle_timeout > 0:
+            self._reaper = threading.Thread(target=self._reap_loop, name="netconf-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def session(self, key: Hashable, factory: Callable):
+        """
+        Returns a context manager yielding a live session for key.
+        factory() must open a new ncclient Manager for that device.
+        """
+        return _Lease(self, key, factory)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["idle"] = sum(len(q) for q in self._idle.values())
+            out["in_use"] = sum(self._in_use.values())
+            out["devices"] = len(set(self._idle) | {k for k, n in self._in_use.items() if n})
+            lookups = out["hits"] + out["misses"]
+            out["hit_ratio"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+        return out
+
+    def invalidate(self, key: Hashable) -> None:
+        """Closes every idle session for a device (e.g. after credentials change)"""
+        with self._lock:
+            stale = list(self._idle.pop(key, ()))
+        for entry in stale:
+            self._close(entry)
+
+    def close(self) -> None:
+        """Closes all idle sessions and stops the reaper"""
+        with self._lock:
+            self._closed = True
+            stale = [e for q in self._idle.values() for e in q]
+            self._idle.clear()
+            self._lock.notify_all()
+        for entry in stale:
+            self._close(entry)
+        logger.info("[Pool] NETCONF session pool closed")
+
+    # ---- Checkout / checkin -------------------------------------------------
+
+    def _acquire(self, key: Hashable, factory: Callable) -> _PooledSession:
+        deadline = time.monotonic() + self.acquire_timeout
+        dead = []
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise PoolExhausted("NETCONF session pool is closed")
+                idle = self._idle.get(key)
+                while idle:
+                    entry = idle.pop()
+                    if self._is_alive(entry):
+                        self._in_use[key] = self._in_use.get(key, 0) + 1
+                        self._stats["hits"] += 1
+                        break
+                    dead.append(entry)
+                    self._stats["reconnects"] += 1
+                else:
+                    entry = None
+                if entry is not None:
+                    break
+                if self._in_use.get(key, 0) < self.max_sessions:
+                    # Reserve the slot before connecting outside the lock
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    self._stats["misses"] += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(f"No NETCONF session available for {key} "
+                                        f"after {self.acquire_timeout:.0f}s")
+                self._lock.wait(remaining)
+
+        for d in dead:
+            self._close(d)
+        if entry is not None:
+            logger.debug("[Pool] Reusing NETCONF session for %s", key)
+            return entry
+
+        logger.info("[Pool] Opening new NETCONF session for %s", key)
+        try:
+            mgr = factory()
+        except Exception:
+            with self._lock:
+                self._in_use[key] -= 1
+                self._lock.notify()
+            raise
+        self._enable_keepalive(mgr)
+        return _PooledSession(mgr)
+
+    def _release(self, key: Hashable, entry: Optional[_PooledSession], discard: bool = False) -> None:
+        if entry is None:
+            return
+        entry.last_used = time.monotonic()
+        keep = not discard and self._is_alive(entry)
+        with self._lock:
+            self._in_use[key] = max(0, self._in_use.get(key, 0) - 1)
+            if keep and not self._closed:
+                self._idle.setdefault(key, deque()).append(entry)
+            else:
+                self._stats["discards"] += 1
+            self._lock.notify()
+        if not keep or self._closed:
+            logger.debug("[Pool] Dropping NETCONF session for %s", key)
+            self._close(entry)
+
+    def _discard_candidate(self, key: Hashable, entry: Optional[_PooledSession]) -> bool:
+        """
+        Drops uncommitted candidate edits after a failed lease; False when the
+        session should not be reused
+        """
+        if entry is None:
+            return True
+        m = entry.manager
+        try:
+            if ":candidate" not in m.server_capabilities:
+                return True
+            m.discard_changes()
+        except Exception as e:
+            logger.warning("[Pool] discard-changes failed for %s, dropping session: %s", key, e)
+            return False
+        with self._lock:
+            self._stats["candidate_discards"] += 1
+        return True
+
+    # ---- Housekeeping -------------------------------------------------------
+
+    def _reap_loop(self) -> None:
+        interval = min(x for x in (self.keepalive, self.idle_timeout, 30.0) if x > 0)
+        while True:
+            time.sleep(interval)
+            if self._closed:
+                return
+            now = time.monotonic()
+            stale = []
+            with self._lock:
+                for key, idle in list(self._idle.items()):
+                    keep = deque()
+                    for entry in idle:
+                        expired = self.idle_timeout > 0 and now - entry.last_used > self.idle_timeout
+                        if expired or not self._is_alive(entry):
+                            stale.append((key, entry))
+                        else:
+                            keep.append(entry)
+                    if keep:
+                        self._idle[key] = keep
+                    else:
+                        del self._idle[key]
+                self._stats["evictions"] += len(stale)
+            for key, entry in stale:
+                logger.debug("[Pool] Evicting idle NETCONF session for %s", key)
+                self._close(entry)
+
+    def _enable_keepalive(self, mgr) -> None:
+        if self.keepalive <= 0:
+            return
+        transport = getattr(getattr(mgr, "_session", None), "_transport", None)
+        try:
+            if transport is not None:
+                transport.set_keepalive(int(self.keepalive))
+        except Exception as e:
+            logger.debug("[Pool] Could not enable SSH keepalive: %s", e)
+
+    @staticmethod
+    def _is_alive(entry: _PooledSession) -> bool:
+        try:
+            return bool(entry.manager.connected)
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(entry: _PooledSession) -> None:
+        try:
+            entry.manager.close_session()
+        except Exception:
+            pass
+
+
+# Optional module-level singleton so every vendor controller shares one pool
+_pool: Optional[NetconfSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool(cfg: Optional[dict] = None) -> NetconfSessionPool:
+    """
+    Returns the process-wide pool, creating it from ipsdnc config on first use
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            cfg = cfg or {}
+            _pool = NetconfSessionPool(
+                max_sessions=int(cfg.get("netconf_pool_size", 2)),
+                idle_timeout=float(cfg.get("netconf_idle_timeout", 300)),
+                keepalive=float(cfg.get("netconf_keepalive", 30)),
+            )
+        return _pool
+
+
+def close_session_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
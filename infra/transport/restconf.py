@@ -0,0 +1,279 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utility.metrics import get_metrics
+
+try:
+    import httpx
+except ImportError:  # optional: without it the client runs on a pooled requests.Session
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+Timeout = Union[None, float, Tuple[float, float]]
+
+METRIC = "restconf_request_seconds"
+# Keyed list entries (services=<name>) collapse into one endpoint label
+_KEY_RE = re.compile(r"=[^/]+")
+
+
+class RestconfResponse:
+    """
+    The parts of requests.Response the RNC controller uses, filled in by
+    either engine. raise_for_status() raises requests.HTTPError carrying this
+    response, so existing `except requests.HTTPError` handlers keep working.
+    """
+
+    __slots__ = ("status_code", "reason", "headers", "content", "url", "elapsed")
+
+    def __init__(self, status_code: int, reason: str, headers: Dict[str, str], content: bytes,
+                 url: str, elapsed: float):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise requests.HTTPError(f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}",
+                                     response=self)
+
+
+class _SessionEngine:
+    """Blocking engine: one requests.Session with a bounded urllib3 pool"""
+
+    name = "sync"
+
+    def __init__(self, auth, headers: Dict[str, str], pool_size: int):
+        self._session = requests.Session()
+        self._session.auth = auth
+        self._session.headers.update(headers)
+        # pool_block: callers beyond pool_size wait for a connection instead of opening throwaway ones
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=True)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="restconf")
+
+    def request(self, method: str, url: str, json_body, params, connect: float, read: float,
+                deadline: float) -> RestconfResponse:
+        # urllib3 has no total deadline; bound every socket read by it instead
+        r = self._session.request(method, url, json=json_body, params=params,
+                                  timeout=(min(connect, deadline), min(read, deadline)))
+        return RestconfResponse(r.status_code, r.reason, dict(r.headers), r.content, r.url,
+                                r.elapsed.total_seconds())
+
+    def submit(self, *args) -> Future:
+        return self._executor.submit(self.request, *args)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._session.close()
+
+
+class _AsyncEngine:
+    """
+    httpx.AsyncClient on a private event-loop thread. Concurrent callers
+    multiplex over pool_size keep-alive connections (or HTTP/2 streams)
+    without a thread per in-flight call.
+    """
+
+    name = "async"
+
+    def __init__(self, auth, headers: Dict[str, str], pool_size: int, keepalive_expiry: float, http2: bool):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="restconf-loop", daemon=True)
+        self._thread.start()
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                              keepalive_expiry=keepalive_expiry)
+        self.http2 = http2
+        try:
+            self._client = self._run(self._make_client(auth, headers, limits, http2))
+        except ImportError:
+            # http2=True needs the h2 package
+            logger.warning("[RESTCONF] HTTP/2 requested but h2 is not installed; using HTTP/1.1")
+            self.http2 = False
+            self._client = self._run(self._make_client(auth, headers, limits, False))
+
+    @staticmethod
+    async def _make_client(auth, headers, limits, http2):
+        return httpx.AsyncClient(auth=auth, headers=headers, limits=limits, http2=http2, timeout=None)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def arequest(self, method: str, url: str, json_body, params, connect: float, read: float,
+                       deadline: float) -> RestconfResponse:
+        timeout = httpx.Timeout(read, connect=connect, pool=deadline)
+        t0 = time.monotonic()
+        try:
+            r = await asyncio.wait_for(
+                self._client.request(method, url, json=json_body, params=params, timeout=timeout), deadline)
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            raise requests.Timeout(f"{method} {url} exceeded its {deadline:.1f}s deadline") from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(f"{method} {url}: {e}") from e
+        return RestconfResponse(r.status_code, r.reason_phrase, dict(r.headers), r.content, str(r.url),
+                                time.monotonic() - t0)
+
+    def submit(self, *args) -> Future:
+        return asyncio.run_coroutine_threadsafe(self.arequest(*args), self._loop)
+
+    def request(self, *args) -> RestconfResponse:
+        fut = self.submit(*args)
+        try:
+            # arequest enforces the deadline; the margin only covers loop scheduling
+            return fut.result(timeout=args[-1] + 1.0)
+        except FutureTimeout:
+            fut.cancel()
+            raise requests.Timeout(f"{args[0]} {args[1]} exceeded its {args[-1]:.1f}s deadline")
+
+    def close(self) -> None:
+        try:
+            self._run(self._client.aclose())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class RestconfClient:
+    """
+    RESTCONF client shared by every RNC workflow.
+
+    engine "async" runs httpx on an event-loop thread (pool size, keep-alive
+    expiry and HTTP/2 configurable); "sync" uses a requests.Session with a
+    bounded connection pool; "auto" picks async when httpx is installed.
+    get()/post() block like requests and accept the same timeout values
+    (seconds or a (connect, read) tuple). Each call also has an overall
+    deadline, by default connect + read. submit() returns a Future so one
+    thread can fan out many calls. Every call is timed into the
+    restconf_request_seconds histogram by method and endpoint.
+    """
+
+    def __init__(self, auth=None, headers: Optional[Dict[str, str]] = None, engine: str = "auto",
+                 pool_size: int = 8, keepalive_expiry: float = 30.0, http2: bool = False,
+                 default_timeout: Tuple[float, float] = (5.0, 60.0)):
+        engine = (engine or "auto").lower()
+        if engine not in ("auto", "async", "sync"):
+            raise ValueError(f"Unknown RESTCONF engine '{engine}' (auto, async or sync)")
+        if engine != "sync" and httpx is None:
+            logger.warning("[RESTCONF] httpx is not installed (see requirements.txt); restconf_engine=%s "
+                           "falls back to the blocking sync engine without HTTP/2", engine)
+        self.pool_size = max(1, int(pool_size))
+        self.default_timeout = default_timeout
+        headers = dict(headers or {})
+        if engine != "sync" and httpx is not None:
+            self._engine = _AsyncEngine(auth, headers, self.pool_size, float(keepalive_expiry), bool(http2))
+        else:
+            self._engine = _SessionEngine(auth, headers, self.pool_size)
+        self._metrics = get_metrics()
+        self._metrics.describe(METRIC, "RESTCONF call latency by method and endpoint")
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        logger.info("[RESTCONF] %s engine, pool_size=%d, http2=%s",
+                    self._engine.name, self.pool_size, getattr(self._engine, "http2", False))
+
+    @property
+    def engine(self) -> str:
+        return self._engine.name
+
+    def get(self, url: str, **kwargs) -> RestconfResponse:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> RestconfResponse:
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, json: Any = None, params: Optional[Dict[str, Any]] = None,
+                timeout: Timeout = None, deadline: Optional[float] = None) -> RestconfResponse:
+        args = self._call_args(method, url, json, params, timeout, deadline)
+        return self._timed(method, url, lambda: self._engine.request(*args))
+
+    def submit(self, method: str, url: str, json: Any = None, params: Optional[Dict[str, Any]] = None,
+               timeout: Timeout = None, deadline: Optional[float] = None) -> Future:
+        """Starts a call and returns a Future resolving to its RestconfResponse"""
+        args = self._call_args(method, url, json, params, timeout, deadline)
+        t0 = self._begin()
+        fut = self._engine.submit(*args)
+
+        def _done(f: Future) -> None:
+            err = True if f.cancelled() else f.exception()
+            self._end(method, url, t0, err, None if err else f.result())
+
+        fut.add_done_callback(_done)
+        return fut
+
+    def stats(self) -> dict:
+        return {
+            "engine": self._engine.name,
+            "pool_size": self.pool_size,
+            "http2": getattr(self._engine, "http2", False),
+            "in_flight": self._in_flight,
+        }
+
+    def close(self) -> None:
+        self._engine.close()
+
+    # ---- Internals -------------------------------------------------------------
+
+    def _call_args(self, method, url, json_body, params, timeout, deadline) -> tuple:
+        connect, read = self._split_timeout(timeout)
+        return (method, url, json_body, params, connect, read, float(deadline or connect + read))
+
+    def _split_timeout(self, timeout: Timeout) -> Tuple[float, float]:
+        if timeout is None:
+            return self.default_timeout
+        if isinstance(timeout, (tuple, list)):
+            return float(timeout[0]), float(timeout[1])
+        return float(timeout), float(timeout)
+
+    def _timed(self, method: str, url: str, call) -> RestconfResponse:
+        t0 = self._begin()
+        resp, err = None, None
+        try:
+            resp = call()
+            return resp
+        except BaseException as e:
+            err = e
+            raise
+        finally:
+            self._end(method, url, t0, err, resp)
+
+    def _begin(self) -> float:
+        with self._lock:
+            self._in_flight += 1
+        return time.monotonic()
+
+    def _end(self, method: str, url: str, t0: float, err, resp: Optional[RestconfResponse]) -> None:
+        elapsed = time.monotonic() - t0
+        with self._lock:
+            self._in_flight -= 1
+        outcome = "error" if err or resp is None else f"{resp.status_code // 100}xx"
+        self._metrics.observe(METRIC, elapsed, method=method, endpoint=endpoint_label(url), outcome=outcome)
+
+
+def endpoint_label(url: str) -> str:
+    """URL path with list keys masked, e.g. /rests/data/...:service-list/services={key}"""
+    return _KEY_RE.sub("={key}", urlsplit(url).path)
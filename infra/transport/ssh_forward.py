@@ -0,0 +1,149 @@
+import logging
+import select
+import socket
+import threading
+from typing import Optional
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+
+
+class LocalPortForwarder:
+    """
+    In-process equivalent of `ssh -L local_port:remote_host:remote_port`.
+
+    One paramiko transport is kept alive (with SSH keepalives) and every
+    connection accepted on 127.0.0.1:local_port is tunnelled over it as a
+    direct-tcpip channel, so HTTP keep-alive connections from a
+    requests.Session survive across calls. The transport is re-established
+    transparently when it drops.
+    """
+
+    def __init__(self, ssh_host: str, ssh_port: int, username: str, password: str,
+                 remote_host: str, remote_port: int, local_port: int,
+                 keepalive: int = 30, connect_timeout: float = 10.0):
+        self.ssh_host = ssh_host
+        self.ssh_port = int(ssh_port)
+        self.username = username
+        self.password = password
+        self.remote_host = remote_host
+        self.remote_port = int(remote_port)
+        self.local_port = int(local_port)
+        self.keepalive = int(keepalive)
+        self.connect_timeout = connect_timeout
+
+        self._lock = threading.Lock()
+        self._client: Optional[paramiko.SSHClient] = None
+        self._listener: Optional[socket.socket] = None
+        self._closed = False
+        self.reconnects = 0
+
+    def ensure(self) -> paramiko.SSHClient:
+        """Makes sure the SSH transport is up and the local listener is running"""
+        with self._lock:
+            client = self._connect_locked()
+            if self._listener is None:
+                self._start_listener_locked()
+            return client
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            if self._listener is not None:
+                try:
+                    self._listener.close()
+                except OSError:
+                    pass
+                self._listener = None
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+        logger.info("SSH forwarder to %s closed", self.ssh_host)
+
+    # ---- SSH transport ------------------------------------------------------
+
+    def _connect_locked(self) -> paramiko.SSHClient:
+        client = self._client
+        if client is not None:
+            transport = client.get_transport()
+            if transport is not None and transport.is_active():
+                return client
+            logger.warning("SSH transport to %s dropped; reconnecting", self.ssh_host)
+            client.close()
+            self.reconnects += 1
+
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(self.ssh_host, self.ssh_port, self.username, self.password,
+                           timeout=self.connect_timeout, look_for_keys=False, allow_agent=False)
+        except paramiko.AuthenticationException:
+            logger.error("Authentication failed (SSH to TPCE). Check username/password.")
+            raise
+        except Exception:
+            logger.exception("SSH connect error")
+            raise
+        if self.keepalive > 0:
+            client.get_transport().set_keepalive(self.keepalive)
+        self._client = client
+        logger.info("SSH transport to %s:%s established", self.ssh_host, self.ssh_port)
+        return client
+
+    def _open_channel(self, origin):
+        with self._lock:
+            transport = self._connect_locked().get_transport()
+        try:
+            return transport.open_channel("direct-tcpip", (self.remote_host, self.remote_port), origin)
+        except (paramiko.SSHException, EOFError, OSError):
+            # The transport may have died between the liveness check and the open
+            with self._lock:
+                transport = self._connect_locked().get_transport()
+            return transport.open_channel("direct-tcpip", (self.remote_host, self.remote_port), origin)
+
+    # ---- Local listener -----------------------------------------------------
+
+    def _start_listener_locked(self) -> None:
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind(("127.0.0.1", self.local_port))
+        srv.listen(32)
+        self._listener = srv
+        threading.Thread(target=self._accept_loop, args=(srv,), name="tpce-forward", daemon=True).start()
+        logger.info("Forwarding 127.0.0.1:%s -> %s:%s via %s",
+                    self.local_port, self.remote_host, self.remote_port, self.ssh_host)
+
+    def _accept_loop(self, srv: socket.socket) -> None:
+        while not self._closed:
+            try:
+                sock, peer = srv.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(sock, peer), daemon=True).start()
+
+    def _handle(self, sock: socket.socket, peer) -> None:
+        try:
+            chan = self._open_channel(peer)
+        except Exception as e:
+            logger.error("Could not open forwarding channel to %s:%s: %s",
+                         self.remote_host, self.remote_port, e)
+            sock.close()
+            return
+        try:
+            while True:
+                r, _, _ = select.select([sock, chan], [], [])
+                if sock in r:
+                    data = sock.recv(65536)
+                    if not data:
+                        break
+                    chan.sendall(data)
+                if chan in r:
+                    data = chan.recv(65536)
+                    if not data:
+                        break
+                    sock.sendall(data)
+        except (OSError, EOFError, paramiko.SSHException) as e:
+            logger.debug("Forwarded connection from %s ended: %s", peer, e)
+        finally:
+            chan.close()
+            sock.close()
@@ -0,0 +1,208 @@
+import atexit
+import logging
+import os
+import socket
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TunnelKey = Tuple[str, int, str, str, int]
+
+
+class TunnelError(RuntimeError):
+    pass
+
+
+class _Tunnel:
+    __slots__ = ("proc", "local_port", "started", "stderr_tail", "_drain")
+
+    def __init__(self, proc: subprocess.Popen, local_port: int):
+        self.proc = proc
+        self.local_port = local_port
+        self.started = time.monotonic()
+        # ssh keeps writing warnings for as long as the forward lives; reading them
+        # continuously keeps a full pipe from blocking it
+        self.stderr_tail: deque = deque(maxlen=20)
+        self._drain = threading.Thread(target=self._drain_stderr, name=f"ssh-tunnel-{local_port}", daemon=True)
+        self._drain.start()
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def stderr_text(self, wait: float = 0.0) -> str:
+        """Last stderr lines of ssh (waits up to `wait` seconds for them after exit)"""
+        if wait:
+            self._drain.join(wait)
+        return " | ".join(self.stderr_tail)
+
+    def _drain_stderr(self) -> None:
+        try:
+            for raw in iter(self.proc.stderr.readline, b""):
+                line = raw.decode("utf-8", "replace").strip()
+                if line:
+                    self.stderr_tail.append(line)
+                    logger.debug("[Tunnel] ssh(%s): %s", self.local_port, line)
+        except (OSError, ValueError):
+            pass  # pipe closed by _terminate
+
+
+class SSHTunnelManager:
+    """
+    Keeps one `ssh -N -L` forward per (jump host, destination) alive and shares
+    its local port between every NETCONF session to that destination.
+    Readiness is detected by probing the local port instead of sleeping.
+    """
+
+    SSH_OPTS = (
+        "-o", "LogLevel=ERROR",
+        "-o", "StrictHostKeyChecking=no",
+        "-o", "UserKnownHostsFile=/dev/null",
+        "-o", "GlobalKnownHostsFile=/dev/null",
+        "-o", "PreferredAuthentications=password",
+        "-o", "PubkeyAuthentication=no",
+        "-o", "ExitOnForwardFailure=yes",
+        "-o", "ServerAliveInterval=15",
+        "-o", "ServerAliveCountMax=3",
+    )
+
+    def __init__(self, ready_timeout: float = 15.0, probe_interval: float = 0.05):
+        self.ready_timeout = ready_timeout
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._key_locks: Dict[TunnelKey, threading.Lock] = {}
+        self._tunnels: Dict[TunnelKey, _Tunnel] = {}
+        self._stats = {"setups": 0, "restarts": 0, "failures": 0, "reuses": 0,
+                       "last_setup_ms": None, "total_setup_ms": 0.0}
+
+    def ensure(self, *, jump_host: str, jump_user: str, jump_pass: str, dst_host: str,
+               dst_port: int = 830, jump_port: int = 22) -> int:
+        """Returns the local port of a live forward to dst_host:dst_port, starting one if needed"""
+        key = (jump_host, int(jump_port), jump_user, dst_host, int(dst_port))
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            tun = self._tunnels.get(key)
+            if tun is not None and tun.alive():
+                self._bump("reuses")
+                return tun.local_port
+            if tun is not None:
+                logger.warning("[Tunnel] Forward to %s:%s via %s died (rc=%s: %s); restarting",
+                               dst_host, dst_port, jump_host, tun.proc.returncode, tun.stderr_text())
+                self._bump("restarts")
+                self._terminate(tun)
+
+            tun = self._start(key, jump_pass)
+            with self._lock:
+                self._tunnels[key] = tun
+            return tun.local_port
+
+    def live_count(self) -> int:
+        with self._lock:
+            return sum(1 for t in self._tunnels.values() if t.alive())
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        setups = out.pop("total_setup_ms")
+        out["avg_setup_ms"] = round(setups / out["setups"], 1) if out["setups"] else None
+        out["live"] = self.live_count()
+        return out
+
+    def close(self, key: Optional[TunnelKey] = None) -> None:
+        """Terminates one forward, or every forward when key is None"""
+        with self._lock:
+            if key is None:
+                victims = list(self._tunnels.values())
+                self._tunnels.clear()
+            else:
+                victims = [t for t in (self._tunnels.pop(key, None),) if t]
+        for tun in victims:
+            self._terminate(tun)
+        if victims:
+            logger.info("[Tunnel] Closed %d SSH forward(s)", len(victims))
+
+    # ---- Internals ----------------------------------------------------------
+
+    def _bump(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _start(self, key: TunnelKey, jump_pass: str) -> _Tunnel:
+        jump_host, jump_port, jump_user, dst_host, dst_port = key
+        local_port = self._alloc_port()
+        cmd = [
+            "sshpass", "-e", "ssh", "-p", str(jump_port), *self.SSH_OPTS,
+            "-N", "-L", f"127.0.0.1:{local_port}:{dst_host}:{dst_port}",
+            f"{jump_user}@{jump_host}",
+        ]
+        logger.info("[Tunnel] Establishing forward 127.0.0.1:%s -> %s:%s via %s",
+                    local_port, dst_host, dst_port, jump_host)
+        t0 = time.monotonic()
+        # Password goes through the environment so it never shows up in `ps`
+        proc = subprocess.Popen(
+            cmd, env={**os.environ, "SSHPASS": jump_pass or ""},
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        tun = _Tunnel(proc, local_port)
+        try:
+            self._wait_ready(tun)
+        except Exception:
+            self._bump("failures")
+            self._terminate(tun)
+            raise
+
+        elapsed_ms = (time.monotonic() - t0) * 1000.0
+        with self._lock:
+            self._stats["setups"] += 1
+            self._stats["last_setup_ms"] = round(elapsed_ms, 1)
+            self._stats["total_setup_ms"] += elapsed_ms
+        logger.info("[Tunnel] Forward to %s:%s ready on local port %s in %.0f ms",
+                    dst_host, dst_port, local_port, elapsed_ms)
+        return tun
+
+    def _wait_ready(self, tun: _Tunnel) -> None:
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline:
+            if not tun.alive():
+                raise TunnelError(f"ssh forward exited with rc={tun.proc.returncode}: {tun.stderr_text(wait=1.0)}")
+            try:
+                with socket.create_connection(("127.0.0.1", tun.local_port), timeout=self.probe_interval * 4):
+                    return
+            except OSError:
+                time.sleep(self.probe_interval)
+        raise TunnelError(f"ssh forward on port {tun.local_port} not ready after {self.ready_timeout:.0f}s")
+
+    @staticmethod
+    def _alloc_port() -> int:
+        s = socket.socket(); s.bind(("127.0.0.1", 0)); port = s.getsockname()[1]; s.close()
+        return port
+
+    @staticmethod
+    def _terminate(tun: _Tunnel) -> None:
+        if tun.alive():
+            tun.proc.terminate()
+            try:
+                tun.proc.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                tun.proc.kill()
+        if tun.proc.stderr:
+            tun.proc.stderr.close()
+
+
+# Optional module-level singleton shared by all jump-host controllers
+_manager: Optional[SSHTunnelManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_tunnel_manager() -> SSHTunnelManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SSHTunnelManager()
+            atexit.register(_manager.close)
+        return _manager
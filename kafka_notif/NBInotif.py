@@ -2,20 +2,38 @@
 import logging
 import threading
 import time
+from queue import Queue, Empty
 from typing import Optional, Dict
-from queue import Queue
 
 from kafka import KafkaConsumer
+from kafka.structs import OffsetAndMetadata
+
+from kafka_notif.dispatcher import NotificationDispatcher
 
 logger = logging.getLogger(__name__)
 
-# Shared queue for incoming Kafka messages (other modules import this)
-message_queue: Queue = Queue()
+# Shared dispatcher routing TPCE notifications to waiting workflows (other modules import this)
+notification_dispatcher = NotificationDispatcher()
+
+_STOP = object()
+
+
+def _offset_meta(offset: int) -> OffsetAndMetadata:
+    # kafka-python >= 2.1 added leader_epoch to OffsetAndMetadata
+    try:
+        return OffsetAndMetadata(offset, "")
+    except TypeError:
+        return OffsetAndMetadata(offset, "", -1)
 
 
 class KafkaNotifier:
     """
-    Background Kafka consumer that pushes decoded messages onto a queue.
+    Background Kafka consumer that hands decoded messages to a dispatcher.
+
+    A poller thread fetches records in batches (poll(max_records=...)) into a
+    bounded queue; a dispatch thread drains it. When the queue reaches its
+    high watermark the assigned partitions are paused until the dispatcher
+    catches up. Offsets are committed manually, only after dispatch.
     """
 
     def __init__(
@@ -23,20 +41,40 @@ class KafkaNotifier:
         broker: str,
         topic: str,
         group_id: str,
-        message_queue: Queue,
+        dispatcher: NotificationDispatcher,
         auto_offset_reset: str = "latest",
         poll_interval: float = 1.0,
+        max_poll_records: int = 100,
+        queue_size: int = 1000,
+        lag_interval: float = 10.0,
     ):
         self.broker = broker
         self.topic = topic
         self.group_id = group_id
-        self.queue = message_queue
+        self.dispatcher = dispatcher
         self.auto_offset_reset = auto_offset_reset
+        # Longest time a single poll() blocks when no records are available
         self.poll_interval = poll_interval
+        self.max_poll_records = max(1, int(max_poll_records))
+        # A whole batch must always fit above the high watermark
+        self.queue_size = max(int(queue_size), 2 * self.max_poll_records)
+        self.lag_interval = lag_interval
+
+        self._queue: Queue = Queue(maxsize=self.queue_size)
+        self._high_watermark = self.queue_size - self.max_poll_records
+        self._low_watermark = self._high_watermark // 2
 
         self._consumer: Optional[KafkaConsumer] = None
         self._thread: Optional[threading.Thread] = None
+        self._dispatch_thread: Optional[threading.Thread] = None
         self._running = False
+        self._paused = False
+
+        self._lock = threading.Lock()
+        self._dispatched_offsets: Dict = {}
+        self._lag: Dict = {}
+        self._stats = {"received": 0, "dispatched": 0, "commits": 0, "pauses": 0,
+                       "dispatch_ms_total": 0.0, "dispatch_ms_max": 0.0, "dispatch_ms_last": None}
 
     def start(self) -> None:
         """Starts the Kafka consumer in a background thread"""
@@ -44,6 +82,8 @@ class KafkaNotifier:
             logger.warning("KafkaNotifier already running")
             return
         self._running = True
+        self._dispatch_thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatch_thread.start()
         self._thread = threading.Thread(target=self._consume_loop, daemon=True)
         self._thread.start()
         logger.info(
@@ -60,37 +100,137 @@ class KafkaNotifier:
             self._thread.join(timeout)
             logger.info("KafkaNotifier stopped")
 
+    def stats(self) -> dict:
+        """Consumer lag, queue depth and dispatch latency"""
+        with self._lock:
+            s = dict(self._stats)
+            lag = dict(self._lag)
+        total_ms = s.pop("dispatch_ms_total")
+        s["dispatch_ms_avg"] = round(total_ms / s["dispatched"], 3) if s["dispatched"] else None
+        s["queue_depth"] = self._queue.qsize()
+        s["queue_size"] = self.queue_size
+        s["paused"] = self._paused
+        s["consumer_lag"] = sum(lag.values()) if lag else None
+        s["consumer_lag_by_partition"] = {f"{tp.topic}-{tp.partition}": n for tp, n in lag.items()}
+        return s
+
     def _consume_loop(self) -> None:
-        """Internal loop: polls Kafka and pushes messages to the queue"""
+        """Internal loop: polls Kafka in batches and feeds the dispatch queue"""
         try:
             self._consumer = KafkaConsumer(
                 self.topic,
                 bootstrap_servers=self.broker,
                 group_id=self.group_id,
                 auto_offset_reset=self.auto_offset_reset,
+                enable_auto_commit=False,
+                max_poll_records=self.max_poll_records,
             )
-            # Iterate over messages; KafkaConsumer is iterable.
-            for msg in self._consumer:
-                if not self._running:
-                    break
-                try:
-                    decoded = msg.value.decode("utf-8")
-                except Exception:
-                    # Fallback to raw bytes if decode fails
-                    decoded = str(msg.value)
-                logger.info("Kafka message received: %s", decoded)
-                self.queue.put(decoded)
-                # Gentle pacing so logs/queue consumers aren’t overwhelmed
-                time.sleep(self.poll_interval)
+            next_lag = 0.0
+            while self._running:
+                self._commit_dispatched()
+                self._apply_backpressure()
+
+                batch = self._consumer.poll(
+                    timeout_ms=int(self.poll_interval * 1000), max_records=self.max_poll_records
+                )
+                for tp, records in batch.items():
+                    for msg in records:
+                        try:
+                            decoded = msg.value.decode("utf-8")
+                        except Exception:
+                            # Fallback to raw bytes if decode fails
+                            decoded = str(msg.value)
+                        self._queue.put((tp, msg.offset, decoded, time.monotonic()))
+                        with self._lock:
+                            self._stats["received"] += 1
+
+                if time.monotonic() >= next_lag:
+                    self._update_lag()
+                    next_lag = time.monotonic() + self.lag_interval
         except Exception as e:
             logger.error("KafkaNotifier error: %s", e)
         finally:
+            self._queue.put(_STOP)
+            if self._dispatch_thread:
+                self._dispatch_thread.join(5.0)
             try:
                 if self._consumer:
+                    self._commit_dispatched()
                     self._consumer.close()
             except Exception:
                 pass
 
+    def _dispatch_loop(self) -> None:
+        """Drains the queue into the dispatcher and records what may be committed"""
+        while True:
+            try:
+                item = self._queue.get(timeout=1.0)
+            except Empty:
+                if not self._running and self._thread and not self._thread.is_alive():
+                    return
+                continue
+            if item is _STOP:
+                return
+            tp, offset, decoded, received = item
+            logger.info("Kafka message received: %s", decoded)
+            try:
+                self.dispatcher.dispatch(decoded)
+            except Exception:
+                logger.exception("Failed to dispatch Kafka message at %s:%s", tp, offset)
+            elapsed_ms = (time.monotonic() - received) * 1000.0
+            with self._lock:
+                self._dispatched_offsets[tp] = offset + 1
+                self._stats["dispatched"] += 1
+                self._stats["dispatch_ms_total"] += elapsed_ms
+                self._stats["dispatch_ms_last"] = round(elapsed_ms, 3)
+                self._stats["dispatch_ms_max"] = max(self._stats["dispatch_ms_max"], round(elapsed_ms, 3))
+
+    # ---- Poller-thread helpers (KafkaConsumer is not thread-safe) ----------
+
+    def _commit_dispatched(self) -> None:
+        with self._lock:
+            offsets, self._dispatched_offsets = self._dispatched_offsets, {}
+        if not offsets:
+            return
+        try:
+            self._consumer.commit({tp: _offset_meta(off) for tp, off in offsets.items()})
+            with self._lock:
+                self._stats["commits"] += 1
+        except Exception as e:
+            logger.warning("Kafka offset commit failed: %s", e)
+            # Retry on the next loop unless a newer offset has been dispatched meanwhile
+            with self._lock:
+                for tp, off in offsets.items():
+                    self._dispatched_offsets.setdefault(tp, off)
+
+    def _apply_backpressure(self) -> None:
+        depth = self._queue.qsize()
+        assigned = self._consumer.assignment()
+        if not self._paused and depth >= self._high_watermark and assigned:
+            self._consumer.pause(*assigned)
+            self._paused = True
+            with self._lock:
+                self._stats["pauses"] += 1
+            logger.warning("Kafka dispatch queue at %d/%d; pausing consumption", depth, self.queue_size)
+        elif self._paused and depth <= self._low_watermark:
+            self._consumer.resume(*self._consumer.paused())
+            self._paused = False
+            logger.info("Kafka dispatch queue drained to %d; resuming consumption", depth)
+
+    def _update_lag(self) -> None:
+        assigned = list(self._consumer.assignment())
+        if not assigned:
+            return
+        try:
+            ends = self._consumer.end_offsets(assigned)
+            lag = {tp: max(0, ends[tp] - self._consumer.position(tp)) for tp in assigned if tp in ends}
+        except Exception as e:
+            logger.debug("Could not compute consumer lag: %s", e)
+            return
+        with self._lock:
+            self._lag = lag
+        logger.debug("Kafka consumer lag=%s queue_depth=%d", sum(lag.values()), self._queue.qsize())
+
 
 # Optional module-level singleton holder so app code can remain simple
 _notifier: Optional[KafkaNotifier] = None
@@ -104,9 +244,12 @@ def create_notifier_from_config(cfg: Dict) -> KafkaNotifier:
         broker=cfg["broker"],
         topic=cfg["topic"],
         group_id=cfg["group_id"],
-        message_queue=message_queue,
+        dispatcher=notification_dispatcher,
         auto_offset_reset=cfg.get("auto_offset_reset", "latest"),
         poll_interval=float(cfg.get("poll_interval", 1.0)),
+        max_poll_records=int(cfg.get("max_poll_records", 100)),
+        queue_size=int(cfg.get("queue_size", 1000)),
+        lag_interval=float(cfg.get("lag_interval", 10.0)),
     )
 
 
@@ -124,6 +267,16 @@ def start_kafka_consumer(cfg: Dict) -> None:
     _notifier.start()
 
 
+def notifier_stats() -> Dict:
+    """
+    Returns consumer/dispatcher statistics (empty if the consumer never started)
+    """
+    stats = {"dispatcher": notification_dispatcher.stats()}
+    if _notifier is not None:
+        stats["consumer"] = _notifier.stats()
+    return stats
+
+
 def stop_kafka_consumer(timeout: float = 5.0) -> None:
     """
     Stops the background consumer (if running)
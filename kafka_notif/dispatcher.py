@@ -0,0 +1,166 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# TPCE identifies a workflow by any of these leaves (with or without a module prefix),
+# most specific first: payloads often reuse a fixed request-id or common-id
+CORRELATION_FIELDS = ("service-name", "request-id", "common-id")
+_RANK = {f: len(CORRELATION_FIELDS) - i for i, f in enumerate(CORRELATION_FIELDS)}
+
+
+class Notification(NamedTuple):
+    raw: str
+    data: Any
+    keys: frozenset
+    received_at: float
+
+
+def correlation_keys(obj: Any) -> frozenset:
+    """
+    Collects every (field, value) pair of service-name / request-id / common-id
+    found anywhere in a TPCE request payload or notification body
+    """
+    found = set()
+    stack = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            for k, v in cur.items():
+                if isinstance(v, (dict, list)):
+                    stack.append(v)
+                elif k.rsplit(":", 1)[-1] in CORRELATION_FIELDS and v not in (None, ""):
+                    found.add((k.rsplit(":", 1)[-1], str(v)))
+        elif isinstance(cur, list):
+            stack.extend(cur)
+    return frozenset(found)
+
+
+def match_rank(expected: frozenset, received: frozenset) -> int:
+    """
+    How specifically a notification's keys identify a waiter: the rank of the
+    most specific shared field (service-name > request-id > common-id), or 0
+    when nothing is shared or both name a field with different values
+    """
+    best = 0
+    for field, rank in _RANK.items():
+        want = {v for f, v in expected if f == field}
+        got = {v for f, v in received if f == field}
+        if want and got:
+            if not want & got:
+                return 0  # e.g. another service sharing a fixed common-id
+            best = max(best, rank)
+    return best
+
+
+class _Waiter:
+    __slots__ = ("keys", "future", "expires")
+
+    def __init__(self, keys: frozenset, timeout: Optional[float]):
+        self.keys = keys
+        self.future: Future = Future()
+        self.expires = time.monotonic() + timeout if timeout else None
+
+
+class NotificationDispatcher:
+    """
+    Routes each Kafka notification to the workflow waiting for it.
+
+    A workflow registers the correlation keys of the request it is about to
+    send (expect()) and blocks on the returned future. Every notification is
+    parsed once and resolves the waiter it identifies most specifically
+    (see match_rank), the oldest one on a tie (counted as tied). A notification without any
+    recognizable key only goes to a sole pending waiter; with several
+    pending it is left unclaimed and counted as ambiguous.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: List[_Waiter] = []
+        self._stats = {"dispatched": 0, "matched": 0, "fallback": 0, "tied": 0, "ambiguous": 0,
+                       "unclaimed": 0}
+
+    def expect(self, keys: Iterable[Tuple[str, str]], timeout: Optional[float] = None) -> Future:
+        """
+        Registers interest in the notification for keys. The returned future
+        resolves to a Notification; call cancel() once done waiting.
+        timeout only guards against callers that never cancel, so it must
+        exceed the caller's own deadline (request time plus wait).
+        """
+        waiter = _Waiter(frozenset((f, str(v)) for f, v in keys), timeout)
+        with self._lock:
+            self._waiters.append(waiter)
+        logger.debug("Waiting for notification keyed by %s", sorted(waiter.keys))
+        return waiter.future
+
+    def pending_with(self, keys: Iterable[Tuple[str, str]]) -> int:
+        """Pending waiters registered with exactly these keys (they cannot be told apart)"""
+        keys = frozenset((f, str(v)) for f, v in keys)
+        with self._lock:
+            return sum(1 for w in self._waiters if w.keys == keys and not w.future.done())
+
+    def cancel(self, future: Future) -> None:
+        with self._lock:
+            self._waiters = [w for w in self._waiters if w.future is not future]
+        future.cancel()
+
+    def dispatch(self, raw: str) -> Notification:
+        """Parses a raw notification once and hands it to the matching waiter"""
+        try:
+            data = json.loads(raw)
+        except (TypeError, ValueError):
+            data = None
+        note = Notification(raw=raw, data=data, keys=correlation_keys(data), received_at=time.time())
+
+        with self._lock:
+            self._stats["dispatched"] += 1
+            now = time.monotonic()
+            self._waiters = [w for w in self._waiters
+                             if not w.future.done() and (w.expires is None or w.expires > now)]
+            target, tied = None, 0
+            if note.keys:
+                best = 0
+                for w in self._waiters:
+                    rank = match_rank(w.keys, note.keys)
+                    if rank > best:
+                        target, best, tied = w, rank, 1
+                    elif rank and rank == best:
+                        tied += 1
+                if target is not None:
+                    self._stats["matched"] += 1
+                    if tied > 1:
+                        self._stats["tied"] += 1
+            elif len(self._waiters) == 1:
+                target = self._waiters[0]
+                self._stats["fallback"] += 1
+            elif self._waiters:
+                self._stats["ambiguous"] += 1
+            if target is None:
+                self._stats["unclaimed"] += 1
+            else:
+                self._waiters.remove(target)
+
+        if target is None:
+            logger.info("Unclaimed Kafka notification (keys=%s)", sorted(note.keys))
+        else:
+            if tied > 1:
+                logger.warning("Kafka notification keys %s match %d waiters equally; delivered to the oldest",
+                               sorted(note.keys), tied)
+            try:
+                target.future.set_result(note)
+            except Exception:
+                # The waiter gave up (cancel()) between removal and delivery
+                logger.debug("Waiter for %s cancelled before delivery", sorted(target.keys))
+        return note
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._waiters)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "pending": len(self._waiters)}
@@ -0,0 +1,91 @@
+# orchestrator/bulk.py
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BulkTask:
+    """One service of a bulk request: the devices it touches and the work to run"""
+
+    __slots__ = ("index", "devices", "fn", "outcome")
+
+    def __init__(self, index: int, devices: Iterable[str], fn: Callable[[], object]):
+        self.index = index
+        self.devices = tuple(sorted(set(d for d in devices if d)))
+        self.fn = fn
+        self.outcome: Optional[dict] = None
+
+
+class BulkRunner:
+    """
+    Runs the services of bulk requests concurrently under two limits: at most
+    max_workers services in flight overall, and at most per_device services
+    touching the same device. Limits are shared by all bulk requests.
+
+    A task starts only when a worker slot and all of its devices are free,
+    so a busy terminal holds back only its own services (no worker thread
+    waits on a device). Otherwise tasks start in submission order.
+    """
+
+    def __init__(self, max_workers: int = 8, per_device: int = 2):
+        self.max_workers = max(1, int(max_workers))
+        self.per_device = max(1, int(per_device))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="nova-bulk")
+        self._cond = threading.Condition()
+        self._active = 0
+        self._device_load: Dict[str, int] = {}
+
+    def run(self, tasks: List[BulkTask], max_concurrency: Optional[int] = None) -> List[dict]:
+        """
+        Runs every task and returns their outcomes in task order:
+        {"queued-ms", "duration-ms", "result"} or {"queued-ms", "duration-ms", "error"}.
+        max_concurrency further limits this request alone.
+        """
+        limit = min(self.max_workers, max_concurrency or self.max_workers)
+        pending = list(tasks)
+        running: List[BulkTask] = []
+        t_submit = time.monotonic()
+        with self._cond:
+            while pending or running:
+                for task in list(pending):
+                    if len(running) >= limit or self._active >= self.max_workers:
+                        break
+                    if all(self._device_load.get(d, 0) < self.per_device for d in task.devices):
+                        self._reserve(task)
+                        pending.remove(task)
+                        running.append(task)
+                        self._executor.submit(self._run_one, task, time.monotonic() - t_submit)
+                self._cond.wait()
+                running = [t for t in running if t.outcome is None]
+        return [t.outcome for t in tasks]
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"max_workers": self.max_workers, "per_device": self.per_device, "active": self._active,
+                    "devices": {d: n for d, n in self._device_load.items() if n}}
+
+    def _reserve(self, task: BulkTask) -> None:
+        self._active += 1
+        for d in task.devices:
+            self._device_load[d] = self._device_load.get(d, 0) + 1
+
+    def _run_one(self, task: BulkTask, queued: float) -> None:
+        outcome = {"queued-ms": round(queued * 1000.0, 1)}
+        t0 = time.monotonic()
+        try:
+            outcome["result"] = task.fn()
+        except Exception as e:
+            logger.exception("Bulk task %s crashed", task.index)
+            outcome["error"] = str(e)
+        outcome["duration-ms"] = round((time.monotonic() - t0) * 1000.0, 1)
+        with self._cond:
+            self._active -= 1
+            for d in task.devices:
+                self._device_load[d] -= 1
+            task.outcome = outcome
+            self._cond.notify_all()
+
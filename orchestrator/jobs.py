@@ -0,0 +1,138 @@
+# orchestrator/jobs.py
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from orchestrator.workflow import error_status
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class Job:
+    """
+    One orchestration run (sync or async) with per-step status and timings.
+    The workflow calls run_step() for every controller call it makes.
+    """
+
+    def __init__(self, kind: str, request: Optional[dict] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.request = request or {}
+        self.status = "queued"
+        self.http_status: Optional[int] = None
+        self.result = None
+        self.steps: List[dict] = []
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def run_step(self, name: str, fn: Callable, *args, **kwargs):
+        """Runs fn, recording its outcome and latency under name; exceptions propagate"""
+        entry = {"name": name, "status": "running", "started-at": time.time(), "duration-ms": None}
+        with self._lock:
+            self.steps.append(entry)
+        t0 = time.monotonic()
+        try:
+            out = fn(*args, **kwargs)
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            raise
+        finally:
+            entry["duration-ms"] = round((time.monotonic() - t0) * 1000.0, 1)
+        # Controllers report most failures as (response, 4xx/5xx) rather than raising
+        entry["status"] = "failed" if error_status(out) is not None else "succeeded"
+        return out
+
+    def finish(self, payload, http_status: int) -> None:
+        self.result = payload
+        self.http_status = http_status
+        self.status = "succeeded" if http_status < 400 else "failed"
+        self.finished_at = time.time()
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        with self._lock:
+            steps = [dict(s) for s in self.steps]
+        out = {
+            "job-id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "http-status": self.http_status,
+            "submitted-at": self.submitted_at,
+            "started-at": self.started_at,
+            "finished-at": self.finished_at,
+            "duration-ms": (round((self.finished_at - self.started_at) * 1000.0, 1)
+                            if self.started_at and self.finished_at else None),
+            "steps": steps,
+        }
+        if include_result:
+            out["result"] = self.result
+        return out
+
+
+class JobManager:
+    """
+    Bounded worker pool for asynchronous orchestration jobs.
+    At most max_pending jobs may be queued or running; finished jobs are kept
+    for `retention` seconds so that clients can poll GET /jobs/<id>.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 32, retention: float = 3600.0):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nova-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job: Job, fn: Callable[[Job], tuple], wrap: Optional[Callable] = None) -> Job:
+        """
+        Queues fn(job) -> (payload, http_status). wrap, if given, is a context
+        manager factory entered around the run (e.g. a Flask request context).
+        """
+        with self._lock:
+            self._prune_locked()
+            pending = sum(1 for j in self._jobs.values() if j.status in ("queued", "running"))
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} jobs already pending (limit {self.max_pending})")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, wrap)
+        logger.info("Job %s (%s) queued", job.id, job.kind)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.submitted_at)
+
+    def _run(self, job: Job, fn: Callable, wrap: Optional[Callable]) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            if wrap is not None:
+                with wrap():
+                    payload, http_status = fn(job)
+            else:
+                payload, http_status = fn(job)
+        except Exception as e:
+            logger.exception("Job %s (%s) crashed", job.id, job.kind)
+            payload, http_status = {"error": str(e)}, 500
+        job.finish(payload, http_status)
+        logger.info("Job %s (%s) %s in %s ms", job.id, job.kind, job.status, job.to_dict(False)["duration-ms"])
+
+    def _prune_locked(self) -> None:
+        cutoff = time.time() - self.retention
+        stale = [jid for jid, j in self._jobs.items() if j.finished_at and j.finished_at < cutoff]
+        for jid in stale:
+            del self._jobs[jid]
@@ -1,19 +1,36 @@
 # orchestrator/nova.py
-from flask import Blueprint, request, jsonify, Response
-import json, os, logging
+from flask import Blueprint, request, jsonify, Response, current_app, copy_current_request_context
+import json, os, time, logging
+from functools import partial
+from orchestrator.bulk import BulkRunner, BulkTask
+from orchestrator.jobs import Job, JobManager, JobQueueFull
+from orchestrator.workflow import Step, StepFailed, Workflow
 from rich.console import Console
 from rich.panel import Panel
 from rich.align import Align
 
 class NOVAOrchestrator:
-    def __init__(self, ipsdnc_ctrl, rnc_ctrl, kafka_consumer_fn=None):
+    def __init__(self, ipsdnc_ctrl, rnc_ctrl, kafka_consumer_fn=None, job_workers=4, max_pending_jobs=32,
+                 workflow_workers=4, bulk_workers=8, bulk_per_device=2, bulk_max_services=256):
         self.ipsdnc = ipsdnc_ctrl
         self.rnc    = rnc_ctrl
         self._consumer_fn = kafka_consumer_fn
+        self.jobs   = JobManager(max_workers=job_workers, max_pending=max_pending_jobs)
+        self.workflow_workers = workflow_workers
+        # Services of bulk requests: global and per-terminal concurrency limits
+        self.bulk   = BulkRunner(max_workers=bulk_workers, per_device=bulk_per_device)
+        self.bulk_max_services = bulk_max_services
 
         self.bp = Blueprint("nova", __name__)
         self.bp.add_url_rule("/create-service", "create_service", self.create_service, methods=["POST"])
         self.bp.add_url_rule("/delete-service", "delete_service", self.delete_service, methods=["POST"])
+        self.bp.add_url_rule("/bulk/create-service", "bulk_create_service", self.bulk_create_service,
+                             methods=["POST"])
+        self.bp.add_url_rule("/bulk/delete-service", "bulk_delete_service", self.bulk_delete_service,
+                             methods=["POST"])
+        self.bp.add_url_rule("/bulk", "bulk_stats", self.bulk_stats, methods=["GET"])
+        self.bp.add_url_rule("/jobs", "list_jobs", self.list_jobs, methods=["GET"])
+        self.bp.add_url_rule("/jobs/<job_id>", "get_job", self.get_job, methods=["GET"])
 
         if self._consumer_fn:
             import threading
@@ -70,130 +87,200 @@ class NOVAOrchestrator:
             console.print(panel, justify="left")
         logging.info("🚀 NOVA startup complete, ready to orchestrate your network.")
 
-    def create_service(self):
-        data = request.get_json() or {}
+    # ------------------------------------------------------------
+    # Sync / async dispatch
+    # ------------------------------------------------------------
+    def _wants_async(self) -> bool:
+        flag = (request.args.get("async") or "").strip().lower()
+        prefer = (request.headers.get("Prefer") or "").lower()
+        return flag in ("1", "true", "yes") or "respond-async" in prefer
+
+    def _dispatch(self, kind, workflow):
+        """
+        Runs workflow(job) inline, or — with ?async=true or `Prefer: respond-async` —
+        queues it on the job pool and answers 202 Accepted with the job id
+        """
+        job = Job(kind, request=request.get_json(silent=True) or {})
+        if not self._wants_async():
+            payload, status = workflow(job)
+            return jsonify(payload), status
+
+        # Controllers read the body from flask.request, so replay it in the worker
+        app = current_app._get_current_object()
+        path, body = request.path, request.get_data()
+        ctx = lambda: app.test_request_context(path, method="POST", data=body,
+                                               content_type="application/json")
         try:
-            # 1) performance info
-            eti = self._as_json(self.ipsdnc.end_terminal_performance_info_request())
+            self.jobs.submit(job, workflow, wrap=ctx)
+        except JobQueueFull as e:
+            resp = jsonify({"error": "Too many pending jobs", "details": str(e)})
+            resp.status_code = 503
+            resp.headers["Retry-After"] = "5"
+            return resp
+        resp = jsonify({"job-id": job.id, "status": job.status, "location": f"/jobs/{job.id}"})
+        resp.status_code = 202
+        resp.headers["Location"] = f"/jobs/{job.id}"
+        return resp
 
-            try:
-                tmp = self._as_json(self.rnc.temp_service_create())
-            except Exception as e:
-                # Inform user immediately, clean output
-                return jsonify({
-                    "error": "Temporary service creation failed",
-                    "details": str(e)
-                }), 400
+    def get_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+        return jsonify(job.to_dict())
 
+    def list_jobs(self):
+        return jsonify({"jobs": [j.to_dict(include_result=False) for j in self.jobs.list()]})
+
+    # ------------------------------------------------------------
+    # Workflows
+    # ------------------------------------------------------------
+    def create_service(self):
+        return self._dispatch("create-service", self._create_workflow)
+
+    def delete_service(self):
+        return self._dispatch("delete-service", self._delete_workflow)
+
+    def bulk_create_service(self):
+        return self._dispatch("bulk-create-service",
+                              partial(self._bulk_workflow, kind="create-service", workflow=self._create_workflow))
+
+    def bulk_delete_service(self):
+        return self._dispatch("bulk-delete-service",
+                              partial(self._bulk_workflow, kind="delete-service", workflow=self._delete_workflow))
+
+    def bulk_stats(self):
+        return jsonify(self.bulk.stats())
+
+    def _create_workflow(self, job):
+        steps = [
+            # 1) performance info and 2) temporary service are independent → run together
+            Step("end_terminal_performance_info", self.ipsdnc.end_terminal_performance_info_request),
+            Step("temporary_service_creation", self.rnc.temp_service_create,
+                 compensate=self.rnc.optical_tunnel_request_cancel, rollback_as="optical_cancel",
+                 error="Temporary service creation failed"),
             # 3) Activate terminals — MAY FAIL → MUST ROLLBACK
-            try:
-                act = self._as_json(self.ipsdnc.end_terminal_activation_request())
-            except Exception as e:
-                # --- ROLLBACK TEMPORARY OPTICAL TUNNEL ---
-                try:
-                    rollback = self._as_json(self.rnc.optical_tunnel_request_cancel())
-                except Exception as re:
-                    rollback = {"error": f"Rollback failed: {str(re)}"}
-    
-                return jsonify({
-                    "error": "Activation failed",
-                    "details": str(e),
-                    "rollback": rollback,
-                }), 400
-
-            # ------------------------------------------------------------
-            # Helper: Full rollback after activation
-            # (used for service-create failure or power failures)
-            # ------------------------------------------------------------
-            def full_post_activation_rollback():
-                results = {}
-    
-                # deactivate both A/Z terminals
-                try:
-                    results["deactivation"] = self._as_json(
-                        self.ipsdnc.end_terminal_deactivation_request()
-                    )
-                except Exception as e:
-                    results["deactivation_error"] = str(e)
-    
-                # cancel optical tunnel
-                try:
-                    results["optical_cancel"] = self._as_json(
-                        self.rnc.optical_tunnel_request_cancel()
-                    )
-                except Exception as e:
-                    results["optical_cancel_error"] = str(e)
-    
-                return results
-
-            # ------------------------------------------------------------
-            # 4) Service-create (rollback: deactivation + optical cancel)
-            # ------------------------------------------------------------
-            try:
-                svc = self._as_json(self.rnc.service_create())
-            except Exception as e:
-                rollback = full_post_activation_rollback()
-                return jsonify({
-                    "error": "Service creation failed",
-                    "details": str(e),
-                    "rollback": rollback
-                }), 400
-
-            # 5) Power setup A (failure → rollback)
-            try:
-                pwrA = self._as_json(self.rnc.service_power_setup(which="A"))
-            except Exception as e:
-                try:
-                    rollback = full_post_activation_rollback()
-                except Exception as re:
-                    rollback = {"error": f"Rollback failed: {str(re)}"}
+            Step("end_terminal_activation", self.ipsdnc.end_terminal_activation_request,
+                 requires=("end_terminal_performance_info", "temporary_service_creation"),
+                 compensate=self.ipsdnc.end_terminal_deactivation_request, rollback_as="deactivation",
+                 error="Activation failed"),
+            # 4) Service-create (rollback: deactivation + optical cancel, concurrently)
+            Step("service_creation", self.rnc.service_create,
+                 requires=("end_terminal_activation",), error="Service creation failed"),
+            # 5/6) Power setup A then Z (failure → same rollback)
+            Step("end_terminal_power_control_A", lambda: self.rnc.service_power_setup(which="A"),
+                 requires=("service_creation",), error="Power setup failed at A-end"),
+            Step("end_terminal_power_control_Z", lambda: self.rnc.service_power_setup(which="B"),
+                 requires=("end_terminal_power_control_A",), error="Power setup failed at Z-end"),
+        ]
+        return self._run_workflow(job, steps)
+
+    def _delete_workflow(self, job):
+        steps = [
+            # 1) deactivate (reads JSON from current request)
+            Step("end_terminal_deactivation", self.ipsdnc.end_terminal_deactivation_request),
+            # 2) delete
+            Step("service_deletion", self.rnc.service_delete, requires=("end_terminal_deactivation",)),
+        ]
+        return self._run_workflow(job, steps)
 
-                return jsonify({
-                    "error": "Power setup failed at A-end",
-                    "details": str(e),
-                    "rollback": rollback
-                }), 400
+    def _bulk_workflow(self, job, kind, workflow):
+        """
+        Runs the single-service workflow for every entry of {"services": [...]}.
+        Each entry is the body the single endpoint takes plus its service-name
+        (and optionally common-id, a-end, z-end), which the TPCE payloads are
+        rendered with. Entries run in their own request context and overlap up
+        to the bulk limits.
+        """
+        specs = job.request.get("services")
+        if not isinstance(specs, list) or not specs or not all(isinstance(s, dict) for s in specs):
+            return {"error": "Body must carry a non-empty 'services' list of service objects"}, 400
+        if len(specs) > self.bulk_max_services:
+            return {"error": f"At most {self.bulk_max_services} services per bulk request"}, 400
+        names = [s.get("service-name") for s in specs]
+        if len(specs) > 1 and (not all(names) or len(set(names)) != len(names)):
+            return {"error": "Every entry of a bulk request needs its own distinct 'service-name'"}, 400
+        limit = job.request.get("max-concurrency")
+        if limit is not None and (not isinstance(limit, int) or limit < 1):
+            return {"error": "'max-concurrency' must be a positive integer"}, 400
 
-            # 6) Power setup Z (failure → rollback)
-            try:
-                pwrZ = self._as_json(self.rnc.service_power_setup(which="B"))
-            except Exception as e:
-                try:
-                    rollback = full_post_activation_rollback()
-                except Exception as re:
-                    rollback = {"error": f"Rollback failed: {str(re)}"}
-
-                return jsonify({
-                    "error": "Power setup failed at Z-end",
-                    "details": str(e),
-                    "rollback": rollback
-                }), 400
-                
-            return jsonify({
-                "end_terminal_performance_info":   eti,
-                "temporary_service_creation":      tmp,
-                "end_terminal_activation":         act,
-                "service_creation":                svc,
-                "end_terminal_power_control_A":    pwrA,
-                "end_terminal_power_control_Z":    pwrZ,
-            })
+        app = current_app._get_current_object()
+        tasks, children = [], []
+        for i, spec in enumerate(specs):
+            ctx = partial(app.test_request_context, "/" + kind, method="POST", data=json.dumps(spec),
+                          content_type="application/json")
+            with ctx():
+                devices = self._devices_for_request()
+            child = Job(kind, request=spec)
+            children.append(child)
+            run = partial(self._run_child, child, workflow, ctx)
+            tasks.append(BulkTask(i, devices, partial(job.run_step, f"{kind}[{i}]", run)))
+
+        t0 = time.monotonic()
+        outcomes = self.bulk.run(tasks, max_concurrency=limit)
+        services = []
+        for i, (spec, child, out) in enumerate(zip(specs, children, outcomes)):
+            entry = {"index": i, "service": spec.get("service-name"),
+                     "queued-ms": out["queued-ms"], "duration-ms": out["duration-ms"],
+                     "steps": [{k: s.get(k) for k in ("name", "status", "duration-ms")}
+                               for s in child.to_dict(include_result=False)["steps"]]}
+            if "error" in out:
+                entry.update({"status": "failed", "http-status": 500, "error": out["error"]})
+            else:
+                payload, status = out["result"]
+                entry.update({"status": "succeeded" if status < 400 else "failed", "http-status": status,
+                              "result": payload})
+            services.append(entry)
+
+        failed = sum(1 for s in services if s["status"] == "failed")
+        summary = {"total": len(services), "succeeded": len(services) - failed, "failed": failed,
+                   "duration-ms": round((time.monotonic() - t0) * 1000.0, 1),
+                   "service-ms-total": round(sum(s["duration-ms"] for s in services), 1)}
+        # 207: outcomes differ per service, see each entry's http-status
+        return {"summary": summary, "services": services}, 200 if not failed else 207
+
+    def _run_child(self, child, workflow, ctx):
+        child.status = "running"
+        child.started_at = time.time()
+        with ctx():
+            payload, status = workflow(child)
+        child.finish(payload, status)
+        return payload, status
+
+    def _devices_for_request(self):
+        """Terminal ports the current request's service touches (for per-device limits)"""
+        devices = getattr(self.ipsdnc, "devices", None)
+        try:
+            return devices() if callable(devices) else ()
         except Exception as e:
-            logging.exception("create_service failed")
-            return jsonify({"error": str(e)}), 500
+            logging.warning("Could not resolve devices for bulk entry: %s", e)
+            return ()
 
-    def delete_service(self):
-        data = request.get_json() or {}
+    def _run_workflow(self, job, steps):
+        """Runs steps through the workflow engine and shapes the HTTP payload"""
         try:
-            # 1) deactivate (reads JSON from current request)
-            deact = self._as_json(self.ipsdnc.end_terminal_deactivation_request())
-            # 2) delete
-            deleted = self._as_json(self.rnc.service_delete())
-            return jsonify({
-                "end_terminal_deactivation": deact,
-                "service_deletion":          deleted,
-            })
+            res = Workflow(steps, max_workers=self.workflow_workers, runner=job.run_step,
+                           bind=copy_current_request_context).run()
         except Exception as e:
-            logging.exception("delete_service failed")
-            return jsonify({"error": str(e)}), 500
+            logging.exception("%s failed", job.kind)
+            return {"error": str(e)}, 500
 
+        if res.ok:
+            return {s.name: self._as_json(res.results[s.name]) for s in steps}, 200
 
+        step = res.failed_step
+        if isinstance(res.error, StepFailed):
+            # The controller answered with an error response: pass on its body and status
+            details = self._as_json(res.error.response)
+            if not details or not isinstance(details, dict):
+                details = {"error": str(res.error)}
+            body = {"error": step.error, "details": details} if step.error else dict(details)
+            status = res.error.status
+        elif step.error:
+            body, status = {"error": step.error, "details": str(res.error)}, 400
+        else:
+            logging.error("%s failed at %s: %s", job.kind, step.name, res.error)
+            body, status = {"error": str(res.error)}, 500
+        if res.rollback:
+            body["rollback"] = {k: v if isinstance(v, str) else self._as_json(v)
+                                for k, v in res.rollback.items()}
+        return body, status
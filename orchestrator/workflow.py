@@ -0,0 +1,169 @@
+# orchestrator/workflow.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def error_status(out) -> Optional[int]:
+    """
+    HTTP status of an error response returned by a step, (response, status)
+    or a response object with status_code >= 400; None otherwise
+    """
+    if isinstance(out, tuple) and len(out) > 1 and isinstance(out[1], int):
+        code = out[1]
+    else:
+        code = getattr(out, "status_code", None)
+    return code if isinstance(code, int) and code >= 400 else None
+
+
+class StepFailed(RuntimeError):
+    """Raised for a step whose action returned an error response instead of raising"""
+
+    def __init__(self, name: str, response, status: int):
+        self.response = response
+        self.status = status
+        body = response[0] if isinstance(response, tuple) else response
+        try:
+            detail = body.get_data(as_text=True) if hasattr(body, "get_data") else str(body)
+        except Exception:
+            detail = ""
+        super().__init__(f"Step '{name}' returned HTTP {status}: {detail.strip()[:500]}")
+
+
+class Step:
+    """
+    A unit of work in a Workflow.
+
+    requires    names of steps that must succeed before this one starts
+    compensate  undo action run if a later step fails (only after this step succeeded)
+    rollback_as key under which the compensation result is reported
+    error       user-facing message when this step fails (None → generic 500)
+    """
+
+    def __init__(self, name: str, action: Callable, requires: Iterable[str] = (),
+                 compensate: Optional[Callable] = None, rollback_as: Optional[str] = None,
+                 error: Optional[str] = None):
+        self.name = name
+        self.action = action
+        self.requires = tuple(requires)
+        self.compensate = compensate
+        self.rollback_as = rollback_as or f"{name}_rollback"
+        self.error = error
+
+
+class WorkflowResult:
+    def __init__(self):
+        self.results: Dict[str, object] = {}
+        self.timings: Dict[str, float] = {}
+        self.failed_step: Optional[Step] = None
+        self.error: Optional[BaseException] = None
+        self.rollback: Dict[str, object] = {}
+
+    @property
+    def ok(self) -> bool:
+        return self.failed_step is None
+
+
+class Workflow:
+    """
+    Runs steps as soon as their dependencies have succeeded, so independent
+    steps overlap. A step fails when its action raises or returns an error
+    response (see error_status). On the first failure no new step is started; once running
+    steps settle, the compensations of every succeeded step run — all at once
+    when parallel_compensation is set, otherwise in reverse completion order.
+
+    runner(name, fn) wraps each action/compensation (e.g. Job.run_step);
+    bind(fn) adapts callables for worker threads (e.g. copy_current_request_context)
+    and is applied in the calling thread when run() starts.
+    """
+
+    def __init__(self, steps: List[Step], max_workers: int = 4, parallel_compensation: bool = True,
+                 runner: Optional[Callable] = None, bind: Optional[Callable] = None):
+        names = [s.name for s in steps]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate step names in workflow")
+        for s in steps:
+            unknown = [r for r in s.requires if r not in names]
+            if unknown:
+                raise ValueError(f"Step '{s.name}' requires unknown step(s): {', '.join(unknown)}")
+        self.steps = steps
+        self.max_workers = max_workers
+        self.parallel_compensation = parallel_compensation
+        self.runner = runner
+        self.bind = bind
+
+    def run(self) -> WorkflowResult:
+        result = WorkflowResult()
+        pending = {s.name: s for s in self.steps}
+        bind = self.bind or (lambda fn: fn)
+        actions = {s.name: bind(s.action) for s in self.steps}
+        undo = {s.name: bind(s.compensate) for s in self.steps if s.compensate}
+        done_order: List[Step] = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="nova-wf") as ex:
+            running = {}
+            while pending or running:
+                if result.ok:
+                    for name, step in list(pending.items()):
+                        if all(r in result.results for r in step.requires):
+                            del pending[name]
+                            running[ex.submit(self._timed, step.name, actions[name], result)] = step
+                if not running:
+                    if pending and result.ok:
+                        # Dependencies can never be satisfied; treat as a definition error
+                        raise RuntimeError(f"Workflow stalled with pending steps: {', '.join(pending)}")
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    step = running.pop(fut)
+                    err = fut.exception()
+                    if err is None:
+                        result.results[step.name] = fut.result()
+                        done_order.append(step)
+                    elif result.ok:
+                        logger.error("Workflow step '%s' failed: %s", step.name, err)
+                        result.failed_step, result.error = step, err
+                    else:
+                        logger.error("Workflow step '%s' also failed: %s", step.name, err)
+
+            if not result.ok:
+                self._compensate(ex, [(s, undo[s.name]) for s in reversed(done_order) if s.compensate], result)
+
+        logger.info("Workflow %s in %s", "completed" if result.ok else f"failed at '{result.failed_step.name}'",
+                    ", ".join(f"{k}={v:.0f}ms" for k, v in result.timings.items()))
+        return result
+
+    def _compensate(self, ex: ThreadPoolExecutor, steps: List[tuple], result: WorkflowResult) -> None:
+        if not steps:
+            return
+        logger.warning("Rolling back %s", ", ".join(s.name for s, _fn in steps))
+        if self.parallel_compensation:
+            futures = [(s, ex.submit(self._timed, f"rollback.{s.name}", fn, result)) for s, fn in steps]
+            outcomes = [(s, f.exception(), None if f.exception() else f.result()) for s, f in futures]
+        else:
+            outcomes = []
+            for s, fn in steps:
+                try:
+                    outcomes.append((s, None, self._timed(f"rollback.{s.name}", fn, result)))
+                except Exception as e:
+                    outcomes.append((s, e, None))
+        for s, err, value in outcomes:
+            if err is None:
+                result.rollback[s.rollback_as] = value
+            else:
+                result.rollback[f"{s.rollback_as}_error"] = str(err)
+
+    def _timed(self, name: str, fn: Callable, result: WorkflowResult):
+        t0 = time.monotonic()
+        try:
+            out = self.runner(name, fn) if self.runner else fn()
+        finally:
+            result.timings[name] = (time.monotonic() - t0) * 1000.0
+        status = error_status(out)
+        if status is not None:
+            raise StepFailed(name, out, status)
+        return out
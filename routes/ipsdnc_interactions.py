@@ -1,5 +1,5 @@
 # routes/ipsdnc_interactions.py
-from flask import Blueprint
+from flask import Blueprint, jsonify, request
 def create_ipsdnc_bp(ipsdnc_controller):
     bp = Blueprint('ipsdnc_interactions', __name__)
 
@@ -15,4 +15,50 @@ def create_ipsdnc_bp(ipsdnc_controller):
     def deactivation_endpoint():
         return ipsdnc_controller.end_terminal_deactivation_request()
 
+    @bp.route('/netconf-session-pool', methods=['GET'])
+    def session_pool_endpoint():
+        return jsonify(ipsdnc_controller.session_pool_stats())
+
+    @bp.route('/ssh-tunnels', methods=['GET'])
+    def tunnel_stats_endpoint():
+        return jsonify(ipsdnc_controller.tunnel_stats())
+
+    @bp.route('/device-locks', methods=['GET'])
+    def device_lock_stats_endpoint():
+        return jsonify(ipsdnc_controller.device_lock_stats())
+
+    @bp.route('/payload-cache', methods=['GET'])
+    def payload_stats_endpoint():
+        return jsonify(ipsdnc_controller.payload_stats())
+
+    @bp.route('/confirmed-commits', methods=['GET'])
+    def pending_commits_endpoint():
+        return jsonify({"pending": ipsdnc_controller.pending_commits()})
+
+    @bp.route('/confirmed-commits/confirm', methods=['POST'])
+    def confirm_commit_endpoint():
+        return _pending_commit(ipsdnc_controller.confirm_commit, "confirmed")
+
+    @bp.route('/confirmed-commits/cancel', methods=['POST'])
+    def cancel_commit_endpoint():
+        return _pending_commit(ipsdnc_controller.cancel_commit, "cancelled")
+
+    def _pending_commit(op, done):
+        device = (request.get_json(silent=True) or {}).get("device")
+        if not device:
+            return jsonify({"error": "Body must carry the 'device' ip"}), 400
+        try:
+            if not op(device):
+                return jsonify({"device": device, "error": "No confirmed commit pending"}), 404
+        except ValueError as e:
+            return jsonify({"device": device, "error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"device": device, "error": str(e)}), 500
+        return jsonify({"device": device, "status": done})
+
+    @bp.route('/oc-capabilities/invalidate', methods=['POST'])
+    def invalidate_caps_endpoint():
+        device = (request.get_json(silent=True) or {}).get("device")
+        return jsonify({"device": device or "all", "invalidated": ipsdnc_controller.invalidate_oc_caps(device)})
+
     return bp
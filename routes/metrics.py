@@ -0,0 +1,14 @@
+from flask import Blueprint, Response, jsonify, request
+from utility.metrics import get_metrics
+
+def create_metrics_bp():
+    bp = Blueprint('metrics', __name__)
+
+    @bp.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        # Prometheus text by default, ?format=json for the summarized histograms
+        if request.args.get("format") == "json":
+            return jsonify(get_metrics().snapshot())
+        return Response(get_metrics().render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    return bp
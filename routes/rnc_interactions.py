@@ -1,4 +1,4 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, jsonify
 
 def create_rnc_bp(rnc_controller):
     bp = Blueprint('rnc_interactions', __name__)
@@ -54,6 +54,15 @@ def create_rnc_bp(rnc_controller):
         except Exception as e:
             return rnc_controller._err(str(e), 400)
 
+    @bp.route('/kafka-notifier', methods=['GET'])
+    def kafka_notifier_stats():
+        from kafka_notif.NBInotif import notifier_stats
+        return jsonify(notifier_stats())
+
+    @bp.route('/restconf-client', methods=['GET'])
+    def restconf_client_stats():
+        return jsonify(rnc_controller.restconf_stats())
+
     @bp.route('/service-delete', methods=['POST'])
     def service_delete():
         try:
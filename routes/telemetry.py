@@ -0,0 +1,33 @@
+import time
+from flask import Blueprint, request, jsonify
+
+def create_telemetry_bp(collector, enabled=False):
+    bp = Blueprint('telemetry', __name__)
+    store = collector.store
+
+    def _filters():
+        a = request.args
+        return {"device": a.get("device"), "component": a.get("component"), "metric": a.get("metric")}
+
+    @bp.route('/telemetry', methods=['GET'])
+    def telemetry_stats():
+        return jsonify({"enabled": enabled, **collector.stats()})
+
+    @bp.route('/telemetry/latest', methods=['GET'])
+    def telemetry_latest():
+        # Most recent sample per series, e.g. ?metric=output_power or ?metric=osnr
+        return jsonify({"latest": store.latest(**_filters())})
+
+    @bp.route('/telemetry/series', methods=['GET'])
+    def telemetry_series():
+        # ?window=<seconds back>&points=<max points per series>&agg=mean|min|max|last
+        try:
+            window = float(request.args.get("window", 0))
+            points = int(request.args.get("points", 300))
+            since = time.time() - window if window > 0 else None
+            return jsonify({"series": store.query(since=since, points=points,
+                                                  how=request.args.get("agg", "mean"), **_filters())})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    return bp
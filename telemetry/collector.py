@@ -0,0 +1,233 @@
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from telemetry.store import TelemetryStore
+
+logger = logging.getLogger(__name__)
+
+# Default subscriptions: metric name -> OpenConfig path (keys and module prefixes optional)
+DEFAULT_PATHS = {
+    "output_power": "/components/component/optical-channel/state/output-power/instant",
+    "input_power": "/components/component/optical-channel/state/input-power/instant",
+    "osnr": "/components/component/optical-channel/state/osnr/instant",
+}
+
+_KEYS_RE = re.compile(r"\[[^\]]*\]")
+_COMPONENT_RE = re.compile(r"component\[name=([^\]]+)\]")
+
+
+def _normalize(path: str) -> str:
+    """Path without list keys, module prefixes and surrounding slashes"""
+    path = _KEYS_RE.sub("", path)
+    return "/".join(seg.rsplit(":", 1)[-1] for seg in path.strip("/").split("/") if seg)
+
+
+def _to_float(val: Any) -> Optional[float]:
+    if isinstance(val, dict):
+        # decimal64 as {"digits": ..., "precision": ...}
+        if "digits" in val:
+            return int(val["digits"]) / (10 ** int(val.get("precision", 0)))
+        if len(val) == 1:
+            return _to_float(next(iter(val.values())))
+        return None
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+
+class GnmiTarget:
+    __slots__ = ("name", "host", "port", "username", "password")
+
+    def __init__(self, name: str, host: str, port: int, username: Optional[str], password: Optional[str]):
+        self.name = name
+        self.host = host
+        self.port = int(port)
+        self.username = username
+        self.password = password
+
+
+def pygnmi_client_factory(insecure: bool = True, timeout: float = 10.0) -> Callable[[GnmiTarget], Any]:
+    """
+    Factory building pygnmi clients (imported lazily; pygnmi is optional).
+    The client must be a context manager with subscribe2(subscribe=...)
+    yielding parsed notifications, like pygnmi.client.gNMIclient.
+    """
+    def make(target: GnmiTarget):
+        try:
+            from pygnmi.client import gNMIclient
+        except ImportError:
+            raise RuntimeError("gNMI telemetry needs the pygnmi package (pip install pygnmi)")
+        return gNMIclient(target=(target.host, target.port), username=target.username,
+                          password=target.password, insecure=insecure, gnmi_timeout=timeout)
+    return make
+
+
+class GnmiCollector:
+    """
+    Subscribes to every target in STREAM/SAMPLE mode, one thread per target,
+    and stores each numeric update in the TelemetryStore under (target name,
+    component name, metric). Broken streams are re-established with
+    exponential backoff.
+
+    client_factory(target) returns the gNMI client; it defaults to pygnmi and
+    can be replaced to run against a local stub server or a fake client.
+    """
+
+    def __init__(self, targets: Iterable[GnmiTarget], store: TelemetryStore,
+                 paths: Optional[Dict[str, str]] = None, sample_interval: float = 10.0,
+                 encoding: str = "json_ietf", client_factory: Optional[Callable] = None,
+                 max_backoff: float = 60.0):
+        self.targets = list(targets)
+        self.store = store
+        self.paths = dict(paths or DEFAULT_PATHS)
+        self.sample_interval = float(sample_interval)
+        self.encoding = encoding
+        self.client_factory = client_factory or pygnmi_client_factory()
+        self.max_backoff = float(max_backoff)
+        self._metrics = [(_normalize(p), m) for m, p in self.paths.items()]
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._state: Dict[str, dict] = {t.name: {"connected": False, "updates": 0, "errors": 0,
+                                                 "last_update": None, "last_error": None}
+                                        for t in self.targets}
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for t in self.targets:
+            th = threading.Thread(target=self._run_target, args=(t,), name=f"gnmi-{t.name}", daemon=True)
+            th.start()
+            self._threads.append(th)
+        logger.info("[Telemetry] Subscribed to %d target(s): %s", len(self.targets), list(self.paths))
+
+    def stop(self) -> None:
+        # Blocking subscribe streams notice the flag on their next update
+        self._stop.set()
+        self._threads = []
+
+    def stats(self) -> dict:
+        return {"targets": {n: dict(s) for n, s in self._state.items()},
+                "paths": self.paths, "sample_interval": self.sample_interval,
+                "store": self.store.stats()}
+
+    def subscribe_request(self) -> dict:
+        return {
+            "subscription": [{"path": p, "mode": "sample", "sample_interval": int(self.sample_interval * 1e9)}
+                             for p in self.paths.values()],
+            "mode": "stream",
+            "encoding": self.encoding,
+        }
+
+    # ---- Internals -------------------------------------------------------------
+
+    def _run_target(self, target: GnmiTarget) -> None:
+        state = self._state[target.name]
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                with self.client_factory(target) as client:
+                    state["connected"] = True
+                    for msg in client.subscribe2(subscribe=self.subscribe_request()):
+                        if self._stop.is_set():
+                            break
+                        state["updates"] += self.handle(target.name, msg)
+                        state["last_update"] = time.time()
+                        backoff = 1.0
+            except Exception as e:
+                state["errors"] += 1
+                state["last_error"] = str(e)
+                logger.warning("[Telemetry] %s stream failed: %s (retrying in %.0fs)", target.name, e, backoff)
+            state["connected"] = False
+            if self._stop.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def handle(self, device: str, msg: dict) -> int:
+        """
+        Stores the numeric updates of one parsed notification, e.g.
+        {"update": {"timestamp": ns, "prefix": "...", "update": [{"path": ..., "val": ...}]}};
+        returns the number of samples stored
+        """
+        notif = msg.get("update") if isinstance(msg, dict) else None
+        if not isinstance(notif, dict):
+            return 0  # sync_response and similar
+        ts = notif.get("timestamp")
+        ts = ts / 1e9 if ts else time.time()
+        prefix = notif.get("prefix") or ""
+        stored = 0
+        for upd in notif.get("update") or []:
+            full = f"{prefix}/{upd.get('path', '')}" if prefix else upd.get("path", "")
+            metric = self._metric_for(full)
+            value = _to_float(upd.get("val"))
+            if metric is None or value is None:
+                continue
+            m = _COMPONENT_RE.search(full)
+            self.store.add(device, m.group(1) if m else "", metric, value, ts)
+            stored += 1
+        return stored
+
+    def _metric_for(self, path: str) -> Optional[str]:
+        norm = _normalize(path)
+        for suffix, metric in self._metrics:
+            if norm == suffix or norm.endswith("/" + suffix):
+                return metric
+        return None
+
+
+def targets_from_config(tel_cfg: dict, ipsdnc_cfg: dict) -> List[GnmiTarget]:
+    """
+    telemetry.conf `targets` (host[:port], comma separated) when set, otherwise
+    the A/Z terminals of every vendor in ipsdnc.conf with their credentials
+    """
+    port = int(tel_cfg.get("port", 57400))
+    targets: Dict[str, GnmiTarget] = {}
+    if tel_cfg.get("targets"):
+        for entry in tel_cfg["targets"]:
+            host, _, p = entry.partition(":")
+            targets[entry] = GnmiTarget(entry, host, int(p or port),
+                                        tel_cfg.get("username"), tel_cfg.get("password"))
+        return list(targets.values())
+    for vendor in (ipsdnc_cfg.get("vendors") or {}).values():
+        for end in ("routera", "routerb"):
+            ip = vendor.get(f"{end}_ip")
+            if ip and not ip.startswith("#") and ip not in targets:
+                targets[ip] = GnmiTarget(ip, ip, port, vendor.get(f"{end}_user"), vendor.get(f"{end}_pass"))
+    return list(targets.values())
+
+
+def _client_factory(tel_cfg: dict) -> Callable[[GnmiTarget], Any]:
+    """pygnmi clients, or synthetic samples with client = stub (no devices needed)"""
+    if (tel_cfg.get("client") or "pygnmi") == "stub":
+        from telemetry.stub import stub_client_factory
+        logger.warning("[Telemetry] Using the stub gNMI client: samples are synthetic")
+        return stub_client_factory()
+    return pygnmi_client_factory(insecure=bool(tel_cfg.get("insecure", True)))
+
+
+_collector: Optional[GnmiCollector] = None
+_collector_lock = threading.Lock()
+
+
+def get_collector(tel_cfg: Optional[dict] = None, ipsdnc_cfg: Optional[dict] = None) -> GnmiCollector:
+    """
+    Returns the process-wide collector (not started), creating it from
+    telemetry and ipsdnc config on first use
+    """
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            tel_cfg = tel_cfg or {}
+            _collector = GnmiCollector(
+                targets_from_config(tel_cfg, ipsdnc_cfg or {}),
+                TelemetryStore(capacity=int(tel_cfg.get("buffer_size", 3600))),
+                paths=tel_cfg.get("paths") or None,
+                sample_interval=float(tel_cfg.get("sample_interval", 10.0)),
+                encoding=tel_cfg.get("encoding", "json_ietf"),
+                client_factory=_client_factory(tel_cfg),
+            )
+        return _collector
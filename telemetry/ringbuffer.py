@@ -0,0 +1,56 @@
+import bisect
+import threading
+from array import array
+from typing import Optional, Tuple
+
+
+class RingBuffer:
+    """
+    Fixed-capacity time series backed by two preallocated float arrays
+    (timestamps in epoch seconds, values). Appends overwrite the oldest sample
+    once full, so memory per series is 16 bytes x capacity regardless of uptime.
+    """
+
+    __slots__ = ("capacity", "_ts", "_vals", "_head", "_count", "_lock")
+
+    def __init__(self, capacity: int = 3600):
+        self.capacity = max(1, int(capacity))
+        self._ts = array("d", bytes(8 * self.capacity))
+        self._vals = array("d", bytes(8 * self.capacity))
+        self._head = 0      # next write position
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, ts: float, value: float) -> None:
+        with self._lock:
+            self._ts[self._head] = ts
+            self._vals[self._head] = value
+            self._head = (self._head + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def last(self) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            if not self._count:
+                return None
+            i = (self._head - 1) % self.capacity
+            return self._ts[i], self._vals[i]
+
+    def snapshot(self, since: Optional[float] = None) -> Tuple[array, array]:
+        """Samples in time order (oldest first), optionally only those at or after since"""
+        with self._lock:
+            start = (self._head - self._count) % self.capacity
+            if start + self._count <= self.capacity:
+                ts = self._ts[start:start + self._count]
+                vals = self._vals[start:start + self._count]
+            else:
+                ts = self._ts[start:] + self._ts[:self._head]
+                vals = self._vals[start:] + self._vals[:self._head]
+        if since is not None and ts and ts[0] < since:
+            i = bisect.bisect_left(ts, since)
+            ts, vals = ts[i:], vals[i:]
+        return ts, vals
+
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from telemetry.ringbuffer import RingBuffer
+
+logger = logging.getLogger(__name__)
+
+SeriesKey = Tuple[str, str, str]  # (device, component, metric)
+
+AGGREGATES = ("mean", "min", "max", "last")
+
+_np = None
+_np_checked = False
+
+
+def _numpy():
+    """NumPy if installed (imported on first query), else None"""
+    global _np, _np_checked
+    if not _np_checked:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            logger.info("[Telemetry] NumPy not installed; downsampling in pure Python")
+        _np_checked = True
+    return _np
+
+
+def downsample(ts: array, vals: array, points: int, how: str = "mean") -> Tuple[List[float], List[float]]:
+    """
+    Reduces a series to at most `points` buckets of consecutive samples. Each
+    bucket reports its mean timestamp and the mean/min/max/last value.
+    """
+    if how not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate '{how}' ({', '.join(AGGREGATES)})")
+    n = len(ts)
+    if points <= 0 or n <= points:
+        return ts.tolist(), vals.tolist()
+    np = _numpy()
+    if np is not None:
+        t = np.frombuffer(ts, dtype=np.float64)
+        v = np.frombuffer(vals, dtype=np.float64)
+        # n > points, so the bucket start offsets are strictly increasing
+        starts = (np.arange(points) * n) // points
+        sizes = np.diff(np.append(starts, n))
+        t_out = np.add.reduceat(t, starts) / sizes
+        if how == "mean":
+            v_out = np.add.reduceat(v, starts) / sizes
+        elif how == "min":
+            v_out = np.minimum.reduceat(v, starts)
+        elif how == "max":
+            v_out = np.maximum.reduceat(v, starts)
+        else:
+            v_out = v[np.append(starts[1:], n) - 1]
+        return t_out.tolist(), v_out.tolist()
+
+    t_out, v_out = [], []
+    for b in range(points):
+        lo, hi = b * n // points, (b + 1) * n // points
+        bt, bv = ts[lo:hi], vals[lo:hi]
+        t_out.append(sum(bt) / len(bt))
+        if how == "mean":
+            v_out.append(sum(bv) / len(bv))
+        elif how == "min":
+            v_out.append(min(bv))
+        elif how == "max":
+            v_out.append(max(bv))
+        else:
+            v_out.append(bv[-1])
+    return t_out, v_out
+
+
+class TelemetryStore:
+    """
+    In-memory samples per (device, component, metric), each in its own
+    RingBuffer of `capacity` samples. Queries never touch the devices.
+    """
+
+    def __init__(self, capacity: int = 3600):
+        self.capacity = capacity
+        self._series: Dict[SeriesKey, RingBuffer] = {}
+        self._lock = threading.Lock()
+        self._samples = 0
+
+    def add(self, device: str, component: str, metric: str, value: float, ts: Optional[float] = None) -> None:
+        key = (device, component or "", metric)
+        buf = self._series.get(key)
+        if buf is None:
+            with self._lock:
+                buf = self._series.setdefault(key, RingBuffer(self.capacity))
+        buf.append(time.time() if ts is None else ts, value)
+        self._samples += 1
+
+    def keys(self, device: Optional[str] = None, component: Optional[str] = None,
+             metric: Optional[str] = None) -> List[SeriesKey]:
+        with self._lock:
+            keys = list(self._series)
+        return sorted(k for k in keys
+                      if (device is None or k[0] == device)
+                      and (component is None or k[1] == component)
+                      and (metric is None or k[2] == metric))
+
+    def latest(self, device: Optional[str] = None, component: Optional[str] = None,
+               metric: Optional[str] = None) -> List[dict]:
+        out = []
+        for key in self.keys(device, component, metric):
+            last = self._series[key].last()
+            if last is not None:
+                out.append({"device": key[0], "component": key[1], "metric": key[2],
+                            "ts": last[0], "value": last[1]})
+        return out
+
+    def query(self, device: Optional[str] = None, component: Optional[str] = None,
+              metric: Optional[str] = None, since: Optional[float] = None,
+              points: int = 0, how: str = "mean") -> List[dict]:
+        out = []
+        for key in self.keys(device, component, metric):
+            ts, vals = self._series[key].snapshot(since)
+            samples = len(ts)
+            t, v = downsample(ts, vals, points, how)
+            out.append({"device": key[0], "component": key[1], "metric": key[2],
+                        "samples": samples, "ts": t, "values": v})
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            series = len(self._series)
+        return {"series": series, "capacity": self.capacity, "samples_received": self._samples,
+                "bytes": series * self.capacity * 16}
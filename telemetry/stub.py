@@ -0,0 +1,69 @@
+import math
+import random
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from telemetry.collector import GnmiTarget
+
+
+class StubGnmiClient:
+    """
+    Local stand-in for a pygnmi client: subscribe2() streams synthetic
+    notifications for every subscribed path and component, shaped like
+    pygnmi's parsed output, so GnmiCollector runs end to end without devices.
+
+    Values drift around a per-metric baseline (dBm for powers, dB for OSNR).
+    interval overrides the sample interval of the subscription (0 streams as
+    fast as possible); count stops the stream after that many notifications.
+    """
+
+    BASELINES = {"output-power": 0.0, "input-power": -8.0, "osnr": 32.0}
+
+    def __init__(self, target: GnmiTarget, components: Iterable[str] = ("OCH-0/0/0/1",),
+                 interval: Optional[float] = None, count: Optional[int] = None, seed: Optional[int] = None):
+        self.target = target
+        self.components = list(components)
+        self.interval = interval
+        self.count = count
+        self._rng = random.Random(seed if seed is not None else target.name)
+        self._closed = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._closed.set()
+        return False
+
+    def subscribe2(self, subscribe: dict):
+        subs = subscribe.get("subscription") or []
+        interval = self.interval
+        if interval is None:
+            interval = min((s.get("sample_interval", 10 * 10 ** 9) for s in subs), default=10 * 10 ** 9) / 1e9
+        sent = 0
+        yield {"sync_response": True}
+        while not self._closed.is_set() and (self.count is None or sent < self.count):
+            ts = time.time_ns()
+            for comp in self.components:
+                yield {"update": {"timestamp": ts,
+                                  "prefix": f"openconfig-platform:components/component[name={comp}]",
+                                  "update": [{"path": self._relative(s["path"]), "val": self._value(s["path"], ts)}
+                                             for s in subs]}}
+                sent += 1
+            if interval > 0:
+                self._closed.wait(interval)
+
+    @staticmethod
+    def _relative(path: str) -> str:
+        # Paths below the component, as devices report them under the prefix
+        return path.split("component/", 1)[-1]
+
+    def _value(self, path: str, ts: int) -> float:
+        base = next((v for k, v in self.BASELINES.items() if k in path), 0.0)
+        return round(base + 0.5 * math.sin(ts / 6e10) + self._rng.gauss(0, 0.05), 2)
+
+
+def stub_client_factory(**kwargs) -> Callable[[GnmiTarget], StubGnmiClient]:
+    """client_factory for GnmiCollector producing StubGnmiClient instances"""
+    return lambda target: StubGnmiClient(target, **kwargs)
@@ -26,6 +26,31 @@ def load_ipsdnc_config(path: str="config/ipsdnc.conf"):
         "vendor":   (cfg["default"].get("vendor","") or "").strip().lower(),
         "mongo_url": cfg["default"]["mongo_url"],
         "oper_mode": cfg["default"].get("oper_mode"),
+        # NETCONF session pool shared by all vendor controllers
+        "netconf_pool_size":    cfg["default"].getint("netconf_pool_size", fallback=2),
+        "netconf_idle_timeout": cfg["default"].getfloat("netconf_idle_timeout", fallback=300.0),
+        "netconf_keepalive":    cfg["default"].getfloat("netconf_keepalive", fallback=30.0),
+        # Per-device serialization of configuration changes, optionally with NETCONF <lock>
+        "device_lock_timeout":    cfg["default"].getfloat("device_lock_timeout", fallback=120.0),
+        "netconf_datastore_lock": cfg["default"].getboolean("netconf_datastore_lock", fallback=False),
+        # Configure / read back the A and Z ends in parallel
+        "concurrent_ends":      cfg["default"].getboolean("concurrent_ends", fallback=True),
+        # Lifetime of persisted device capabilities (seconds)
+        "oc_caps_ttl":          cfg["default"].getint("oc_caps_ttl", fallback=86400),
+        # Rendered payloads kept per (payload, variables); 0 disables the cache
+        "payload_render_cache": cfg["default"].getint("payload_render_cache", fallback=256),
+        # Payload cache bounds, and live invalidation (change stream, else polling)
+        "payload_cache_entries": cfg["default"].getint("payload_cache_entries", fallback=1024),
+        "payload_cache_bytes":   cfg["default"].getint("payload_cache_bytes", fallback=16777216),
+        "payload_watch":         cfg["default"].getboolean("payload_watch", fallback=True),
+        "payload_poll_interval": cfg["default"].getfloat("payload_poll_interval", fallback=30.0),
+        # Background `git fetch --tags` of the OpenConfig checkout at start-up
+        "oc_fetch_on_start":    cfg["default"].getboolean("oc_fetch_on_start", fallback=True),
+        "oc_fetch_timeout":     cfg["default"].getfloat("oc_fetch_timeout", fallback=60.0),
+        # Bulk service endpoints: global and per terminal port concurrency, request size
+        "bulk_workers":         cfg["default"].getint("bulk_workers", fallback=8),
+        "bulk_per_device":      cfg["default"].getint("bulk_per_device", fallback=2),
+        "bulk_max_services":    cfg["default"].getint("bulk_max_services", fallback=256),
         "vendors": {}
     }
 
@@ -88,6 +113,11 @@ def load_rnc_config(path: str="config/rnc.conf"):
     d = {}
     d.update(cfg["tpce"])
     d.update(cfg["rest"])
+    # RESTCONF client engine and connection pool
+    d["restconf_engine"]           = cfg["tpce"].get("restconf_engine", "auto").strip().lower()
+    d["restconf_pool_size"]        = cfg["tpce"].getint("restconf_pool_size", fallback=8)
+    d["restconf_keepalive_expiry"] = cfg["tpce"].getfloat("restconf_keepalive_expiry", fallback=30.0)
+    d["restconf_http2"]            = cfg["tpce"].getboolean("restconf_http2", fallback=False)
     return d
 
 def load_kafka_config(path: str = "config/kafka.conf"):
@@ -122,6 +152,13 @@ def load_kafka_config(path: str = "config/kafka.conf"):
             logger.warning("Invalid float for %s in %s; using default=%s", key, path, default)
             return default
 
+    def _getint(key, default):
+        try:
+            return s.getint(key, fallback=default)
+        except ValueError:
+            logger.warning("Invalid int for %s in %s; using default=%s", key, path, default)
+            return default
+
     d = {
         "enabled":           _getbool("enabled", True),
         "broker":            s.get("broker", "localhost:9092"),
@@ -129,6 +166,9 @@ def load_kafka_config(path: str = "config/kafka.conf"):
         "group_id":          s.get("group_id", "nova"),
         "auto_offset_reset": s.get("auto_offset_reset", "latest"),
         "poll_interval":     _getfloat("poll_interval", 1.0),
+        "max_poll_records":  _getint("max_poll_records", 100),
+        "queue_size":        _getint("queue_size", 1000),
+        "lag_interval":      _getfloat("lag_interval", 10.0),
     }
 
     # Quick sanity logs
@@ -141,3 +181,30 @@ def load_kafka_config(path: str = "config/kafka.conf"):
         raise ValueError(f"kafka.conf missing keys: {', '.join(missing)}")
 
     return d
+
+def load_telemetry_config(path: str = "config/telemetry.conf"):
+    """
+    Loads the gNMI telemetry collector config; telemetry is disabled when the file is absent
+    """
+    if not Path(path).exists():
+        logger.debug(f"{path} not found, telemetry disabled")
+        return {"enabled": False}
+    cfg = configparser.ConfigParser()
+    cfg.read(path)
+    s = cfg["default"] if "default" in cfg else {}
+    d = {
+        "enabled":         cfg.getboolean("default", "enabled", fallback=False),
+        "client":          (s.get("client") or "pygnmi").strip().lower(),
+        "port":            cfg.getint("default", "port", fallback=57400),
+        "insecure":        cfg.getboolean("default", "insecure", fallback=True),
+        "sample_interval": cfg.getfloat("default", "sample_interval", fallback=10.0),
+        "encoding":        s.get("encoding", "json_ietf"),
+        "buffer_size":     cfg.getint("default", "buffer_size", fallback=3600),
+        # Explicit host[:port] targets replace the terminals from ipsdnc.conf
+        "targets":         [t.strip() for t in (s.get("targets") or "").split(",") if t.strip()],
+        "username":        s.get("username") or None,
+        "password":        s.get("password") or None,
+        "paths":           dict(cfg["paths"]) if "paths" in cfg else {},
+    }
+    logger.debug("Telemetry config loaded: %s", {**d, "password": "***" if d["password"] else None})
+    return d
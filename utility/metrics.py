@@ -0,0 +1,132 @@
+import bisect
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+# Upper bounds in seconds; RESTCONF calls range from a few ms reads to multi-minute OLM setups
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (Prometheus semantics: cumulative "le"
+    buckets plus sum and count). Quantiles are estimated by linear
+    interpolation inside the bucket that holds them.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += seconds
+            self._count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            counts, total = list(self._counts), self._count
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for i, c in enumerate(counts):
+            if c and seen + c >= rank:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lo  # above the last bound; report the bound
+                return lo + (self.buckets[i] - lo) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total, s = list(self._counts), self._count, self._sum
+        cumulative, run = {}, 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            run += c
+            cumulative["+Inf" if bound == float("inf") else repr(bound)] = run
+        return {
+            "count": total,
+            "sum": round(s, 6),
+            "avg_ms": round(s * 1000.0 / total, 3) if total else None,
+            "p50_ms": _ms(self.quantile(0.50)),
+            "p95_ms": _ms(self.quantile(0.95)),
+            "p99_ms": _ms(self.quantile(0.99)),
+            "buckets": cumulative,
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000.0, 3)
+
+
+class MetricsRegistry:
+    """Named latency histograms, one per label set, exportable as JSON or Prometheus text"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, str] = {}
+        self._hists: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], LatencyHistogram] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        hist = self._hists.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._hists.setdefault(key, LatencyHistogram())
+        return hist
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        self.histogram(name, **labels).observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = list(self._hists.items())
+        out: Dict[str, list] = {}
+        for (name, labels), hist in sorted(items):
+            out.setdefault(name, []).append({"labels": dict(labels), **hist.snapshot()})
+        return out
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            items = sorted(self._hists.items())
+        lines, current = [], None
+        for (name, labels), hist in items:
+            if name != current:
+                current = name
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+            snap = hist.snapshot()
+            for le, n in snap["buckets"].items():
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {n}")
+            lines.append(f"{name}_sum{_labels(labels)} {snap['sum']}")
+            lines.append(f"{name}_count{_labels(labels)} {snap['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Returns the process-wide metrics registry"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+        return _metrics
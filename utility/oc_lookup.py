@@ -2,142 +2,398 @@ from pathlib import Path
 import re
 import subprocess
 import os
+import json
 import logging
-from typing import Optional
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 # Path to your cloned OpenConfig repo (with tags), e.g. ~/nova-open-ipodwdm/openconfig-public
 OPENCONFIG_REPO = Path(__file__).parent.parent / "openconfig-public"
-# File we care about inside that repo
+# Tree holding every published module inside that repo
+OC_MODELS_DIR = "release/models"
+# File we care about most (kept for callers and the benchmark)
 OC_PLATFORM_YANG = "release/models/platform/openconfig-platform.yang"
+OC_PLATFORM = "openconfig-platform"
+# Persisted catalog so start-up never has to re-parse every tag
+OC_INDEX_PATH = Path(__file__).parent.parent / "openconfig-index.json"
+# Bump when the parsing logic changes so stale indexes are rebuilt
+INDEX_FORMAT = 2
+# Below this many files a process pool costs more than it saves
+PARALLEL_PARSE_MIN = 64
 
 REV_RE = re.compile(r'revision\s+"(\d{4}-\d{2}-\d{2})"\s*{', re.DOTALL)
 OC_EXT_VER_RE = re.compile(r'oc-ext:openconfig-version\s+"([^"]+)"')
 REF_VER_RE = re.compile(r'reference\s+"([^"]+)"')
 
+class GitBatchError(RuntimeError):
+    pass
+
+
+class GitBatchReader:
+    """
+    Reads many objects through one `git cat-file --batch` process instead of
+    forking `git show` per object. Use as a context manager.
+    """
+
+    def __init__(self, repo: Path):
+        self.repo = Path(repo)
+        self._proc = None
+
+    def __enter__(self) -> "GitBatchReader":
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"], cwd=self.repo,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def read_object(self, obj: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """Returns (type, raw content) for a sha or `<rev>:<path>` spec, or (None, None) if it does not exist"""
+        if "\n" in obj:
+            raise ValueError(f"Invalid object spec: {obj!r}")
+        self._proc.stdin.write(obj.encode("utf-8") + b"\n")
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline()
+        if not header:
+            raise GitBatchError("git cat-file exited unexpectedly")
+        parts = header.split()
+        if len(parts) != 3:
+            # "<obj> missing" / "<obj> ambiguous"
+            return None, None
+        size = int(parts[2])
+        data = self._proc.stdout.read(size)
+        self._proc.stdout.read(1)  # trailing LF
+        return parts[1].decode("ascii"), data
+
+    def read(self, obj: str) -> Optional[bytes]:
+        return self.read_object(obj)[1]
+
+    def read_text(self, obj: str) -> Optional[str]:
+        data = self.read(obj)
+        return data.decode("utf-8", errors="ignore") if data is not None else None
+
+    def iter_tree(self, obj: str) -> Iterator[Tuple[bool, str, str]]:
+        """Yields (is_tree, name, sha) for the entries of a tree object"""
+        kind, data = self.read_object(obj)
+        if kind != "tree":
+            return
+        # Binary tree format: "<mode> <name>\0<20-byte sha>" repeated
+        pos = 0
+        while pos < len(data):
+            nul = data.index(b"\0", pos)
+            mode, name = data[pos:nul].split(b" ", 1)
+            yield mode == b"40000", name.decode("utf-8", errors="ignore"), data[nul + 1:nul + 21].hex()
+            pos = nul + 21
+
+    def close(self) -> None:
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+            self._proc.wait(timeout=5)
+        except Exception:
+            self._proc.kill()
+        finally:
+            self._proc.stdout.close()
+            self._proc = None
+
+
+def _parse_yang(text: Optional[str]):
+    """(version, top revision) of a module file; module-level so it can run in worker processes"""
+    if not text:
+        return None, None
+    # oc-ext is authoritative; fall back to 'reference "X.Y.Z"' if present
+    ver = OpenConfigLookup._extract_oc_version(text) or OpenConfigLookup._extract_ref_version(text)
+    # The topmost revision is the most recent one as of that tag
+    return ver, OpenConfigLookup._extract_top_revision(text)
+
+
 class OpenConfigLookup:
-    def __init__(self):
-        # Build both maps at init:
-        self._rev_map = {"openconfig-platform": {}}
-        self._version_tags = {}
+    """
+    Catalog of every module under release/models of a local OpenConfig
+    checkout: revision→version per module, and version→first release tag.
+
+    The catalog is persisted to an index file together with the tags, trees
+    and blobs already processed, so construction only parses what changed
+    since the last run and never touches the network.
+    refresh()/start_background_refresh() fetch new tags from the remote
+    explicitly.
+
+    Objects are streamed through a single `git cat-file --batch` process and
+    identical trees/blobs are read once across all tags. parse_workers > 1
+    parses them in a process pool; the regexes take microseconds per file, so
+    in-process parsing is the default.
 
-        built_from_tags = self._build_from_tags()
+    Lookups are O(1) (exact revision, latest version, tag) or O(log n)
+    (nearest revision) on per-module sorted arrays rebuilt after each update.
+    """
+
+    def __init__(self, repo: Path = OPENCONFIG_REPO, index_path: Path = OC_INDEX_PATH, parse_workers: int = 0):
+        self.repo = Path(repo)
+        self.index_path = Path(index_path)
+        self.parse_workers = parse_workers
+        # module -> revision -> (version, tag)
+        self._entries: Dict[str, Dict[str, Tuple[str, Optional[str]]]] = {}
+        self._processed_tags = set()
+        self._seen_trees = set()
+        self._seen_blobs = set()
+        self._last_tag = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._compile()
+
+        t0 = time.monotonic()
+        self._load_index()
+        with self._lock:
+            built_from_tags = self._build_from_tags()
         if not built_from_tags:
             self._build_from_head_fallback()
 
-        logger.debug("[Lookup] rev→version map: %s", self._rev_map["openconfig-platform"])
+        logger.debug("[Lookup] Ready in %.1f ms (%d modules, %d tags indexed, last=%s)",
+                     (time.monotonic() - t0) * 1000.0, len(self._rev_map), len(self._processed_tags),
+                     self._last_tag)
+        logger.debug("[Lookup] rev→version map: %s", self._rev_map.get(OC_PLATFORM))
         logger.debug("[Lookup] version→tag map: %s", self._version_tags)
 
     def get_version_by_revision(self, module: str, revision_date: str):
         """Returns OpenConfig version for a module + revision date"""
         return self._rev_map.get(module, {}).get(revision_date)
 
+    def resolve_version(self, module: str, revision_date: str):
+        """
+        Version for a module + revision, falling back to the newest catalogued
+        revision not later than revision_date (devices often ship revisions
+        that never appeared in a release tag)
+        """
+        exact = self.get_version_by_revision(module, revision_date)
+        if exact or not revision_date:
+            return exact
+        revs = self._sorted_revs.get(module)
+        if not revs:
+            return None
+        i = bisect_right(revs, revision_date)
+        return self._sorted_vers[module][i - 1] if i else None
+
     def get_latest_version(self, module: str):
         """Returns the latest known version for this module by max revision date"""
-        rev_map = self._rev_map.get(module, {})
-        if not rev_map:
-            return None
-        latest_rev = max(rev_map.keys())  # lexical works for YYYY-MM-DD
-        return rev_map[latest_rev]
+        return self._latest.get(module)
 
-    def get_tag_for_version(self, version: str):
-        """Returns Git tag corresponding to an OpenConfig version (if known)"""
-        return self._version_tags.get(version)
+    def get_tag_for_version(self, version: str, module: str = OC_PLATFORM):
+        """Returns the first Git tag that shipped this version of module (if known)"""
+        return self._tags.get(module, {}).get(version)
+
+    def modules(self) -> List[str]:
+        return sorted(self._rev_map)
+
+    # ---- Refresh --------------------------------------------------------------
+
+    def refresh(self, fetch_timeout: float = 60.0) -> int:
+        """
+        Fetches tags from the remote (bounded by fetch_timeout, never prompting)
+        and indexes any new ones. Returns the number of newly indexed tags.
+        Network failures are logged; the existing index keeps being served.
+        """
+        if not self.repo.exists():
+            return 0
+        try:
+            subprocess.run(
+                ["git", "fetch", "--tags", "--quiet"], cwd=self.repo, check=True, timeout=fetch_timeout,
+                capture_output=True, env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+            )
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.warning("[Lookup] git fetch skipped: %s", e)
+        with self._lock:
+            before = len(self._processed_tags)
+            self._build_from_tags()
+            return len(self._processed_tags) - before
+
+    def start_background_refresh(self, fetch_timeout: float = 60.0) -> threading.Thread:
+        """Runs refresh() in a daemon thread (at most one at a time)"""
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return self._refresh_thread
+
+        def run():
+            try:
+                added = self.refresh(fetch_timeout)
+                logger.info("[Lookup] Background refresh done (%d new tag(s))", added)
+            except Exception as e:
+                logger.warning("[Lookup] Background refresh failed: %s", e)
+
+        self._refresh_thread = threading.Thread(target=run, name="oc-lookup-refresh", daemon=True)
+        self._refresh_thread.start()
+        return self._refresh_thread
 
     # ---- Builders -----------------------------------------------------------
 
     def _build_from_tags(self) -> bool:
         """
-        Build:
-          - revision→version for openconfig-platform
-          - version→tag
-        by iterating over OpenConfig repo tags and parsing the file at each tag
+        Walks release/models at every local tag not yet in the index, parses
+        each module file not seen before and merges it into the catalog:
+          - revision→version (later tags win)
+          - version→tag (first tag wins; tags are processed in version order)
+        then persists the index if anything changed
         """
-        if not OPENCONFIG_REPO.exists():
-            logger.warning("[Lookup] OpenConfig repo not found at %s", OPENCONFIG_REPO)
-            return False
+        if not self.repo.exists():
+            logger.warning("[Lookup] OpenConfig repo not found at %s", self.repo)
+            return bool(self._rev_map)
 
         try:
-            subprocess.run(["git", "fetch", "--tags"], check=False, cwd=OPENCONFIG_REPO)
             res = subprocess.run(
                 ["git", "tag", "-l", "v*.*.*", "--sort=v:refname"],
-                cwd=OPENCONFIG_REPO, capture_output=True, text=True, check=True
+                cwd=self.repo, capture_output=True, text=True, check=True
             )
             tags = [t for t in res.stdout.strip().splitlines() if t]
             if not tags:
-                logger.warning("[Lookup] No tags found in %s", OPENCONFIG_REPO)
-                return False
+                logger.warning("[Lookup] No tags found in %s", self.repo)
+                return bool(self._rev_map)
 
-            for tag in tags:
-                text = self._git_show(OPENCONFIG_REPO, f"{tag}:{OC_PLATFORM_YANG}")
-                if not text:
-                    # Some older tags or different layouts might not have this file
-                    continue
+            new_tags = [t for t in tags if t not in self._processed_tags]
+            if not new_tags:
+                return bool(self._rev_map)
 
-                # Extracts version (oc-ext is authoritative at this tag)
-                ver = self._extract_oc_version(text)
-                if not ver:
-                    # Fallback to 'reference "X.Y.Z"' if present
-                    ver = self._extract_ref_version(text)
-
-                # Extracts the *top* (most recent) revision date in that file at this tag
-                rev = self._extract_top_revision(text)
+            with GitBatchReader(self.repo) as reader:
+                files = []  # (tag, module, blob sha) in tag order
+                for tag in new_tags:
+                    self._walk(reader, f"{tag}:{OC_MODELS_DIR}", tag, files)
+                texts = [reader.read_text(sha) for _tag, _mod, sha in files]
 
+            for (tag, module, _sha), (ver, rev) in zip(files, self._parse_texts(texts)):
                 if ver and rev:
-                    # Map revision→version
-                    self._rev_map["openconfig-platform"][rev] = ver
-                    # Map version→tag (first match wins)
-                    self._version_tags.setdefault(ver, tag)
-
-            return bool(self._rev_map["openconfig-platform"])
+                    entries = self._entries.setdefault(module, {})
+                    prev = entries.get(rev)
+                    # Same version re-published in a changed file keeps its earlier tag
+                    if not (prev and prev[0] == ver):
+                        entries[rev] = (ver, tag)
+            self._processed_tags.update(new_tags)
+            self._last_tag = tags[-1]
+            self._compile()
+            logger.info("[Lookup] Indexed %d new tag(s), %d new file(s) (last=%s)",
+                        len(new_tags), len(files), self._last_tag)
+            self._save_index()
+            return bool(self._rev_map)
         except Exception as e:
             logger.warning("[Lookup] Failed building from tags: %s", e)
-            return False
+            return bool(self._rev_map)
+
+    def _walk(self, reader: GitBatchReader, tree: str, tag: str, out: list) -> None:
+        """Collects unseen *.yang blobs under tree, skipping subtrees already processed"""
+        for is_tree, name, sha in reader.iter_tree(tree):
+            if is_tree:
+                if sha not in self._seen_trees:
+                    self._walk(reader, sha, tag, out)
+                    self._seen_trees.add(sha)
+            elif name.endswith(".yang") and sha not in self._seen_blobs:
+                self._seen_blobs.add(sha)
+                out.append((tag, name[:-5], sha))
+
+    def _parse_texts(self, texts):
+        """(version, revision) per text; spread over a process pool when parse_workers > 1"""
+        if self.parse_workers > 1 and len(texts) >= PARALLEL_PARSE_MIN:
+            with ProcessPoolExecutor(max_workers=self.parse_workers) as ex:
+                return list(ex.map(_parse_yang, texts, chunksize=max(1, len(texts) // (4 * self.parse_workers))))
+        return [_parse_yang(t) for t in texts]
+
+    def _compile(self) -> None:
+        """Rebuilds the lookup structures from _entries and swaps them in"""
+        rev_map, tags, sorted_revs, sorted_vers, latest = {}, {}, {}, {}, {}
+        for module, entries in self._entries.items():
+            revs = sorted(entries)
+            rev_map[module] = {r: entries[r][0] for r in revs}
+            sorted_revs[module] = revs
+            sorted_vers[module] = [entries[r][0] for r in revs]
+            latest[module] = sorted_vers[module][-1] if revs else None
+            per_ver = tags[module] = {}
+            for r in revs:
+                ver, tag = entries[r]
+                if tag:
+                    per_ver.setdefault(ver, tag)
+        self._rev_map, self._tags = rev_map, tags
+        self._sorted_revs, self._sorted_vers, self._latest = sorted_revs, sorted_vers, latest
+        self._version_tags = tags.get(OC_PLATFORM, {})
+
+    # ---- Index file ---------------------------------------------------------
+
+    def _load_index(self) -> None:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("[Lookup] Ignoring unreadable index %s: %s", self.index_path, e)
+            return
+        if data.get("format") != INDEX_FORMAT:
+            logger.info("[Lookup] Index %s has an old format; rebuilding", self.index_path)
+            return
+        # modules: {module: [[revision, version, tag], ...]}
+        self._entries = {m: {r: (v, t) for r, v, t in rows} for m, rows in data.get("modules", {}).items()}
+        self._processed_tags = set(data.get("processed_tags", []))
+        self._seen_trees = set(data.get("trees", []))
+        self._seen_blobs = set(data.get("blobs", []))
+        self._last_tag = data.get("last_tag")
+        self._compile()
+
+    def _save_index(self) -> None:
+        data = {
+            "format": INDEX_FORMAT,
+            "last_tag": self._last_tag,
+            "processed_tags": sorted(self._processed_tags),
+            "trees": sorted(self._seen_trees),
+            "blobs": sorted(self._seen_blobs),
+            "modules": {m: [[r, v, t] for r, (v, t) in sorted(e.items())] for m, e in sorted(self._entries.items())},
+        }
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            logger.warning("[Lookup] Could not write index %s: %s", self.index_path, e)
 
     def _build_from_head_fallback(self):
         """
-        Fallback: parses the file at HEAD (current checkout) just to get
+        Fallback: parses the module files at HEAD (current checkout) just to get
         some revision→version mapping if tags are unavailable
         """
-        path = OPENCONFIG_REPO / OC_PLATFORM_YANG
-        if not path.exists():
-            logger.warning("[Lookup] Fallback file not found: %s", path)
+        models = self.repo / OC_MODELS_DIR
+        if not models.exists():
+            logger.warning("[Lookup] Fallback directory not found: %s", models)
             return
 
-        try:
-            text = path.read_text(encoding="utf-8", errors="ignore")
-        except Exception as e:
-            logger.warning("[Lookup] Could not read fallback file %s: %s", path, e)
-            return
+        for path in models.rglob("*.yang"):
+            try:
+                text = path.read_text(encoding="utf-8", errors="ignore")
+            except Exception as e:
+                logger.warning("[Lookup] Could not read fallback file %s: %s", path, e)
+                continue
 
-        # Gets a single version value (oc-ext preferred)
-        ver = self._extract_oc_version(text) or self._extract_ref_version(text)
-        if not ver:
-            logger.warning("[Lookup] No version found in fallback HEAD file")
-            return
+            # Gets a single version value (oc-ext preferred)
+            ver = self._extract_oc_version(text) or self._extract_ref_version(text)
+            if not ver:
+                continue
 
-        # Maps *all* revisions present in the file to that version (best-effort)
-        for rev in REV_RE.findall(text):
-            self._rev_map["openconfig-platform"][rev] = ver
+            # Maps *all* revisions present in the file to that version (best-effort)
+            entries = self._entries.setdefault(path.stem, {})
+            for rev in REV_RE.findall(text):
+                entries.setdefault(rev, (ver, None))
+        self._compile()
 
     # ---- Helpers ------------------------------------------------------------
 
-    def _git_show(self, repo: Path, obj_path: str) -> Optional[str]:
-        try:
-            r = subprocess.run(
-                ["git", "show", obj_path],
-                cwd=repo, capture_output=True, text=True, check=True
-            )
-            return r.stdout
-        except subprocess.CalledProcessError:
-            return None
-
-    def _extract_oc_version(self, text: str) -> Optional[str]:
+    @staticmethod
+    def _extract_oc_version(text: str) -> Optional[str]:
         m = OC_EXT_VER_RE.search(text)
         return m.group(1) if m else None
 
-    def _extract_ref_version(self, text: str) -> Optional[str]:
+    @staticmethod
+    def _extract_ref_version(text: str) -> Optional[str]:
         """
         If the reference contains extra words, keep only the X.Y.Z-like token.
         """
@@ -148,7 +404,8 @@ class OpenConfigLookup:
         sv = re.search(r"\b\d+\.\d+\.\d+\b", ref)
         return sv.group(0) if sv else ref
 
-    def _extract_top_revision(self, text: str) -> Optional[str]:
+    @staticmethod
+    def _extract_top_revision(text: str) -> Optional[str]:
         """
         Returns the first (topmost) revision date in the file text, which
         corresponds to the most recent revision as of that tag